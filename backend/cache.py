@@ -0,0 +1,197 @@
+import os
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Parent of the on-disk caches. Entries are unpickled, so it must be private to the
+# user running the app (see private_dir)
+DATAFLOW_CACHE_DIR = os.getenv("DATAFLOW_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "dataflow"))
+# Memory budget for cached upload results (parsed frame + analysis), LRU beyond it
+RESULT_CACHE_MEMORY_MB = int(os.getenv("RESULT_CACHE_MEMORY_MB", "256"))
+# Disk budget for the persistent tier; 0 disables it
+RESULT_CACHE_DISK_MB = int(os.getenv("RESULT_CACHE_DISK_MB", "2048"))
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", os.path.join(DATAFLOW_CACHE_DIR, "results"))
+# Bump when parsing or analyzer output changes, so entries written by older code stop matching
+RESULT_CACHE_VERSION = 3
+
+
+def private_dir(path: str) -> str:
+    """
+    Creates path (mode 0700) if needed and returns it. Raises PermissionError when it
+    is owned by another user or writable by others, who could plant files to unpickle.
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    if os.name == "posix":
+        stat = os.stat(path)
+        if stat.st_uid != os.getuid() or stat.st_mode & 0o022:
+            raise PermissionError(f"{path} must be owned by the current user and not writable by others")
+    return path
+
+def content_key(content: bytes, **options) -> str:
+    """
+    Cache key of an upload: SHA-256 of the raw bytes plus the options that change
+    how they are parsed and analyzed (sheet name, approximate mode, ...).
+    """
+    return digest_key(hashlib.sha256(content).hexdigest(), **options)
+
+def digest_key(sha256: str, **options) -> str:
+    """content_key for content whose SHA-256 hex digest is already known."""
+    described = repr((RESULT_CACHE_VERSION, sha256, sorted(options.items())))
+    return hashlib.sha256(described.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Parsed frames and analysis results of previous uploads, keyed by content_key.
+    Recent entries stay in memory within a byte budget (LRU). Every entry is also
+    written to disk in the background, within its own budget, so repeats survive restarts;
+    only into a private directory (private_dir), else the cache stays in memory.
+    Cached frames are shared with their callers and must be treated as read-only.
+    """
+
+    def __init__(self, memory_budget_bytes: int, disk_budget_bytes: int, cache_dir: str):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.disk_budget_bytes = disk_budget_bytes
+        self.cache_dir = cache_dir
+        self._lock = threading.RLock()
+        self._memory = OrderedDict()  # key -> (df, profile, result), oldest first
+        self._sizes = {}              # key -> resident bytes
+        self._disk = OrderedDict()    # key -> bytes on disk, oldest first
+        self._hits = 0
+        self._misses = 0
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="result-cache")
+        if self.disk_budget_bytes > 0:
+            try:
+                private_dir(self.cache_dir)
+            except OSError as e:
+                print(f"Keeping cached results in memory only: {e}")
+                self.disk_budget_bytes = 0
+            else:
+                self._load_disk_index()
+
+    def get(self, key: str):
+        """
+        Returns (df, profile, result) for a cached upload, or None.
+        result is a fresh copy the caller may update; profile is None for disk hits.
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._hits += 1
+                df, profile, result = self._memory[key]
+                return df, profile, dict(result)
+            on_disk = key in self._disk
+
+        if on_disk:
+            try:
+                with open(self._path(key), 'rb') as f:
+                    df, result = pickle.load(f)
+                os.utime(self._path(key))
+            except Exception as e:
+                print(f"Dropping unreadable cache entry {key}: {e}")
+                self._drop_from_disk(key)
+            else:
+                with self._lock:
+                    self._hits += 1
+                    if key in self._disk:
+                        self._disk.move_to_end(key)
+                    self._remember(key, df, None, result)
+                return df, None, dict(result)
+
+        with self._lock:
+            self._misses += 1
+        return None
+
+    def put(self, key: str, df, profile, result: dict):
+        """
+        Caches an upload's frame, profile (may be None) and result.
+        The disk copy is written in the background.
+        """
+        result = dict(result)
+        with self._lock:
+            self._remember(key, df, profile, result)
+            write = self.disk_budget_bytes > 0 and key not in self._disk
+        if write:
+            self._writer.submit(self._write, key, df, result)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "memory_entries": len(self._memory),
+                "memory_bytes": sum(self._sizes.values()),
+                "disk_entries": len(self._disk),
+                "disk_bytes": sum(self._disk.values())
+            }
+
+    def shutdown(self):
+        self._writer.shutdown(wait=True)
+
+    def _remember(self, key: str, df, profile, result: dict):
+        self._memory[key] = (df, profile, result)
+        self._memory.move_to_end(key)
+        self._sizes[key] = int(df.memory_usage(index=True, deep=True).sum())
+        # The newest entry stays even if it alone exceeds the budget
+        while sum(self._sizes.values()) > self.memory_budget_bytes and len(self._memory) > 1:
+            oldest = next(iter(self._memory))
+            self._memory.pop(oldest)
+            self._sizes.pop(oldest)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def _write(self, key: str, df, result: dict):
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            private_dir(self.cache_dir)
+            with open(tmp_path, 'wb') as f:
+                pickle.dump((df, result), f, protocol=pickle.HIGHEST_PROTOCOL)
+            # Readers only ever see complete files
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Failed to persist cache entry {key}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        with self._lock:
+            self._disk[key] = os.path.getsize(path)
+            self._disk.move_to_end(key)
+            expired = []
+            while sum(self._disk.values()) > self.disk_budget_bytes and len(self._disk) > 1:
+                oldest = next(iter(self._disk))
+                self._disk.pop(oldest)
+                expired.append(oldest)
+        for old_key in expired:
+            self._remove_file(old_key)
+
+    def _drop_from_disk(self, key: str):
+        with self._lock:
+            self._disk.pop(key, None)
+        self._remove_file(key)
+
+    def _remove_file(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _load_disk_index(self):
+        if not os.path.isdir(self.cache_dir):
+            return
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".pkl"):
+                continue
+            stat = os.stat(os.path.join(self.cache_dir, name))
+            entries.append((stat.st_mtime, name[:-len(".pkl")], stat.st_size))
+        # Least recently used first, by modification time (bumped on every disk hit)
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+
+
+result_cache = ResultCache(RESULT_CACHE_MEMORY_MB * 1024 * 1024, RESULT_CACHE_DISK_MB * 1024 * 1024, RESULT_CACHE_DIR)
@@ -0,0 +1,330 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from compaction import is_date_column, parse_date_column
+from profiling import (
+    _skew_from_moments, _kurtosis_from_moments, outlier_bounds,
+    APPROX_QUANTILE_ERROR, APPROX_DISTINCT_ERROR
+)
+from sketches import (
+    DistinctCounter, KLLSketch, RowHashFilter, hash_column, maybe_to_numeric,
+    kll_k_for_error, hll_precision_for_error
+)
+
+# Rows parsed per chunk when a dataset is profiled out of core
+CHUNK_ROWS = int(os.getenv("CHUNK_ROWS", "100000"))
+# Size of the duplicate-row Bloom filter. Stays accurate up to roughly size / 10 rows.
+DUPLICATE_FILTER_MB = int(os.getenv("DUPLICATE_FILTER_MB", "64"))
+# Bits per row of duplicate filters sized to a dataset (duplicate_filter_bits), see RowHashFilter
+DUPLICATE_FILTER_BITS_PER_ROW = 10
+
+
+class ChunkedProfile:
+    """
+    DatasetProfile built from consecutive chunks of a dataset that never fits in memory at once.
+    Every aggregate is a mergeable accumulator (counts, moments, sketches, co-moment
+    sums), so memory depends on the number of columns, not on the number of rows.
+
+    Date columns are recognised as compact_frame recognises them for in-memory uploads:
+    named like a date (is_date_column) and, in every chunk, fully parsed by the
+    format of its first value (parse_date_column). Chunks of already parsed (datetime64)
+    columns count as dates whatever their name, as in a DatasetProfile.
+
+    Counts, min/max, mean/std/skew/kurtosis and Pearson correlations are exact up to
+    floating point. Quartiles (KLL) and distinct counts above the exact limit (HyperLogLog)
+    are approximate; duplicate rows are counted with a Bloom filter.
+
+    Usage: update() every chunk, finalize(), then count_outliers() every chunk in a second pass.
+    Appendable profiles are finalized with keep_sketches=True instead; append() then
+    folds in new rows at a cost proportional to their number. Their outlier counts are
+    estimated from the quantile sketches, since the fences move as rows arrive.
+    """
+
+    def __init__(self, columns: list, quantile_error: float = APPROX_QUANTILE_ERROR,
+                 distinct_error: float = APPROX_DISTINCT_ERROR, distinct_exact_limit: int = 10000,
+                 duplicate_filter_bits: int = DUPLICATE_FILTER_MB * 8 * 1024 * 1024):
+        self.columns = list(columns)
+        self.row_count = 0
+        k = len(self.columns)
+
+        self._numeric = np.ones(k, dtype=bool)      # numeric in every chunk so far
+        self._dates = np.array([is_date_column(col) for col in self.columns], dtype=bool)  # dates in every chunk so far
+        self._parsed = np.zeros(k, dtype=bool)      # datetime64 in some chunk
+        self._null_counts = np.zeros(k, dtype=np.int64)
+        self._parse_counts = np.zeros(k, dtype=np.int64)
+        precision = hll_precision_for_error(distinct_error)
+        self._distinct = [DistinctCounter(exact_limit=distinct_exact_limit, precision=precision) for _ in range(k)]
+        self._quantiles = [KLLSketch(k=kll_k_for_error(quantile_error)) for _ in range(k)]
+        self._duplicates = RowHashFilter(size_bits=duplicate_filter_bits)
+        self.duplicate_count = 0
+
+        # Per-column moments, merged chunk by chunk (Pébay's update formulas)
+        self._n = np.zeros(k)
+        self._mean = np.zeros(k)
+        self._m2 = np.zeros(k)
+        self._m3 = np.zeros(k)
+        self._m4 = np.zeros(k)
+        self._min = np.full(k, np.inf)
+        self._max = np.full(k, -np.inf)
+        self._sum = np.zeros(k)
+
+        # Pairwise co-moment sums over rows where both columns are present.
+        # Values are shifted by the first chunk's means to limit cancellation.
+        self._shift = None
+        self._pair_n = np.zeros((k, k))
+        self._pair_x = np.zeros((k, k))   # sum of x_i over rows where x_j is present
+        self._pair_xx = np.zeros((k, k))  # sum of x_i ** 2 over rows where x_j is present
+        self._pair_xy = np.zeros((k, k))  # sum of x_i * x_j
+
+        self._outlier_counts = np.zeros(k, dtype=np.int64)
+
+    # Pass 1
+    def update(self, chunk: pd.DataFrame):
+        self.row_count += len(chunk)
+        self._null_counts += chunk.isna().sum().to_numpy()
+
+        values = np.full((len(chunk), len(self.columns)), np.nan)
+        column_hashes = {}
+        for i, col in enumerate(self.columns):
+            col_data = chunk[col]
+            if pd.api.types.is_numeric_dtype(col_data):
+                col_values = col_data.to_numpy(dtype=np.float64, na_value=np.nan)
+                values[:, i] = col_values
+                self._parse_counts[i] += int(col_data.notna().sum())
+                self._quantiles[i].update(col_values)
+                column_hashes[i] = hash_column(col_values)
+            elif pd.api.types.is_datetime64_any_dtype(col_data):
+                # Dates parsed at ingestion (compact_frame) are not numbers in disguise
+                self._numeric[i] = False
+                self._parsed[i] = True
+                column_hashes[i] = hash_column(col_data)
+            else:
+                self._numeric[i] = False
+                if self._dates[i] and col_data.notna().any():
+                    self._dates[i] = parse_date_column(col_data) is not None
+                numbers = maybe_to_numeric(col_data)
+                if numbers is not None:
+                    self._parse_counts[i] += int(numbers.notna().sum())
+                column_hashes[i] = hash_column(col_data, numbers)
+            self._distinct[i].update_hashes(column_hashes[i][col_data.notna().to_numpy()])
+
+        self._update_moments(values)
+        self._update_comoments(values)
+
+        # Rows hash from normalized column hashes, so they match across chunks parsed with different dtypes
+        hashed = pd.DataFrame(column_hashes)
+        row_hashes = pd.util.hash_pandas_object(hashed, index=False).to_numpy()
+        self.duplicate_count += self._duplicates.add_and_count_seen(row_hashes)
+
+    def _update_moments(self, values: np.ndarray):
+        mask = ~np.isnan(values)
+        n_b = mask.sum(axis=0).astype(np.float64)
+        filled = np.where(mask, values, 0.0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_b = np.where(n_b > 0, filled.sum(axis=0) / n_b, 0.0)
+        centered = np.where(mask, values - mean_b, 0.0)
+        centered2 = centered ** 2
+        m2_b = centered2.sum(axis=0)
+        m3_b = (centered2 * centered).sum(axis=0)
+        m4_b = (centered2 ** 2).sum(axis=0)
+
+        n_a, mean_a, m2_a, m3_a = self._n, self._mean, self._m2, self._m3
+        n = n_a + n_b
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = mean_b - mean_a
+            ratio = np.where(n > 0, n_b / n, 0.0)
+            cross = np.where(n > 0, n_a * n_b / n, 0.0)
+            self._m4 = (self._m4 + m4_b
+                        + delta ** 4 * cross * np.where(n > 0, (n_a ** 2 - n_a * n_b + n_b ** 2) / n ** 2, 0.0)
+                        + 6 * delta ** 2 * np.where(n > 0, (n_a ** 2 * m2_b + n_b ** 2 * m2_a) / n ** 2, 0.0)
+                        + 4 * delta * np.where(n > 0, (n_a * m3_b - n_b * m3_a) / n, 0.0))
+            self._m3 = (m3_a + m3_b
+                        + delta ** 3 * cross * np.where(n > 0, (n_a - n_b) / n, 0.0)
+                        + 3 * delta * np.where(n > 0, (n_a * m2_b - n_b * m2_a) / n, 0.0))
+        self._m2 = m2_a + m2_b + delta ** 2 * cross
+        self._mean = mean_a + delta * ratio
+        self._n = n
+        self._sum += filled.sum(axis=0)
+
+        with np.errstate(invalid="ignore"):
+            self._min = np.fmin(self._min, np.where(mask, values, np.inf).min(axis=0, initial=np.inf))
+            self._max = np.fmax(self._max, np.where(mask, values, -np.inf).max(axis=0, initial=-np.inf))
+
+    def _update_comoments(self, values: np.ndarray):
+        if self._shift is None:
+            # Called after _update_moments, so these are the first chunk's means
+            self._shift = self._mean.copy()
+        present = (~np.isnan(values)).astype(np.float64)
+        shifted = np.where(present > 0, values - self._shift, 0.0)
+        self._pair_n += present.T @ present
+        self._pair_x += shifted.T @ present
+        self._pair_xx += (shifted ** 2).T @ present
+        self._pair_xy += shifted.T @ shifted
+
+    def finalize(self, keep_sketches: bool = False):
+        """
+        Computes the aggregates from the accumulators. Call once every chunk has been seen.
+        keep_sketches keeps the accumulators (including the duplicate filter) for append().
+        """
+        # Date columns need at least one value, like compact_frame's
+        dates = (self._dates | self._parsed) & ~self._numeric & (self._null_counts < self.row_count)
+        self.numeric_columns = [col for i, col in enumerate(self.columns) if self._numeric[i]]
+        self.object_columns = [col for i, col in enumerate(self.columns) if not self._numeric[i] and not dates[i]]
+        self.categorical_columns = list(self.object_columns)
+        self.datetime_columns = [col for i, col in enumerate(self.columns) if dates[i]]
+        self.column_types = {col: "numeric" if self._numeric[i] else "categorical"
+                             for i, col in enumerate(self.columns)}
+
+        self.null_counts = pd.Series(self._null_counts, index=self.columns)
+        self.total_missing = int(self._null_counts.sum())
+        non_null = self.row_count - self._null_counts
+        distinct = []
+        for i, counter in enumerate(self._distinct):
+            estimate = counter.estimate()
+            # An estimate within the sketch error of the non-null count means "all values differ"
+            if estimate >= non_null[i] * (1 - counter.relative_error):
+                estimate = non_null[i]
+            distinct.append(int(round(min(estimate, non_null[i]))))
+        self.distinct_counts = pd.Series(distinct, index=self.columns)
+        self.distinct_relative_error = max((c.relative_error for c in self._distinct), default=0.0)
+        self.quantile_rank_error = self._quantiles[0].rank_error if self._quantiles else 0.0
+        self.numeric_parse_counts = {col: self._parse_counts[i]
+                                     for i, col in enumerate(self.columns) if not self._numeric[i] and not dates[i]}
+
+        self.numeric_stats = {}
+        for i, col in enumerate(self.columns):
+            if not self._numeric[i]:
+                continue
+            count = np.float64(self._n[i])
+            q1, median, q3 = self._quantiles[i].quantiles([0.25, 0.5, 0.75])
+            with np.errstate(invalid="ignore", divide="ignore"):
+                self.numeric_stats[col] = {
+                    "min": self._min[i] if count > 0 else np.nan,
+                    "max": self._max[i] if count > 0 else np.nan,
+                    "mean": self._sum[i] / count if count > 0 else np.nan,
+                    "std": np.sqrt(self._m2[i] / (count - 1)) if count > 1 else np.nan,
+                    "median": median,
+                    "q1": q1,
+                    "q3": q3,
+                    "skew": _skew_from_moments(count, np.float64(self._m2[i]), np.float64(self._m3[i])),
+                    "kurtosis": _kurtosis_from_moments(count, np.float64(self._m2[i]), np.float64(self._m4[i]))
+                }
+
+        self.correlation_matrix = self._correlation_matrix()
+        self._fences = {col: outlier_bounds(self.numeric_stats[col]) for col in self.numeric_columns}
+        if keep_sketches:
+            self._estimate_outliers()
+        else:
+            # The sketches are no longer needed; keep memory flat for the second pass
+            self._distinct = self._quantiles = self._duplicates = None
+        return self
+
+    @property
+    def duplicate_capacity(self) -> int:
+        """Rows the duplicate filter holds before false positives grow; 0 once the filter is released."""
+        return self._duplicates.size_bits // DUPLICATE_FILTER_BITS_PER_ROW if self._duplicates is not None else 0
+
+    def conform(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """
+        chunk with its all-null columns cast to the type the profile has seen for them
+        (float64 for numbers, datetime64 for parsed dates), so rows without a value
+        (JSON nulls parse as object) do not turn a numeric or date column categorical for good.
+        """
+        casts = {col: np.float64 if self._numeric[i] else 'datetime64[ns]' for i, col in enumerate(self.columns)
+                 if (self._numeric[i] or self._parsed[i]) and col in chunk.columns and chunk[col].isna().all()
+                 and not (pd.api.types.is_numeric_dtype(chunk[col]) if self._numeric[i]
+                          else pd.api.types.is_datetime64_any_dtype(chunk[col]))}
+        return chunk.astype(casts) if casts else chunk
+
+    def append(self, chunk: pd.DataFrame):
+        """
+        Adds rows to a profile finalized with keep_sketches=True and refreshes every aggregate.
+        chunk must have the profile's columns, conformed to its types (see conform).
+        """
+        self.update(chunk)
+        return self.finalize(keep_sketches=True)
+
+    def _estimate_outliers(self):
+        for i, col in enumerate(self.columns):
+            if col not in self._fences:
+                continue
+            lower_bound, upper_bound = self._fences[col]
+            sketch = self._quantiles[i]
+            if sketch.count == 0 or np.isnan(lower_bound) or np.isnan(upper_bound):
+                self._outlier_counts[i] = 0
+                continue
+            outside = sketch.rank(lower_bound) + sketch.count - sketch.rank(upper_bound, inclusive=True)
+            self._outlier_counts[i] = int(round(outside))
+
+    def _correlation_matrix(self) -> pd.DataFrame:
+        index = [i for i, col in enumerate(self.columns) if self._numeric[i]]
+        names = [self.columns[i] for i in index]
+        ix = np.ix_(index, index)
+        n, sx, sxx, sxy = self._pair_n[ix], self._pair_x[ix], self._pair_xx[ix], self._pair_xy[ix]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = sxy - sx * sx.T / n
+            var_x = sxx - sx ** 2 / n
+            var_y = var_x.T
+            corr = cov / np.sqrt(var_x * var_y)
+        corr = np.where(n >= 2, np.clip(corr, -1.0, 1.0), np.nan)
+        return pd.DataFrame(corr, index=names, columns=names)
+
+    # Pass 2
+    def count_outliers(self, chunk: pd.DataFrame):
+        for i, col in enumerate(self.columns):
+            if col in self._fences:
+                lower_bound, upper_bound = self._fences[col]
+                col_data = pd.to_numeric(chunk[col], errors='coerce')
+                self._outlier_counts[i] += int(((col_data < lower_bound) | (col_data > upper_bound)).sum())
+
+    @property
+    def outlier_counts(self) -> dict:
+        return {col: int(self._outlier_counts[i]) for i, col in enumerate(self.columns) if col in self._fences}
+
+    def accuracy(self) -> dict:
+        """
+        Error bounds of the approximate aggregates, reported alongside the results.
+        """
+        return {
+            "approximate": True,
+            "estimated": ["median", "q1", "q3", "iqr", "unique", "outliers", "duplicates"],
+            "quantile_rank_error": self.quantile_rank_error,
+            "distinct_count_relative_error": self.distinct_relative_error
+        }
+
+
+def profile_chunks(make_chunks, columns: list = None, **profile_options) -> ChunkedProfile:
+    """
+    Profiles a dataset in two passes. make_chunks() must return a fresh iterator of
+    DataFrame chunks on every call; only one chunk is held in memory at a time.
+    """
+    profile = None
+    for chunk in make_chunks():
+        if profile is None:
+            profile = ChunkedProfile(columns or chunk.columns, **profile_options)
+        profile.update(chunk)
+    if profile is None:
+        profile = ChunkedProfile(columns or [], **profile_options)
+    profile.finalize()
+    for chunk in make_chunks():
+        profile.count_outliers(chunk)
+    return profile
+
+def duplicate_filter_bits(rows: int) -> int:
+    """
+    Duplicate filter size for a dataset of rows rows with room to double, within
+    DUPLICATE_FILTER_MB, so small datasets do not each hold a full-size filter.
+    """
+    wanted = max(2 * rows, 4096) * DUPLICATE_FILTER_BITS_PER_ROW
+    return int(min(wanted, DUPLICATE_FILTER_MB * 8 * 1024 * 1024))
+
+def profile_appendable(chunks, columns: list, **profile_options) -> ChunkedProfile:
+    """
+    Profiles existing rows in one pass into a profile that accepts append().
+    """
+    profile = ChunkedProfile(columns, **profile_options)
+    for chunk in chunks:
+        profile.update(chunk)
+    return profile.finalize(keep_sketches=True)
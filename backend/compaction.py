@@ -0,0 +1,138 @@
+import os
+import warnings
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+# Text columns become category when at most this share of their values are distinct
+COMPACT_CATEGORY_RATIO = float(os.getenv("COMPACT_CATEGORY_RATIO", "0.5"))
+# Integer columns are narrowed only to widths that hold twice their largest magnitude,
+# so differences of two values (as in the trend summaries) cannot overflow
+_INT_TYPES = (np.int8, np.int16, np.int32)
+
+
+def is_date_column(name) -> bool:
+    """The analyzers' date column heuristic: the name mentions a date or time."""
+    name = str(name).lower()
+    return 'date' in name or 'time' in name
+
+def infer_date_format(values: pd.Series):
+    """
+    strftime format of the first string among the leading values (others may already be
+    timestamps, e.g. after rows were appended), or None when it does not look like a
+    date with a year (bare times such as "10:30" included).
+    """
+    first = next((value for value in values.dropna().iloc[:100] if isinstance(value, str)), None)
+    if first is None:
+        return None
+    date_format = guess_datetime_format(first)
+    if date_format is None or not ('%Y' in date_format or '%y' in date_format):
+        return None
+    return date_format
+
+def parse_dates(values: pd.Series, date_format: str = None) -> pd.Series:
+    """
+    values as datetime64 with one vectorized parse, the format inferred from the first
+    value unless given; unparseable values become NaT.
+    """
+    if date_format is None and values.dtype == object:
+        date_format = infer_date_format(values)
+    with warnings.catch_warnings():
+        # Without a format pandas falls back to (and warns about) parsing value by value
+        warnings.simplefilter("ignore", UserWarning)
+        return pd.to_datetime(values, format=date_format, errors='coerce')
+
+def parse_date_column(values: pd.Series):
+    """
+    values parsed as datetime64 when every value matches the format inferred from the
+    first one, else None. Already parsed columns are returned as they are.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        return values
+    if values.dtype != object:
+        return None
+    date_format = infer_date_format(values)
+    if date_format is None:
+        return None
+    parsed = parse_dates(values, date_format)
+    return parsed if parsed.notna().sum() == values.notna().sum() else None
+
+def compact_frame(df: pd.DataFrame) -> tuple:
+    """
+    Shrinks a freshly parsed frame without changing its values:
+    - integers are downcast to the narrowest safe width (see _INT_TYPES)
+    - float64 columns become float32 when every value survives the round trip
+    - text columns with repeated values (COMPACT_CATEGORY_RATIO) become category,
+      with sorted categories
+    - text columns named like dates (is_date_column) are parsed once, when every value
+      matches the inferred format
+    Returns (frame, report), the frame sharing the untouched columns with df and report
+    being {"bytes_before", "bytes_after", "columns": {column: new dtype}}.
+    """
+    usage = df.memory_usage(index=True, deep=True)
+    before = int(usage.sum())
+    if df.columns.has_duplicates:
+        return df, {"bytes_before": before, "bytes_after": before, "columns": {}}
+
+    columns = {}
+    changed = {}
+    after = before
+    for col in df.columns:
+        values = df[col]
+        compacted = _compact_column(col, values)
+        if compacted is not values:
+            size = int(compacted.memory_usage(index=False, deep=True))
+            if isinstance(compacted.dtype, pd.CategoricalDtype) and size >= int(usage[col]):
+                # Too few rows for the categories to pay for themselves
+                compacted = values
+            else:
+                changed[col] = str(compacted.dtype)
+                after += size - int(usage[col])
+        columns[col] = compacted
+
+    if changed:
+        df = pd.DataFrame(columns, index=df.index, copy=False)
+    return df, {"bytes_before": before, "bytes_after": after, "columns": changed}
+
+def _compact_column(name, values: pd.Series) -> pd.Series:
+    dtype = values.dtype
+    if not isinstance(dtype, np.dtype) or len(values) == 0:
+        return values
+    if dtype.kind in 'iu':
+        return _downcast_int(values)
+    if dtype == np.float64:
+        return _downcast_float(values)
+    if dtype == object:
+        parsed = parse_date_column(values) if is_date_column(name) else None
+        return parsed if parsed is not None else _categorize(values)
+    return values
+
+def _downcast_int(values: pd.Series) -> pd.Series:
+    array = values.to_numpy()
+    bound = 2 * max(abs(int(array.min())), abs(int(array.max())))
+    for int_type in _INT_TYPES:
+        if bound <= np.iinfo(int_type).max:
+            return values.astype(int_type) if array.dtype != int_type else values
+    return values
+
+def _downcast_float(values: pd.Series) -> pd.Series:
+    array = values.to_numpy()
+    narrow = array.astype(np.float32)
+    with np.errstate(invalid='ignore'):
+        exact = (narrow == array) | np.isnan(array)
+    if not exact.all():
+        return values
+    return pd.Series(narrow, index=values.index, name=values.name)
+
+def _categorize(values: pd.Series) -> pd.Series:
+    if pd.api.types.infer_dtype(values, skipna=True) != 'string':
+        return values
+    codes, uniques = pd.factorize(values)
+    if len(uniques) > COMPACT_CATEGORY_RATIO * np.count_nonzero(codes >= 0):
+        return values
+    order = np.argsort(uniques.astype(object))
+    remap = np.empty(len(order), dtype=codes.dtype)
+    remap[order] = np.arange(len(order), dtype=codes.dtype)
+    codes = np.where(codes >= 0, remap[codes], -1)
+    categories = pd.Index(np.asarray(uniques, dtype=object)[order], dtype=object)
+    return pd.Series(pd.Categorical.from_codes(codes, categories=categories), index=values.index, name=values.name)
@@ -0,0 +1,257 @@
+import os
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from compaction import parse_dates
+
+ENCODING_STRATEGIES = ("label", "onehot", "target", "hashing")
+# One-hot encoding hashes columns with more categories than this instead of widening the matrix
+HIGH_CARDINALITY_LEVELS = int(os.getenv("HIGH_CARDINALITY_LEVELS", "50"))
+# Indicator columns per hashed column
+HASHING_BUCKETS = int(os.getenv("HASHING_BUCKETS", "256"))
+# Target encoding: weight, in rows, of the overall mean blended into each category's mean
+TARGET_SMOOTHING = 10.0
+_NS_PER_DAY = 86400 * 10 ** 9
+
+
+def is_categorical(values: pd.Series) -> bool:
+    """Object, string and category columns; these are encoded rather than used as numbers."""
+    return isinstance(values.dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(values.dtype)
+
+def to_categorical(values: pd.Series) -> pd.Series:
+    """
+    values as a category Series whose categories are the sorted str() of the distinct
+    values (LabelEncoder's classes for values.astype(str)), missing values staying missing.
+    Values are hashed as they are and only the distinct ones converted to str, so mixed
+    columns (1 and "1") collapse into one category without a Python str per cell.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        categories = values.cat.categories
+        if pd.api.types.infer_dtype(categories) in ("string", "empty") and categories.is_monotonic_increasing \
+                and categories.is_unique:
+            return values
+        codes, uniques = values.cat.codes.to_numpy(), categories
+    else:
+        codes, uniques = pd.factorize(values)
+
+    labels = pd.Index(np.asarray(uniques, dtype=object)).astype(str).to_numpy(dtype=object)
+    categories, remap = np.unique(labels, return_inverse=True)
+    codes = _take(remap, codes)
+    return pd.Series(pd.Categorical.from_codes(codes, categories=pd.Index(categories, dtype=object)),
+                     index=values.index, name=values.name)
+
+def _take(lookup: np.ndarray, codes: np.ndarray, missing=-1) -> np.ndarray:
+    """lookup[codes], with `missing` where codes is -1."""
+    if len(lookup) == 0:
+        return np.full(len(codes), missing)
+    taken = np.asarray(lookup)[codes]
+    taken[codes < 0] = missing
+    return taken
+
+
+class CategoryEncoder:
+    """
+    Category <-> code mapping of one column, learnt when fitting and reused to encode
+    the rows being scored. Codes index `categories` (sorted labels), -1 meaning missing or unseen.
+    """
+
+    def __init__(self, categories=()):
+        self.categories = pd.Index(categories, dtype=object)
+
+    def fit(self, values: pd.Series):
+        self.categories = to_categorical(values).cat.categories
+        return self
+
+    def partial_fit(self, values: pd.Series):
+        """Adds the categories of another batch of the column."""
+        self.categories = self.categories.union(to_categorical(values).cat.categories)
+        return self
+
+    def codes(self, values: pd.Series) -> np.ndarray:
+        """Codes of values; each distinct value is looked up once, then indexed by the category codes."""
+        values = to_categorical(values)
+        lookup = self.categories.get_indexer(values.cat.categories)
+        return _take(lookup, values.cat.codes.to_numpy().astype(np.intp))
+
+    def labels(self, codes: np.ndarray) -> np.ndarray:
+        return self.categories.to_numpy()[np.asarray(codes, dtype=np.intp)]
+
+    def __len__(self) -> int:
+        return len(self.categories)
+
+
+class FeatureEncoder:
+    """
+    Turns feature columns into a model matrix. Numeric columns are used as they are
+    (NaN as 0). Date columns (datetime64 when fitting, as compact_frame stores them)
+    become days since the epoch, parsed with compaction.parse_dates when transforming
+    so rows sent as text score alike; missing dates take the training mean. Categorical
+    ones (is_categorical, or the given `categorical` names) are encoded by `strategy`:
+    - label: one column of category codes (-1 for missing or unseen categories)
+    - onehot: one indicator column per category, sparse; missing and unseen categories
+      get each indicator's training mean, so they score like an average row rather than
+      like the intercept alone. Columns with more than max_levels categories are hashed instead
+    - target: one column with the category's mean target, smoothed towards the overall
+      mean (the label code for classifiers, so best suited to regression and binary targets)
+    - hashing: `buckets` indicator columns per column, chosen by hashing the category
+      label, so categories need not be known in advance
+    transform returns a DataFrame for label and target encoding, a scipy CSR matrix otherwise.
+    """
+
+    def __init__(self, strategy: str = 'label', categorical: list = None, max_levels: int = HIGH_CARDINALITY_LEVELS,
+                 buckets: int = HASHING_BUCKETS, smoothing: float = TARGET_SMOOTHING):
+        if strategy not in ENCODING_STRATEGIES:
+            raise ValueError(f"Unknown encoding: {strategy}. Use one of {', '.join(ENCODING_STRATEGIES)}")
+        self.strategy = strategy
+        self.categorical = None if categorical is None else set(categorical)
+        self.max_levels = max_levels
+        self.buckets = buckets
+        self.smoothing = smoothing
+        self.columns = []
+        self.encoders = {}       # categorical column -> CategoryEncoder (not for hashed columns)
+        self.methods = {}        # column -> 'numeric', 'date', 'label', 'onehot', 'target' or 'hashing'
+        self.date_means = {}     # date column -> (rows with a date, their mean days since the epoch)
+        self.target_means = {}   # target-encoded column -> smoothed mean per code
+        self.indicator_means = {}  # one-hot column -> training mean of each indicator
+        self.prior = 0.0
+
+    @property
+    def sparse(self) -> bool:
+        return any(method in ("onehot", "hashing") for method in self.methods.values())
+
+    @property
+    def feature_names(self) -> list:
+        """Names of the matrix columns, e.g. "city=Paris" (one-hot) or "city#17" (hashing)."""
+        names = []
+        for col in self.columns:
+            method = self.methods[col]
+            if method == "onehot":
+                names += [f"{col}={level}" for level in self.encoders[col].categories]
+            elif method == "hashing":
+                names += [f"{col}#{bucket}" for bucket in range(self.buckets)]
+            else:
+                names.append(col)
+        return names
+
+    def fit(self, X: pd.DataFrame, y=None):
+        """Learns the categories (and per-category target means for target encoding, from y) of X's columns."""
+        if self.strategy == "target" and y is None:
+            raise ValueError("Target encoding needs the target values")
+        self.columns, self.encoders, self.methods, self.target_means = list(X.columns), {}, {}, {}
+        self.date_means = {}
+        self.partial_fit(X)
+        self.indicator_means = {}
+        for col, encoder in self.encoders.items():
+            if self.methods[col] == "onehot":
+                codes = encoder.codes(X[col])
+                self.indicator_means[col] = np.bincount(codes[codes >= 0], minlength=len(encoder)) / max(len(codes), 1)
+
+        if self.strategy == "target":
+            y = np.asarray(y, dtype=np.float64)
+            self.prior = float(y.mean()) if len(y) else 0.0
+            for col, encoder in self.encoders.items():
+                codes = encoder.codes(X[col])
+                seen = codes >= 0
+                sums = np.bincount(codes[seen], weights=y[seen], minlength=len(encoder))
+                counts = np.bincount(codes[seen], minlength=len(encoder))
+                self.target_means[col] = (sums + self.smoothing * self.prior) / (counts + self.smoothing)
+        return self
+
+    def partial_fit(self, X: pd.DataFrame):
+        """
+        Adds the categories of another batch of rows, for data read in chunks.
+        Target encoding needs all rows at once (fit).
+        """
+        if not self.columns:
+            self.columns = list(X.columns)
+        for col in self.columns:
+            if self.methods.get(col, "numeric") == "hashing":
+                continue
+            values = X[col]
+            if self.methods.get(col) == "date" or pd.api.types.is_datetime64_any_dtype(values.dtype):
+                self.methods[col] = "date"
+                days = _days(values)
+                if len(days) and not np.isnan(days).all():
+                    # Running mean over the batches seen so far
+                    count, mean = self.date_means.get(col, (0, 0.0))
+                    seen = np.count_nonzero(~np.isnan(days))
+                    mean += (np.nanmean(days) - mean) * seen / (count + seen)
+                    self.date_means[col] = (count + seen, mean)
+                continue
+            categorical = col in self.categorical if self.categorical is not None else is_categorical(values)
+            if not categorical:
+                self.methods[col] = "numeric"
+                continue
+            if self.strategy == "hashing":
+                self.methods[col] = "hashing"
+                continue
+            encoder = self.encoders.setdefault(col, CategoryEncoder())
+            encoder.partial_fit(values)
+            self.methods[col] = self.strategy
+            if self.strategy == "onehot" and len(encoder) > self.max_levels:
+                self.methods[col] = "hashing"
+                del self.encoders[col]
+        return self
+
+    def transform(self, X: pd.DataFrame):
+        """Model matrix of X's rows, with the fitted categories (unseen ones: -1, no indicator, or the prior)."""
+        blocks = []
+        for col in self.columns:
+            method, values = self.methods[col], X[col]
+            if method == "numeric":
+                blocks.append((col, pd.to_numeric(values, errors='coerce').fillna(0)))
+            elif method == "date":
+                days = _days(values)
+                blocks.append((col, np.where(np.isnan(days), self.date_means.get(col, (0, 0.0))[1], days)))
+            elif method == "label":
+                blocks.append((col, self.encoders[col].codes(values)))
+            elif method == "target":
+                blocks.append((col, _take(self.target_means[col], self.encoders[col].codes(values), self.prior)))
+            elif method == "onehot":
+                blocks.append((col, _indicators(self.encoders[col].codes(values), len(self.encoders[col]),
+                                                self.indicator_means.get(col))))
+            else:
+                blocks.append((col, _indicators(_hash_buckets(values, self.buckets), self.buckets)))
+
+        if not self.sparse:
+            return pd.DataFrame(dict(blocks), index=X.index)
+        matrices = [block if sparse.issparse(block) else sparse.csr_matrix(np.asarray(block, dtype=np.float64).reshape(-1, 1))
+                    for _, block in blocks]
+        return sparse.hstack(matrices, format='csr', dtype=np.float64)
+
+
+def _days(values: pd.Series) -> np.ndarray:
+    """Days since the epoch of values (dates or date text), NaN where missing or unparseable."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype(object)
+    if not pd.api.types.is_datetime64_any_dtype(values.dtype):
+        values = parse_dates(values)
+    if getattr(values.dt, "tz", None) is not None:
+        values = values.dt.tz_convert(None)
+    ns = values.to_numpy(dtype='datetime64[ns]')
+    days = ns.view(np.int64) / _NS_PER_DAY
+    days[np.isnat(ns)] = np.nan
+    return days
+
+def _indicators(codes: np.ndarray, width: int, fill: np.ndarray = None) -> sparse.csr_matrix:
+    """
+    CSR matrix with a 1 at (row, code) for each row whose code is not -1; rows with
+    code -1 are empty, or a copy of fill when given.
+    """
+    rows = np.flatnonzero(codes >= 0)
+    matrix = sparse.csr_matrix((np.ones(len(rows)), (rows, codes[rows])), shape=(len(codes), width))
+    unknown = np.flatnonzero(codes < 0)
+    if fill is None or len(unknown) == 0:
+        return matrix
+    filled = sparse.csr_matrix(np.ones((len(unknown), 1)) * np.asarray(fill, dtype=np.float64).reshape(1, -1))
+    placement = sparse.csr_matrix((np.ones(len(unknown)), (unknown, np.arange(len(unknown)))),
+                                  shape=(len(codes), len(unknown)))
+    return (matrix + placement @ filled).tocsr()
+
+def _hash_buckets(values: pd.Series, buckets: int) -> np.ndarray:
+    """Bucket of each value by hashing its label (once per distinct value), -1 for missing values."""
+    values = to_categorical(values)
+    labels = values.cat.categories.to_numpy(dtype=object)
+    per_category = (pd.util.hash_array(labels, categorize=False) % np.uint64(buckets)).astype(np.intp)
+    return _take(per_category, values.cat.codes.to_numpy().astype(np.intp))
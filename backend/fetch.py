@@ -0,0 +1,152 @@
+import os
+import json
+import uuid
+import hashlib
+
+import httpx
+from fastapi import HTTPException
+
+from cache import DATAFLOW_CACHE_DIR, private_dir
+
+# Largest remote file /import-url downloads
+IMPORT_URL_MAX_MB = int(os.getenv("IMPORT_URL_MAX_MB", "512"))
+IMPORT_URL_TIMEOUT_SECONDS = float(os.getenv("IMPORT_URL_TIMEOUT_SECONDS", "60"))
+# Local copies of remote sources, kept for conditional revalidation; oldest beyond the budget are removed
+IMPORT_URL_CACHE_MB = int(os.getenv("IMPORT_URL_CACHE_MB", "4096"))
+# Kept private (cache.private_dir): the copies are user data and the validators are trusted on a 304
+IMPORT_URL_CACHE_DIR = os.getenv("IMPORT_URL_CACHE_DIR", os.path.join(DATAFLOW_CACHE_DIR, "remote"))
+# Bytes written to the spool file per iteration
+DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+
+
+class RemoteFetcher:
+    """
+    Downloads remote datasets with one pooled async HTTP client, streaming the body
+    to a spool file within a size limit. The local copy and its ETag/Last-Modified
+    validators are kept, so polling an unchanged source costs a 304, not a download.
+    cache_dir must be private to the current user (cache.private_dir).
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, cache_budget_bytes: int, timeout: float):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.cache_budget_bytes = cache_budget_bytes
+        self.timeout = timeout
+        self._client = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                follow_redirects=True,
+                timeout=httpx.Timeout(self.timeout, connect=min(10.0, self.timeout))
+            )
+        return self._client
+
+    async def fetch(self, url: str) -> dict:
+        """
+        Returns a local copy of url, revalidating a previous download when there is one:
+        {"url", "path", "content_type", "sha256", "size", "etag", "last_modified", "not_modified"},
+        not_modified being True when the copy was served after a 304.
+        Raises HTTPException(413) for bodies over max_bytes; HTTP errors propagate as httpx errors.
+        """
+        base = os.path.join(private_dir(self.cache_dir), hashlib.sha256(url.encode("utf-8")).hexdigest())
+        cached = _read_meta(f"{base}.json")
+        # Only a copy this fetcher wrote for this url is trusted
+        if cached is not None and (cached.get("url") != url or cached.get("path") != f"{base}.data"
+                                   or not os.path.exists(cached["path"])):
+            cached = None
+
+        headers = {}
+        if cached is not None:
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        async with self._get_client().stream("GET", url, headers=headers) as response:
+            if response.status_code == 304 and cached is not None:
+                os.utime(cached["path"])
+                return {**cached, "not_modified": True}
+            response.raise_for_status()
+
+            declared = response.headers.get("Content-Length")
+            if declared and declared.isdigit() and int(declared) > self.max_bytes:
+                raise _too_large(self.max_bytes)
+
+            # 1. Stream to a spool file, hashing as we go
+            spool_path = f"{base}.{uuid.uuid4().hex}.part"
+            digest = hashlib.sha256()
+            size = 0
+            try:
+                with open(spool_path, 'wb') as spool:
+                    async for block in response.aiter_bytes(DOWNLOAD_CHUNK_BYTES):
+                        size += len(block)
+                        if size > self.max_bytes:
+                            raise _too_large(self.max_bytes)
+                        digest.update(block)
+                        spool.write(block)
+                # 2. Swap the new copy in; a concurrent import still reading the old one keeps its handle
+                os.replace(spool_path, f"{base}.data")
+            finally:
+                if os.path.exists(spool_path):
+                    os.remove(spool_path)
+
+            remote = {
+                "url": url,
+                "path": f"{base}.data",
+                "content_type": response.headers.get("Content-Type", ""),
+                "sha256": digest.hexdigest(),
+                "size": size,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "not_modified": False
+            }
+
+        # 3. Keep the validators next to the copy for the next import
+        _write_meta(f"{base}.json", remote)
+        self._enforce_budget(keep=remote["path"])
+        return remote
+
+    def _enforce_budget(self, keep: str):
+        copies = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".data"):
+                path = os.path.join(self.cache_dir, name)
+                stat = os.stat(path)
+                copies.append((stat.st_mtime, path, stat.st_size))
+        total = sum(size for _, _, size in copies)
+        for _, path, size in sorted(copies):
+            if total <= self.cache_budget_bytes:
+                break
+            if path == keep:
+                continue
+            for stale in (path, path[:-len(".data")] + ".json"):
+                if os.path.exists(stale):
+                    os.remove(stale)
+            total -= size
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Remote file exceeds the {max_bytes // (1024 * 1024)} MB import limit")
+
+def _read_meta(path: str):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_meta(path: str, remote: dict):
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'w', encoding="utf-8") as f:
+        json.dump(remote, f)
+    os.replace(tmp_path, path)
+
+
+remote_fetcher = RemoteFetcher(IMPORT_URL_CACHE_DIR, IMPORT_URL_MAX_MB * 1024 * 1024,
+                               IMPORT_URL_CACHE_MB * 1024 * 1024, IMPORT_URL_TIMEOUT_SECONDS)
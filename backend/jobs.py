@@ -0,0 +1,159 @@
+import os
+import time
+import uuid
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+
+from fastapi import HTTPException
+
+# Seconds a finished job (and its result) stays available for polling
+JOB_RESULT_TTL_SECONDS = int(os.getenv("JOB_RESULT_TTL_SECONDS", "3600"))
+# Jobs queued or running at once; further submissions get 503
+JOB_MAX_ACTIVE = int(os.getenv("JOB_MAX_ACTIVE", "16"))
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class Job:
+    """
+    A background analysis, split into named stages that report progress as they run.
+    """
+
+    def __init__(self, kind: str, stages: list):
+        self.job_id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "queued"
+        self.stages = [{"name": name, "status": "pending", "detail": None} for name in stages]
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._task = None
+        self._lock = threading.Lock()
+
+    def _stage(self, name: str) -> dict:
+        for stage in self.stages:
+            if stage["name"] == name:
+                return stage
+        raise KeyError(name)
+
+    @asynccontextmanager
+    async def stage(self, name: str):
+        """
+        Marks a stage running for the duration of the block, then done (or failed).
+        """
+        stage = self._stage(name)
+        with self._lock:
+            stage.update(status="running", started_at=time.time())
+        try:
+            yield stage
+        except asyncio.CancelledError:
+            with self._lock:
+                stage.update(status="cancelled", finished_at=time.time())
+            raise
+        except Exception:
+            with self._lock:
+                stage.update(status="failed", finished_at=time.time())
+            raise
+        with self._lock:
+            stage.update(status="done", finished_at=time.time())
+
+    def report(self, name: str, detail: str):
+        """Sets a progress note on a running stage, e.g. '2/5 files'."""
+        with self._lock:
+            self._stage(name)["detail"] = detail
+
+    @property
+    def progress(self) -> float:
+        finished = sum(1 for stage in self.stages if stage["status"] == "done")
+        return finished / len(self.stages) if self.stages else 1.0
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "job_id": self.job_id,
+                "kind": self.kind,
+                "status": self.status,
+                "progress": self.progress,
+                "stages": [dict(stage) for stage in self.stages],
+                "result": self.result,
+                "error": self.error,
+                "created_at": self.created_at,
+                "finished_at": self.finished_at
+            }
+
+
+class JobManager:
+    """
+    Runs jobs as asyncio tasks on the server's event loop; the heavy stages inside
+    them go through the worker pool. Finished jobs expire after ttl_seconds.
+    """
+
+    def __init__(self, ttl_seconds: int, max_active: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_active = max_active
+        self._jobs = {}
+
+    def submit(self, kind: str, stages: list, run) -> Job:
+        """
+        Starts run(job) in the background and returns the job at once.
+        run is a coroutine function whose return value becomes the job result.
+        """
+        self._purge_expired()
+        active = sum(1 for job in self._jobs.values() if job.status in ACTIVE_STATUSES)
+        if active >= self.max_active:
+            raise HTTPException(status_code=503, detail="Too many jobs in progress, please retry shortly",
+                                headers={"Retry-After": "10"})
+        job = Job(kind, stages)
+        self._jobs[job.job_id] = job
+        job._task = asyncio.create_task(self._execute(job, run))
+        return job
+
+    async def _execute(self, job: Job, run):
+        job.status = "running"
+        try:
+            job.result = await run(job)
+            job.status = "succeeded"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+        except HTTPException as e:
+            job.status = "failed"
+            job.error = e.detail
+        except Exception as e:
+            print(f"Job {job.job_id} failed: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id: str) -> Job:
+        """Raises KeyError for unknown or expired ids."""
+        self._purge_expired()
+        return self._jobs[job_id]
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancels a queued or running job (returns True), or forgets a finished one (False).
+        A stage already running in a worker process finishes there, but its result is dropped.
+        """
+        job = self.get(job_id)
+        if job.status not in ACTIVE_STATUSES:
+            self._jobs.pop(job_id)
+            return False
+        if job.status == "queued":
+            # The task has not started yet, so _execute will not record the cancellation
+            job.status = "cancelled"
+            job.finished_at = time.time()
+        job._task.cancel()
+        return True
+
+    def _purge_expired(self):
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and now - job.finished_at > self.ttl_seconds]
+        for job_id in expired:
+            self._jobs.pop(job_id)
+
+
+job_manager = JobManager(JOB_RESULT_TTL_SECONDS, JOB_MAX_ACTIVE)
@@ -1,10 +1,13 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Request
+from fastapi.responses import StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 import pandas as pd
+import numpy as np
 import io
+import asyncio
+import json
 import uvicorn
 import os
-import requests
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -14,16 +17,48 @@ import sys
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from processing import (
-    process_data, detect_domain, detect_anomalies, generate_summary, 
-    generate_kpis, merge_datasets,
-    calculate_quality_score, generate_recommendations, 
-    compare_datasets, calculate_advanced_correlations,
-    read_csv_smart, read_excel_smart
+    detect_anomalies, generate_recommendations,
+    compare_datasets, calculate_advanced_correlations, read_csv_file, sniff_csv_file,
+    read_csv_smart, append_csv_file, correlation_heatmap, HEATMAP_MAX_COLUMNS, HEATMAP_METHODS,
+    HEATMAP_SELECTIONS
+)
+from ml import fit_model, fit_model_chunked, sweep_models, STREAMING_TRAIN_ROWS, TRAIN_CHUNK_ROWS, SCORE_CHUNK_ROWS
+from models import model_cache, model_key, frame_fingerprint
+from profiling import ApproximateProfile, APPROX_QUANTILE_ERROR, APPROX_DISTINCT_ERROR
+from correlation import CORRELATION_METHODS
+from encoding import ENCODING_STRATEGIES
+from compaction import compact_frame
+from pipeline import (
+    analyze_upload, analyze_upload_file, analyze_frames, analyze_profile, profile_csv_file, merge_and_analyze,
+    read_upload, concat_uploads, combined_upload_name,
+    summarize_frame, assess_frame, correlate_frame, build_result
+)
+from store import (
+    dataset_store, save_to_store, load_from_store, load_profile, iter_dataset_chunks, DATASET_STORE_DIR,
+    DatasetTooLarge
+)
+from chunked import CHUNK_ROWS
+from workers import worker_pool
+from jobs import job_manager
+from cache import result_cache, content_key, digest_key, private_dir
+from fetch import remote_fetcher
+from transport import (
+    NDJSON_MEDIA_TYPE, ARROW_STREAM_MEDIA_TYPE, PARQUET_MEDIA_TYPE,
+    negotiate_format, columnar_available, iter_ndjson, dataset_json, render_json, iter_frames_ndjson, iter_frames_csv,
+    frame_to_arrow, arrow_to_frame, frame_to_parquet, parquet_to_frame, MATRIX_ENCODINGS
 )
-from ml import train_and_predict
 from datetime import datetime
+import uuid
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    worker_pool.shutdown()
+    result_cache.shutdown()
+    model_cache.shutdown()
+    await remote_fetcher.close()
+
+app = FastAPI(lifespan=lifespan)
 
 # Enable CORS for frontend communication
 app.add_middleware(
@@ -39,251 +74,728 @@ async def root():
 
 @app.get("/health")
 async def health():
-    return {"status": "ok"}
+    return {"status": "ok", "workers": worker_pool.stats(), "result_cache": result_cache.stats(),
+            "model_cache": model_cache.stats()}
+
+async def _load_profile(payload: dict, id_key: str = 'dataset_id', wait: bool = False):
+    """
+    Returns the cached profile of a stored dataset, or None for raw-record payloads.
+    A profile built on first use is built on a worker thread.
+    """
+    dataset_id = payload.get(id_key)
+    return await worker_pool.run_thread(load_profile, dataset_id, wait=wait) if dataset_id else None
+
+def _is_oversized(payload: dict, id_key: str = 'dataset_id') -> bool:
+    """
+    Whether payload references a stored dataset too large to load whole
+    (DatasetStore.is_oversized); only its profile and chunks can be used.
+    """
+    dataset_id = payload.get(id_key)
+    try:
+        return bool(dataset_id) and dataset_store.is_oversized(dataset_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset id: {dataset_id}")
+
+def _too_large(dataset_id: str, hint: str = None) -> HTTPException:
+    detail = f"Dataset {dataset_id} is larger than the server's memory budget and cannot be loaded whole"
+    return HTTPException(status_code=413, detail=f"{detail}; {hint}" if hint else detail)
+
+async def _load_frame(payload: dict, data_key: str = 'data', id_key: str = 'dataset_id', wait: bool = False):
+    """
+    Returns the DataFrame referenced by payload[id_key], or built from the raw
+    records in payload[data_key] for older clients. None when neither is given.
+    Stored datasets too large to load whole are refused with a 413. Reading back
+    a spilled dataset and building frames from records run on a worker thread.
+    """
+    dataset_id = payload.get(id_key)
+    if dataset_id:
+        try:
+            return await worker_pool.run_thread(load_from_store, dataset_id, wait=wait)
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"Unknown dataset id: {dataset_id}")
+        except DatasetTooLarge:
+            raise _too_large(dataset_id)
+    data = payload.get(data_key)
+    if not data:
+        return None
+    return await worker_pool.run_thread(pd.DataFrame, data, wait=wait)
+
+async def _dataset_response(request: Request, result: dict, df: pd.DataFrame):
+    """
+    Attaches the dataset rows to an analysis result, encoded per the Accept header:
+    - application/x-ndjson: summary line first, then the rows streamed in chunks
+    - application/vnd.apache.arrow.stream / application/vnd.apache.parquet: the rows
+      as a columnar table, with the summary as JSON under the "summary" schema metadata key
+    - anything else: one JSON object with a "data" list of records
+    Encoding runs on the worker threads; NDJSON chunks are encoded as they are sent.
+    """
+    response_format = negotiate_format(request.headers.get('accept'))
+    if response_format == "ndjson":
+        return StreamingResponse(iter_ndjson(result, df), media_type=NDJSON_MEDIA_TYPE)
+    if response_format in ("arrow", "parquet"):
+        if not columnar_available():
+            raise HTTPException(status_code=406, detail="Arrow/Parquet responses require pyarrow on the server")
+        metadata = {"summary": result} if result else None
+        if response_format == "arrow":
+            return Response(await worker_pool.run_thread(frame_to_arrow, df, metadata), media_type=ARROW_STREAM_MEDIA_TYPE)
+        return Response(await worker_pool.run_thread(frame_to_parquet, df, metadata), media_type=PARQUET_MEDIA_TYPE)
+
+    return Response(await worker_pool.run_thread(dataset_json, result, df), media_type="application/json")
+
+def _check_error_bounds(quantile_error: float, distinct_error: float):
+    for name, value in (("quantile_error", quantile_error), ("distinct_error", distinct_error)):
+        if not 0 < value < 0.5:
+            raise HTTPException(status_code=400, detail=f"{name} must be between 0 and 0.5")
+
+async def _read_frame_body(request: Request) -> pd.DataFrame:
+    """
+    Parses a dataset sent as the request body: Arrow IPC stream, Parquet, CSV, or a JSON list of records.
+    """
+    content_type = request.headers.get('content-type', '')
+    body = await request.body()
+    if ARROW_STREAM_MEDIA_TYPE in content_type or PARQUET_MEDIA_TYPE in content_type:
+        if not columnar_available():
+            raise HTTPException(status_code=415, detail="Arrow/Parquet uploads require pyarrow on the server")
+        reader = arrow_to_frame if ARROW_STREAM_MEDIA_TYPE in content_type else parquet_to_frame
+        df, _ = reader(body)
+        return df
+    if 'text/csv' in content_type:
+        return await worker_pool.run_cpu(read_csv_smart, body)
+    if 'json' in content_type:
+        records = json.loads(body)
+        if not isinstance(records, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON list of records")
+        return pd.DataFrame(records)
+    raise HTTPException(status_code=415, detail=f"Unsupported content type: {content_type or 'none'}")
+
+@app.post("/datasets")
+async def register_dataset(request: Request, filename: str = None):
+    """
+    Registers a dataset sent as Arrow IPC, Parquet or JSON records and returns its id,
+    for use with dataset_id in the analysis endpoints.
+    """
+    try:
+        df = await _read_frame_body(request)
+        df, memory = await worker_pool.run_thread(compact_frame, df)
+        dataset_id = save_to_store(df, filename)
+        return {"dataset_id": dataset_id, "rows": len(df), "columns": list(df.columns), "memory": memory}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not read dataset: {str(e)}")
+
+@app.post("/datasets/{dataset_id}/append")
+async def append_to_dataset(dataset_id: str, request: Request):
+    """
+    Appends rows, sent like POST /datasets, to a stored dataset and returns the refreshed
+    analysis (as /upload-large: profile-driven, no KPIs, rows via /datasets/{id}/data).
+    Only the new rows are profiled: the dataset keeps an appendable profile whose counts,
+    moments, co-moments, duplicate filter and sketches are updated in place. Datasets
+    held in memory are still stacked and compacted again in full (see DatasetStore.append).
+    """
+    try:
+        info = dataset_store.info(dataset_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset id: {dataset_id}")
+    try:
+        rows = await _read_frame_body(request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not read rows: {str(e)}")
+
+    unknown = [col for col in rows.columns if col not in info["columns"]]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Columns not in the dataset: {', '.join(map(str, unknown))}")
+    # Columns missing from the new rows are appended as empty
+    rows = rows.reindex(columns=info["columns"])
+
+    try:
+        profile = await worker_pool.run_thread(dataset_store.append, dataset_id, rows)
+        result = await worker_pool.run_thread(analyze_profile, profile, info["filename"])
+        result["dataset_id"] = dataset_id
+        result["appended_rows"] = len(rows)
+        return Response(await worker_pool.run_thread(render_json, result), media_type="application/json")
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset id: {dataset_id}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error appending to dataset: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/datasets/{dataset_id}/data")
+async def dataset_data(dataset_id: str, request: Request):
+    """
+    Returns the rows of a stored dataset, negotiated like the upload responses.
+    Datasets too large to load whole are only sent as NDJSON, read chunk by chunk.
+    """
+    if _is_oversized({"dataset_id": dataset_id}):
+        if negotiate_format(request.headers.get('accept')) != "ndjson":
+            raise _too_large(dataset_id, f"request it with Accept: {NDJSON_MEDIA_TYPE}")
+        return StreamingResponse(iter_frames_ndjson({"dataset_id": dataset_id}, iter_dataset_chunks(dataset_id, CHUNK_ROWS)),
+                                 media_type=NDJSON_MEDIA_TYPE)
+    try:
+        df = await worker_pool.run_thread(load_from_store, dataset_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset id: {dataset_id}")
+    return await _dataset_response(request, {"dataset_id": dataset_id}, df)
+
+@app.get("/datasets/{dataset_id}")
+async def dataset_info(dataset_id: str):
+    try:
+        return dataset_store.info(dataset_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset id: {dataset_id}")
+
+@app.delete("/datasets/{dataset_id}")
+async def delete_dataset(dataset_id: str):
+    try:
+        dataset_store.delete(dataset_id)
+        return {"status": "deleted", "dataset_id": dataset_id}
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset id: {dataset_id}")
+
+def _upload_cache_options(kind: str, sheet_name=None, approximate: bool = False,
+                          quantile_error: float = APPROX_QUANTILE_ERROR,
+                          distinct_error: float = APPROX_DISTINCT_ERROR) -> dict:
+    """
+    The upload options that change the parsed frame or the analysis, for the result cache key.
+    """
+    options = {"kind": kind, "sheet_name": sheet_name, "approximate": approximate}
+    if approximate:
+        options.update(quantile_error=quantile_error, distinct_error=distinct_error)
+    return options
+
+async def _analyze_upload_cached(key: str, filename: str, analyze, *args) -> tuple:
+    """
+    Runs analyze(*args) (analyze_upload or analyze_upload_file) behind the result cache:
+    content seen before with the same options skips parsing and every analyzer.
+    Returns (df, profile, result) like analyze_upload.
+    """
+    cached = await worker_pool.run_thread(result_cache.get, key)
+    if cached is not None:
+        df, profile, result = cached
+    else:
+        # Parsing and every analyzer run in a worker process, off the event loop
+        df, profile, result = await worker_pool.run_cpu(analyze, *args)
+        await worker_pool.run_thread(result_cache.put, key, df, profile, result)
+    result["filename"] = filename
+    return df, profile, result
 
 @app.post("/import-url")
-async def import_from_url(url: str):
+async def import_from_url(url: str, request: Request):
+    """
+    Downloads url (streamed to a local copy, see RemoteFetcher) and analyzes it like /upload.
+    Re-importing an unchanged source only costs a conditional request that answers 304,
+    and the analysis of the local copy then comes from the result cache.
+    """
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        
+        remote = await remote_fetcher.fetch(url)
+        content_type = remote["content_type"] or ''
+
         # Determine file type from URL or content
-        sheet_names = []
-        active_sheet = None
-        
-        if url.endswith('.csv') or 'text/csv' in response.headers.get('Content-Type', ''):
-            df = read_csv_smart(response.content)
-        elif url.endswith(('.xlsx', '.xls')) or 'application/vnd' in response.headers.get('Content-Type', ''):
-            df, sheet_names, active_sheet = read_excel_smart(response.content)
+        if url.endswith('.csv') or 'text/csv' in content_type:
+            kind = 'csv'
+        elif url.endswith(('.xlsx', '.xls')) or 'application/vnd' in content_type:
+            kind = 'excel'
         else:
             # Try smart CSV as fallback
-            df = read_csv_smart(response.content)
+            kind = 'csv'
+
+        filename = url.split('/')[-1] or "remote_dataset"
 
-        df_clean = df.where(pd.notnull(df), None)
-        data = df_clean.to_dict(orient='records')
-        
         # Comprehensive processing
-        stats = process_data(df)
-        domain = detect_domain(df)
-        anomalies = detect_anomalies(df)
-        summary = generate_summary(df, stats, domain)
-        kpis = generate_kpis(df, domain)
-        quality_score = calculate_quality_score(df)
-        recommendations = generate_recommendations(df)
-        
-        result = {
-            "filename": url.split('/')[-1] or "remote_dataset",
-            "data": data,
-            "domain": domain,
-            "columns": list(df.columns),
-            "stats": stats,
-            "anomalies": anomalies,
-            "summary": summary,
-            "kpis": kpis,
-            "quality_score": quality_score,
-            "recommendations": recommendations,
-            "sheet_names": sheet_names,
-            "active_sheet": active_sheet,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        save_to_store(result["filename"], result)
-        return result
+        key = digest_key(remote["sha256"], **_upload_cache_options(kind))
+        df, profile, result = await _analyze_upload_cached(key, filename, analyze_upload_file, remote["path"], filename, kind)
+        result["dataset_id"] = save_to_store(df, filename, profile)
+        result["timestamp"] = datetime.now().isoformat()
+        result["source"] = {field: remote[field] for field in ("url", "size", "etag", "last_modified", "not_modified")}
+
+        return await _dataset_response(request, result, df)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to fetch data from URL: {str(e)}")
 
 @app.post("/upload")
-async def upload_file(file: UploadFile = File(...), sheet_name: str = Form(None)):
+async def upload_file(request: Request, file: UploadFile = File(...), sheet_name: str = Form(None),
+                      approximate: bool = False, quantile_error: float = APPROX_QUANTILE_ERROR,
+                      distinct_error: float = APPROX_DISTINCT_ERROR):
+    """
+    With approximate=true, quartiles and distinct counts are estimated with sketches
+    (see ApproximateProfile); the response's "accuracy" lists the estimated figures.
+    """
     if not file.filename.endswith(('.csv', '.xlsx', '.xls')):
         raise HTTPException(status_code=400, detail="Invalid file format")
+    _check_error_bounds(quantile_error, distinct_error)
     
     content = await file.read()
-    sheet_names = []
-    active_sheet = None
+    kind = 'csv' if file.filename.endswith('.csv') else 'excel'
     
     try:
-        if file.filename.endswith('.csv'):
-            df = read_csv_smart(content)
-        else:
-            df, sheet_names, active_sheet = read_excel_smart(content, sheet_name=sheet_name)
-        
-        # Replace NaN with None for JSON serialization compatibility
-        df_clean = df.where(pd.notnull(df), None)
-        
-        # Process data for stats
-        stats = process_data(df)
-        
-        # Smart Analysis
-        domain = detect_domain(df)
-        anomalies = detect_anomalies(df)
-        summary = generate_summary(df, stats, domain)
-        kpis = generate_kpis(df, domain)
-        
-        # Quality & Recommendations
-        quality_score = calculate_quality_score(df)
-        recommendations = generate_recommendations(df)
-        
-        # Advanced Correlations
-        correlations = calculate_advanced_correlations(df)
-        
-        return {
-            "filename": file.filename,
-            "rows": len(df),
-            "columns": list(df.columns),
-            "stats": stats,
-            "data": df_clean.to_dict(orient="records"),
-            "domain": domain,
-            "anomalies": anomalies,
-            "summary": summary,
-            "kpis": kpis,
-            "quality_score": quality_score,
-            "recommendations": recommendations,
-            "correlations": correlations,
-            "sheet_names": sheet_names,
-            "active_sheet": active_sheet
-        }
+        options = _upload_cache_options(kind, sheet_name, approximate, quantile_error, distinct_error)
+        key = await worker_pool.run_thread(content_key, content, **options)
+        df, profile, result = await _analyze_upload_cached(
+            key, file.filename, analyze_upload, content, file.filename, kind, sheet_name,
+            approximate, quantile_error, distinct_error
+        )
+        result["dataset_id"] = save_to_store(df, file.filename, profile)
+        return await _dataset_response(request, result, df)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error processing file: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Bytes read from the request per iteration while spooling a large upload to disk
+UPLOAD_SPOOL_CHUNK_BYTES = 1024 * 1024
+# Rows returned inline by /upload-large; the full dataset stays available by dataset_id
+LARGE_UPLOAD_PREVIEW_ROWS = int(os.getenv("LARGE_UPLOAD_PREVIEW_ROWS", "1000"))
+
+async def _spool_upload(file: UploadFile, path: str):
+    """Writes an uploaded file to path block by block."""
+    with open(path, 'wb') as spool:
+        while True:
+            block = await file.read(UPLOAD_SPOOL_CHUNK_BYTES)
+            if not block:
+                break
+            spool.write(block)
+
+@app.post("/upload-large")
+async def upload_large_file(request: Request, file: UploadFile = File(...),
+                            quantile_error: float = APPROX_QUANTILE_ERROR,
+                            distinct_error: float = APPROX_DISTINCT_ERROR):
+    """
+    Streaming variant of /upload for CSV files larger than memory.
+    The upload is spooled to disk, then profiled chunk by chunk, so memory stays flat
+    regardless of file size. Returns the same analysis keys as /upload, with a row
+    preview instead of the full data and the error bounds of the approximate aggregates.
+    """
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(status_code=400, detail="Only CSV files can be uploaded in streaming mode")
+    _check_error_bounds(quantile_error, distinct_error)
+
+    private_dir(DATASET_STORE_DIR)
+    path = os.path.join(DATASET_STORE_DIR, f"upload_{uuid.uuid4().hex}.csv")
+    try:
+        # 1. Spool to disk without holding the file in memory
+        await _spool_upload(file, path)
+
+        # 2. Two chunked passes in a worker process: aggregates, then outliers against the final quartiles
+        encoding, sep, profile = await worker_pool.run_cpu(profile_csv_file, path, quantile_error, distinct_error)
+        reader = lambda chunksize: read_csv_file(path, encoding, sep, chunksize)
+        appender = lambda rows: append_csv_file(path, rows, encoding, sep)
+        dataset_id = dataset_store.put_file(path, reader, profile, file.filename, appender)
+    except Exception as e:
+        if os.path.exists(path):
+            os.remove(path)
+        if isinstance(e, HTTPException):
+            raise
+        print(f"Error processing large file: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    try:
+        # 3. Same analyzers as /upload, driven by the profile alone
+        result = await worker_pool.run_thread(analyze_profile, profile, file.filename, wait=True)
+        result["dataset_id"] = dataset_id
+        preview = await worker_pool.run_thread(
+            lambda: next(reader(LARGE_UPLOAD_PREVIEW_ROWS), pd.DataFrame(columns=profile.columns)), wait=True
+        )
+        result["truncated"] = profile.row_count > len(preview)
+        return await _dataset_response(request, result, preview)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error processing large file: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def _read_uploads(contents: list, sheet_name=None, wait: bool = False, on_read=None) -> list:
+    """
+    Parses (filename, content) pairs concurrently, one file per worker process at a time.
+    Returns (df, sheet_names, active_sheet) per readable file, in upload order.
+    Unreadable files are skipped when several are sent. on_read(n) is called as the
+    n-th file finishes.
+    """
+    slots = asyncio.Semaphore(max(1, worker_pool.processes))
+    finished = 0
+
+    async def read(filename, content):
+        nonlocal finished
+        kind = 'csv' if filename.endswith('.csv') else 'excel'
+        async with slots:
+            try:
+                parsed = await worker_pool.run_cpu(read_upload, content, kind, sheet_name, wait=wait)
+            except HTTPException:
+                raise
+            except Exception as read_err:
+                if len(contents) == 1:
+                    raise
+                print(f"Failed to read {filename}: {read_err}")
+                parsed = None
+        finished += 1
+        if on_read is not None:
+            on_read(finished)
+        return parsed
+
+    parsed = await asyncio.gather(*(read(filename, content) for filename, content in contents))
+    return [p for p in parsed if p is not None]
+
 @app.post("/upload-multiple")
-async def upload_multiple_files(files: list[UploadFile] = File(...)):
+async def upload_multiple_files(request: Request, files: list[UploadFile] = File(...)):
     """
-    Accepts multiple files, reads them, and concatenates them into a single dataset.
+    Accepts multiple files, reads them in parallel, and concatenates them into a single dataset.
     Handles different schemas (columns) automatically via outer join.
     """
     if not files:
         raise HTTPException(status_code=400, detail="No files provided")
 
-    dfs = []
-    filenames = []
-
     try:
+        contents = []
         for file in files:
             if not file.filename.endswith(('.csv', '.xlsx', '.xls')):
                 continue
-                
-            content = await file.read()
-            filenames.append(file.filename)
-            
-            try:
-                if file.filename.endswith('.csv'):
-                    df = read_csv_smart(content)
-                else:
-                    df, _, _ = read_excel_smart(content)
-                dfs.append(df)
-            except Exception as read_err:
-                print(f"Failed to read {file.filename}: {read_err}")
-                continue
+            contents.append((file.filename, await file.read()))
     
-        if not dfs:
+        parsed = await _read_uploads(contents)
+        if not parsed:
             raise HTTPException(status_code=400, detail="Could not read any valid data from provided files")
 
-        # Concatenate all DFs. ignore_index=True resets the index.
-        # sort=False prevents sorting columns alphabetically, keeping order somewhat if possible.
-        merged_df = pd.concat(dfs, axis=0, ignore_index=True, sort=False)
-        
-        # Standard processing
-        df_clean = merged_df.where(pd.notnull(merged_df), None)
-        stats = process_data(merged_df)
-        domain = detect_domain(merged_df)
-        anomalies = detect_anomalies(merged_df)
-        summary = generate_summary(merged_df, stats, domain)
-        kpis = generate_kpis(merged_df, domain)
-        quality_score = calculate_quality_score(merged_df)
-        recommendations = generate_recommendations(merged_df)
-        correlations = calculate_advanced_correlations(merged_df)
-
-        combined_filename = "Merged_" + "_".join([f.split('.')[0] for f in filenames[:3]])
-        if len(filenames) > 3:
-            combined_filename += f"_and_{len(filenames)-3}_more"
-            
-        return {
-            "filename": combined_filename,
-            "rows": len(merged_df),
-            "columns": list(merged_df.columns),
-            "stats": stats,
-            "data": df_clean.to_dict(orient="records"),
-            "domain": domain,
-            "anomalies": anomalies,
-            "summary": summary,
-            "kpis": kpis,
-            "quality_score": quality_score,
-            "recommendations": recommendations,
-            "correlations": correlations,
-            "sheet_names": [], # Not applicable for merged
-            "active_sheet": None
-        }
+        filename = combined_upload_name([name for name, _ in contents])
+        merged_df, profile, result = await worker_pool.run_cpu(analyze_frames, [df for df, _, _ in parsed], filename)
+
+        result["dataset_id"] = save_to_store(merged_df, result["filename"], profile)
+        return await _dataset_response(request, result, merged_df)
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error merging files: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _fit_cached(payload: dict, wait: bool = False) -> dict:
+    """
+    The /predict result for payload, reusing the model fitted earlier on the same data
+    (a stored dataset's id and version, or the hash of the inline target/feature columns),
+    target, features and type. Adds "model_id", for /models/{model_id}/score, and "cached".
+    Stored datasets over STREAMING_TRAIN_ROWS rows (or with "streaming": true) are trained
+    chunk by chunk from the store, without loading them whole. "sweep": true cross-validates
+    several model families instead (ml.sweep_models) and adds their "leaderboard".
+    "encoding" picks how categorical features are encoded (encoding.ENCODING_STRATEGIES,
+    default "label"); streaming training and sweeps only support "label".
+    """
+    target = payload.get('target')
+    features = payload.get('features')
+    model_type = payload.get('type', 'regression')
+    dataset_id = payload.get('dataset_id')
+    sweep = bool(payload.get('sweep'))
+    encoding = payload.get('encoding') or 'label'
+    if encoding not in ENCODING_STRATEGIES:
+        raise HTTPException(status_code=400, detail=f"Unknown encoding: {encoding}. Use one of {', '.join(ENCODING_STRATEGIES)}")
+    if sweep and encoding != 'label':
+        raise HTTPException(status_code=400, detail="A sweep only supports label encoding")
+    streaming = False
+    if dataset_id:
+        try:
+            # Read the version first: an append racing with training then only causes a refit later
+            info = dataset_store.info(dataset_id)
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"Unknown dataset id: {dataset_id}")
+        streaming = bool(payload.get('streaming')) or info["rows"] > STREAMING_TRAIN_ROWS \
+            or dataset_store.is_oversized(dataset_id)
+        if sweep and payload.get('streaming'):
+            raise HTTPException(status_code=400, detail="A sweep cannot be combined with streaming training")
+        # The sweep samples SWEEP_MAX_ROWS rows, so it loads the dataset whatever its size
+        streaming = streaming and not sweep
+        if streaming and encoding != 'label':
+            raise HTTPException(status_code=400, detail="Streaming training only supports label encoding")
+        df = None if streaming else await _load_frame(payload, wait=wait)
+    else:
+        df = await _load_frame(payload, wait=wait)
+    if (df is None and not streaming) or not target or not features:
+        return {"error": "Missing data, target, or features"}
+
+    try:
+        missing = [col for col in [target, *features] if col not in (info["columns"] if dataset_id else df.columns)]
+        if missing:
+            raise KeyError(f"{missing} not in index")
+        if dataset_id:
+            fingerprint = f"dataset:{dataset_id}:{info['version']}"
+        else:
+            fingerprint = await worker_pool.run_thread(frame_fingerprint, df[[target, *features]], wait=wait)
+        mode = "streaming" if streaming else "sweep" if sweep else None if encoding == 'label' else encoding
+        key = model_key(fingerprint, target, features, f"{model_type}:{mode}" if mode else model_type)
+
+        model = await worker_pool.run_thread(model_cache.get, key, wait=wait)
+        cached = model is not None
+        if model is None and streaming:
+            # Chunks come from the store in this process, so train on a thread
+            categorical = (await _load_profile(payload, wait=wait)).categorical_columns
+            model = await worker_pool.run_thread(
+                fit_model_chunked, lambda: iter_dataset_chunks(dataset_id, TRAIN_CHUNK_ROWS),
+                target, features, model_type, categorical, wait=wait
+            )
+            model_cache.put(key, model)
+        elif model is None and sweep:
+            # The candidates are cross-validated on joblib's own worker processes
+            model = await worker_pool.run_thread(sweep_models, df, target, features, model_type, wait=wait)
+            model_cache.put(key, model)
+        elif model is None:
+            model = await worker_pool.run_cpu(fit_model, df, target, features, model_type, encoding=encoding, wait=wait)
+            model_cache.put(key, model)
+    except HTTPException:
+        raise
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+    return {**model.summary(), "model_id": key, "cached": cached, "streaming": streaming}
+
 @app.post("/predict")
 async def predict_endpoint(payload: dict):
     try:
-        result = train_and_predict(payload)
+        result = await _fit_cached(payload)
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/models/{model_id}/score")
+async def score_endpoint(model_id: str, payload: dict):
+    """
+    Scores new rows (payload "data" records or a stored "dataset_id") with a model
+    fitted by /predict, without retraining. Categories not seen in training are encoded
+    as the model's encoding handles them (see encoding.FeatureEncoder): -1 for label,
+    the indicator means for onehot, the overall target mean for target, and a hash
+    bucket like any other value for hashing.
+    """
+    model = await worker_pool.run_thread(model_cache.get, model_id)
+    if model is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or evicted model id: {model_id}")
+    if _is_oversized(payload):
+        raise _too_large(payload['dataset_id'], f"score it with POST /models/{model_id}/batch")
+    df = await _load_frame(payload)
+    if df is None:
+        raise HTTPException(status_code=400, detail="Missing data")
+    try:
+        predictions = await worker_pool.run_thread(model.predict, df)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    result = {
+        "model_id": model_id,
+        "target": model.target,
+        "task": model.task,
+        "rows": len(predictions),
+        "predictions": predictions
+    }
+    return Response(await worker_pool.run_thread(render_json, result), media_type="application/json")
+
+@app.post("/models/{model_id}/batch")
+async def batch_score_endpoint(model_id: str, request: Request):
+    """
+    Scores a whole dataset with a model fitted by /predict and streams the predictions back,
+    chunk by chunk (SCORE_CHUNK_ROWS), so memory stays flat for large inputs. Input is either
+    a stored dataset as JSON {"dataset_id", "keep"} or a multipart upload with a CSV/Excel
+    "file" and an optional comma-separated "keep" field. keep names input columns returned
+    next to each "prediction", e.g. an id. Responds with CSV for Accept: text/csv, otherwise
+    NDJSON like /upload (a summary line, then rows lines, then an end line).
+    """
+    model = await worker_pool.run_thread(model_cache.get, model_id)
+    if model is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or evicted model id: {model_id}")
+
+    path = None
+    try:
+        if 'multipart/form-data' in request.headers.get('content-type', ''):
+            form = await request.form()
+            upload = form.get('file')
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(status_code=400, detail="Missing file")
+            keep = [col.strip() for col in (form.get('keep') or '').split(',') if col.strip()]
+            if upload.filename.endswith('.csv'):
+                # CSV files are spooled and read in chunks; Excel workbooks are parsed whole
+                private_dir(DATASET_STORE_DIR)
+                path = os.path.join(DATASET_STORE_DIR, f"score_{uuid.uuid4().hex}.csv")
+                await _spool_upload(upload, path)
+                encoding, sep = await worker_pool.run_thread(sniff_csv_file, path)
+                columns = list(next(read_csv_file(path, encoding, sep, 1), pd.DataFrame()).columns)
+                chunks = read_csv_file(path, encoding, sep, SCORE_CHUNK_ROWS)
+            else:
+                df, _, _ = await worker_pool.run_cpu(read_upload, await upload.read(), 'excel')
+                columns = list(df.columns)
+                chunks = [df]
+        else:
+            payload = await request.json()
+            dataset_id = payload.get('dataset_id')
+            if not dataset_id:
+                raise HTTPException(status_code=400, detail="Missing dataset_id or file")
+            try:
+                columns = dataset_store.info(dataset_id)["columns"]
+            except KeyError:
+                raise HTTPException(status_code=404, detail=f"Unknown dataset id: {dataset_id}")
+            keep = list(payload.get('keep') or [])
+            chunks = iter_dataset_chunks(dataset_id, SCORE_CHUNK_ROWS)
+
+        missing = [col for col in [*model.features, *keep] if col not in columns]
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Missing columns: {', '.join(map(str, missing))}")
+    except Exception as e:
+        if path and os.path.exists(path):
+            os.remove(path)
+        if isinstance(e, HTTPException):
+            raise
+        raise HTTPException(status_code=400, detail=f"Could not read input: {str(e)}")
+
+    frames = model.iter_predictions(chunks, keep)
+    as_csv = 'text/csv' in (request.headers.get('accept') or '')
+    summary = {"model_id": model_id, "target": model.target, "task": model.task, "keep": keep}
+
+    def stream():
+        # Runs on Starlette's thread pool, one chunk at a time; the spooled file goes once sent
+        try:
+            yield from iter_frames_csv(frames) if as_csv else iter_frames_ndjson(summary, frames)
+        finally:
+            if path and os.path.exists(path):
+                os.remove(path)
+
+    return StreamingResponse(stream(), media_type="text/csv" if as_csv else NDJSON_MEDIA_TYPE)
+
+def _correlation_options(payload: dict) -> dict:
+    """
+    Optional correlation listing parameters: method (one of CORRELATION_METHODS, default
+    "pearson"), threshold (minimum |r|, default 0.1), top_k (keep only the strongest pairs)
+    and precision ("float64" or "float32", for pearson/spearman).
+    """
+    options = {'method': payload.get('method') or 'pearson'}
+    if options['method'] not in CORRELATION_METHODS:
+        raise HTTPException(status_code=400, detail=f"method must be one of {', '.join(CORRELATION_METHODS)}")
+    try:
+        if payload.get('threshold') is not None:
+            options['threshold'] = float(payload['threshold'])
+        if payload.get('top_k') is not None:
+            options['top_k'] = int(payload['top_k'])
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="threshold must be a number and top_k an integer")
+    if not 0 <= options.get('threshold', 0) < 1:
+        raise HTTPException(status_code=400, detail="threshold must be between 0 and 1")
+    if options.get('top_k', 1) < 1:
+        raise HTTPException(status_code=400, detail="top_k must be a positive integer")
+    dtype = _precision_dtype(payload)
+    if dtype is not None:
+        options['dtype'] = dtype
+    return options
+
+def _precision_dtype(payload: dict):
+    precision = payload.get('precision', 'float64')
+    if precision not in ('float64', 'float32'):
+        raise HTTPException(status_code=400, detail="precision must be 'float64' or 'float32'")
+    return np.float32 if precision == 'float32' else None
+
+def _heatmap_options(payload: dict) -> dict:
+    """
+    Optional heatmap parameters: method (pearson/spearman/kendall), max_columns (default
+    HEATMAP_MAX_COLUMNS, 0 for no cap), select ("variance" or "correlation"), encoding
+    ("float32", "uint8" or "json"), cluster (default true) and precision.
+    """
+    options = {
+        'method': payload.get('method') or 'pearson',
+        'select': payload.get('select') or 'variance',
+        'encoding': payload.get('encoding') or 'float32',
+        'cluster': bool(payload.get('cluster', True)),
+        'dtype': _precision_dtype(payload)
+    }
+    if options['method'] not in HEATMAP_METHODS:
+        raise HTTPException(status_code=400, detail=f"method must be one of {', '.join(HEATMAP_METHODS)}")
+    if options['select'] not in HEATMAP_SELECTIONS:
+        raise HTTPException(status_code=400, detail=f"select must be one of {', '.join(HEATMAP_SELECTIONS)}")
+    if options['encoding'] not in MATRIX_ENCODINGS:
+        raise HTTPException(status_code=400, detail=f"encoding must be one of {', '.join(MATRIX_ENCODINGS)}")
+    try:
+        max_columns = int(payload.get('max_columns', HEATMAP_MAX_COLUMNS))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="max_columns must be an integer")
+    if max_columns < 0:
+        raise HTTPException(status_code=400, detail="max_columns must not be negative")
+    options['max_columns'] = max_columns or None
+    return options
+
 @app.post("/analyze/correlation")
 async def analyze_correlation(payload: dict):
+    """
+    Correlations between columns, strongest first. See _correlation_options
+    for method/threshold/top_k/precision. Datasets too large to load whole are served
+    Pearson correlations from their chunked profile.
+    """
     try:
-        data = payload.get('data')
-        method = payload.get('method', 'pearson')
-        if not data:
-             return {"error": "Missing data"}
-             
-        df = pd.DataFrame(data)
-        correlations = calculate_advanced_correlations(df)
+        if _is_oversized(payload):
+            if _correlation_options(payload)['method'] != 'pearson':
+                raise _too_large(payload['dataset_id'], "only pearson correlations are available")
+            df = None
+        else:
+            df = await _load_frame(payload)
+            if df is None:
+                return {"error": "Missing data"}
+
+        correlations = await worker_pool.run_thread(
+            calculate_advanced_correlations, df, await _load_profile(payload), **_correlation_options(payload)
+        )
         return correlations
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/analyze/heatmap")
 async def analyze_heatmap(payload: dict):
+    """
+    Dense, cluster-ordered correlation matrix for heatmaps. See _heatmap_options.
+    Datasets too large to load whole get the Pearson matrix of their chunked profile.
+    """
     try:
-        data = payload.get('data')
-        if not data:
-             return {"error": "Missing data"}
-             
-        df = pd.DataFrame(data)
-        correlations = calculate_advanced_correlations(df)
-        return correlations
+        if _is_oversized(payload):
+            if _heatmap_options(payload)['method'] != 'pearson':
+                raise _too_large(payload['dataset_id'], "only pearson heatmaps are available")
+            df = None
+        else:
+            df = await _load_frame(payload)
+            if df is None:
+                return {"error": "Missing data"}
+
+        heatmap = await worker_pool.run_thread(correlation_heatmap, df, await _load_profile(payload), **_heatmap_options(payload))
+        return heatmap
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/compare")
 async def compare_endpoint(payload: dict):
     try:
-        data1 = payload.get('data1')
-        data2 = payload.get('data2')
+        df1 = await _load_frame(payload, 'data1', 'dataset_id1')
+        df2 = await _load_frame(payload, 'data2', 'dataset_id2')
         name1 = payload.get('name1', 'Dataset 1')
         name2 = payload.get('name2', 'Dataset 2')
         
-        if not data1 or not data2:
+        if df1 is None or df2 is None:
             raise HTTPException(status_code=400, detail="Missing datasets for comparison")
-            
-        df1 = pd.DataFrame(data1)
-        df2 = pd.DataFrame(data2)
         
-        result = compare_datasets(df1, df2, name1, name2)
+        result = await worker_pool.run_thread(compare_datasets, df1, df2, name1, name2)
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/chat")
 async def chat_endpoint(payload: dict):
     try:
-        data = payload.get('data')
+        df = await _load_frame(payload)
         message = payload.get('message', '').lower()
         stats = payload.get('stats', [])
         
-        if not data or not message:
+        if df is None or not message:
             return {"reply": "I need some data and a question to help you!"}
-            
-        df = pd.DataFrame(data)
         
         # Simple rule-based "AI" logic
         if 'average' in message or 'mean' in message:
@@ -297,7 +809,7 @@ async def chat_endpoint(payload: dict):
             return {"reply": "Based on the data: " + " ".join(replies)}
             
         if 'anomaly' in message or 'outlier' in message or 'wrong' in message:
-            anomalies = detect_anomalies(df)
+            anomalies = await worker_pool.run_thread(detect_anomalies, df, await _load_profile(payload))
             if not anomalies:
                 return {"reply": "The data looks clean! I found no significant anomalies."}
             return {"reply": f"I found some potential issues: {', '.join(anomalies[:2])}"}
@@ -306,53 +818,153 @@ async def chat_endpoint(payload: dict):
             return {"reply": f"This dataset has {len(df)} rows and {len(df.columns)} columns."}
             
         if 'recommend' in message or 'suggestion' in message or 'improve' in message:
-            recs = generate_recommendations(df)
+            recs = await worker_pool.run_thread(generate_recommendations, df, await _load_profile(payload))
             if not recs:
                 return {"reply": "Your data is in great shape! No specific recommendations at this time."}
             return {"reply": f"Here is a suggestion: {recs[0]}"}
 
         return {"reply": "That's an interesting question! I can help you with averages, anomalies, data size, or recommendations. What would you like to know?"}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/merge")
-async def merge_files(payload: dict):
+async def merge_files(payload: dict, request: Request):
     try:
-        data1 = payload.get('data1')
-        data2 = payload.get('data2')
+        df1 = await _load_frame(payload, 'data1', 'dataset_id1')
+        df2 = await _load_frame(payload, 'data2', 'dataset_id2')
         merge_key = payload.get('merge_key')
         how = payload.get('how', 'inner')
         filename1 = payload.get('filename1', 'file1')
         filename2 = payload.get('filename2', 'file2')
 
-        if not data1 or not data2 or not merge_key:
+        if df1 is None or df2 is None or not merge_key:
              raise HTTPException(status_code=400, detail="Missing data or merge key")
              
-        merged_df, stats = merge_datasets(data1, data2, merge_key, how)
-        
-        # Smart Analysis on Merged Data
-        domain = detect_domain(merged_df)
-        anomalies = detect_anomalies(merged_df)
-        summary = generate_summary(merged_df, stats, domain)
-        kpis = generate_kpis(merged_df, domain)
-        
         new_filename = f"Merged_{filename1}_{filename2}.csv"
-        
-        return {
-            "filename": new_filename,
-            "rows": len(merged_df),
-            "columns": list(merged_df.columns),
-            "stats": stats,
-            "data": merged_df.to_dict(orient="records"),
-            "domain": domain,
-            "anomalies": anomalies,
-            "summary": summary,
-            "kpis": kpis
-        }
+        merged_df, result = await worker_pool.run_thread(merge_and_analyze, df1, df2, merge_key, how, new_filename)
+        result["dataset_id"] = save_to_store(merged_df, new_filename)
+        return await _dataset_response(request, result, merged_df)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Stages of a background upload job, in order
+UPLOAD_JOB_STAGES = ["parse", "profile", "anomalies", "correlations"]
+
+async def _run_upload_job(job, contents: list, sheet_name, approximate: bool,
+                          quantile_error: float, distinct_error: float) -> dict:
+    """
+    The /upload pipeline split into stages, so /jobs/{id} can report progress between them.
+    Stages wait for a free worker instead of failing when the pool is busy.
+    """
+    async with job.stage("parse"):
+        job.report("parse", f"0/{len(contents)} files")
+        parsed = await _read_uploads(contents, sheet_name, wait=True,
+                                     on_read=lambda n: job.report("parse", f"{n}/{len(contents)} files"))
+        if not parsed:
+            raise HTTPException(status_code=400, detail="Could not read any valid data from provided files")
+
+        if len(contents) == 1:
+            (df, sheet_names, active_sheet), filename = parsed[0], contents[0][0]
+        else:
+            df = await worker_pool.run_thread(concat_uploads, [df for df, _, _ in parsed], wait=True)
+            filename = combined_upload_name([name for name, _ in contents])
+            sheet_names, active_sheet = [], None
+        del parsed
+        df, memory = await worker_pool.run_thread(compact_frame, df, wait=True)
+
+        dataset_id = save_to_store(df, filename)
+        if approximate:
+            profile = await worker_pool.run_thread(ApproximateProfile, df, quantile_error, distinct_error, wait=True)
+        else:
+            profile = await worker_pool.run_thread(load_profile, dataset_id, wait=True)
+
+    # The frame already lives in this process; the analyzers run on worker threads
+    async with job.stage("profile"):
+        parts = await worker_pool.run_thread(summarize_frame, df, profile, wait=True)
+    async with job.stage("anomalies"):
+        parts.update(await worker_pool.run_thread(assess_frame, df, profile, wait=True))
+    async with job.stage("correlations"):
+        parts.update(await worker_pool.run_thread(correlate_frame, df, profile, wait=True))
+
+    result = build_result(filename, profile, parts, sheet_names, active_sheet, memory)
+    result["dataset_id"] = dataset_id
+    return result
+
+@app.post("/jobs/upload", status_code=202)
+async def submit_upload_job(files: list[UploadFile] = File(...), sheet_name: str = Form(None),
+                            approximate: bool = False, quantile_error: float = APPROX_QUANTILE_ERROR,
+                            distinct_error: float = APPROX_DISTINCT_ERROR):
+    """
+    Background variant of /upload (one file) and /upload-multiple (several files).
+    Returns the job at once; poll /jobs/{job_id} for stage progress. The final result
+    is the /upload summary without the rows, which /datasets/{dataset_id}/data serves.
+    """
+    files = [file for file in files if file.filename.endswith(('.csv', '.xlsx', '.xls'))]
+    if not files:
+        raise HTTPException(status_code=400, detail="Invalid file format")
+    _check_error_bounds(quantile_error, distinct_error)
+
+    contents = [(file.filename, await file.read()) for file in files]
+    job = job_manager.submit("upload", UPLOAD_JOB_STAGES, lambda job: _run_upload_job(
+        job, contents, sheet_name, approximate, quantile_error, distinct_error
+    ))
+    return job.to_dict()
+
+@app.post("/jobs/predict", status_code=202)
+async def submit_predict_job(payload: dict):
+    """
+    Background variant of /predict. Poll /jobs/{job_id} for the result.
+    """
+    dataset_id = payload.get('dataset_id')
+    if dataset_id and dataset_id not in dataset_store:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset id: {dataset_id}")
+
+    async def run(job):
+        async with job.stage("train"):
+            return await _fit_cached(payload, wait=True)
+
+    return job_manager.submit("predict", ["train"], run).to_dict()
+
+@app.post("/jobs/correlation", status_code=202)
+async def submit_correlation_job(payload: dict):
+    """
+    Background variant of /analyze/correlation. Poll /jobs/{job_id} for the result.
+    """
+    df = await _load_frame(payload)
+    if df is None:
+        raise HTTPException(status_code=400, detail="Missing data")
+    profile = await _load_profile(payload)
+    options = _correlation_options(payload)
+
+    async def run(job):
+        async with job.stage("correlations"):
+            return await worker_pool.run_thread(calculate_advanced_correlations, df, profile, wait=True, **options)
+
+    return job_manager.submit("correlation", ["correlations"], run).to_dict()
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    try:
+        return job_manager.get(job_id).to_dict()
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired job id: {job_id}")
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """
+    Cancels a running job, or discards the result of a finished one.
+    """
+    try:
+        cancelled = job_manager.cancel(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired job id: {job_id}")
+    return {"job_id": job_id, "status": "cancelled" if cancelled else "deleted"}
+
 @app.post("/send-report")
 async def send_report(request: dict):
     """
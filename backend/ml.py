@@ -1,14 +1,426 @@
+import os
+import time
 import pandas as pd
 import numpy as np
-from sklearn.linear_model import LinearRegression, LogisticRegression
-from sklearn.model_selection import train_test_split
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.ensemble import (
+    HistGradientBoostingClassifier, HistGradientBoostingRegressor, RandomForestClassifier, RandomForestRegressor
+)
+from sklearn.linear_model import Lasso, LinearRegression, LogisticRegression, Ridge, SGDClassifier
+from sklearn.model_selection import KFold, StratifiedKFold, train_test_split
 from sklearn.metrics import mean_squared_error, r2_score, accuracy_score
-from sklearn.preprocessing import LabelEncoder
+from sklearn.pipeline import Pipeline, make_pipeline
+from sklearn.preprocessing import StandardScaler
 
-def train_and_predict(data: dict):
+from encoding import CategoryEncoder, FeatureEncoder, is_categorical
+
+# Stored datasets with more rows than this are trained chunk by chunk (fit_model_chunked)
+STREAMING_TRAIN_ROWS = int(os.getenv("STREAMING_TRAIN_ROWS", "1000000"))
+TRAIN_CHUNK_ROWS = int(os.getenv("TRAIN_CHUNK_ROWS", "100000"))
+# Rows scored per batch by FittedModel.iter_predictions
+SCORE_CHUNK_ROWS = int(os.getenv("SCORE_CHUNK_ROWS", "100000"))
+# Passes of SGD over the training rows for chunked classification
+STREAMING_EPOCHS = int(os.getenv("STREAMING_EPOCHS", "3"))
+# Share of rows held out for evaluation when training chunk by chunk
+HOLDOUT_PERCENT = 20
+# Model sweep: processes cross-validating candidates (joblib, training matrices memory-mapped) and folds
+SWEEP_JOBS = int(os.getenv("SWEEP_JOBS", str(min(4, os.cpu_count() or 1))))
+SWEEP_FOLDS = 5
+# Candidates whose mean fold score trails the leader's by more than this are not evaluated further
+SWEEP_DROP_MARGIN = 0.05
+# Rows cross-validated at most; larger datasets are sampled
+SWEEP_MAX_ROWS = int(os.getenv("SWEEP_MAX_ROWS", "200000"))
+
+
+class FittedModel:
+    """
+    A trained prediction pipeline: the feature and target encoders, the estimator and
+    its evaluation on the held-out split. Picklable, so it can be fitted in a worker
+    process, cached and reused to score new rows without retraining.
+    """
+
+    def __init__(self, target: str, features: list, model_type: str, task: str, model,
+                 encoder: FeatureEncoder, target_encoder: CategoryEncoder, metrics: dict, coefficients: dict,
+                 actual_vs_predicted: list, training_rows: int):
+        self.target = target
+        self.features = features
+        self.model_type = model_type
+        self.task = task  # 'classification' or 'regression', as fitted
+        self.model = model
+        self.encoder = encoder
+        self.target_encoder = target_encoder
+        self.metrics = metrics
+        self.coefficients = coefficients
+        self.actual_vs_predicted = actual_vs_predicted
+        self.training_rows = training_rows
+        self.leaderboard = None  # set by sweep_models
+
+    def transform(self, df: pd.DataFrame):
+        """
+        Feature matrix of df as seen in training (FeatureEncoder.transform), with the
+        categories learnt in training. Raises ValueError when feature columns are missing.
+        """
+        missing = [col for col in self.features if col not in df.columns]
+        if missing:
+            raise ValueError(f"Missing feature columns: {', '.join(map(str, missing))}")
+        return self.encoder.transform(df[self.features])
+
+    def predict_values(self, df: pd.DataFrame) -> np.ndarray:
+        """Predictions for the rows of df as an array, target labels for classifiers."""
+        if len(df) == 0:
+            return np.array([])
+        preds = self.model.predict(self.transform(df))
+        if self.target_encoder is not None:
+            preds = self.target_encoder.labels(preds)
+        return preds
+
+    def predict(self, df: pd.DataFrame) -> list:
+        """Predictions for the rows of df, as target labels for classifiers."""
+        return self.predict_values(df).tolist()
+
+    def iter_predictions(self, chunks, keep: list = (), chunk_rows: int = SCORE_CHUNK_ROWS):
+        """
+        Scores an iterable of DataFrames batch by batch, yielding for each batch of up to
+        chunk_rows rows a frame with the keep columns and a "prediction" column.
+        Only one batch is held in memory at a time.
+        """
+        for chunk in chunks:
+            for start in range(0, len(chunk), chunk_rows):
+                batch = chunk.iloc[start:start + chunk_rows]
+                scored = batch[list(keep)].copy()
+                scored["prediction"] = self.predict_values(batch)
+                yield scored
+
+    def summary(self) -> dict:
+        """The /predict response."""
+        summary = {
+            "status": "success",
+            "metrics": self.metrics,
+            "coefficients": self.coefficients,
+            "model_type": self.model_type,
+            "actual_vs_predicted": self.actual_vs_predicted
+        }
+        if self.leaderboard is not None:
+            summary["leaderboard"] = self.leaderboard
+        return summary
+
+
+def _prepare(df: pd.DataFrame, target: str, features: list, model_type: str) -> tuple:
+    """
+    Features (not yet encoded) and target of the rows that have one, categorical targets
+    as CategoryEncoder codes. Returns (X, y, target encoder or None, task).
+    """
+    # For target, drop rows with missing values
+    valid_indices = df[target].notna()
+    X = df.loc[valid_indices, features]
+    y = df.loc[valid_indices, target]
+
+    # Encode target if classification/categorical
+    target_encoder = None
+    if is_categorical(y) or model_type == 'classification':
+        target_encoder = CategoryEncoder().fit(y)
+        y = target_encoder.codes(y)
+
+    if model_type == 'classification' or (len(np.unique(y)) < 10 and not pd.api.types.is_float_dtype(y)):
+        task = 'classification'
+    else:
+        task = 'regression'
+    return X, np.asarray(y), target_encoder, task
+
+def fit_model(df: pd.DataFrame, target: str, features: list, model_type: str = 'regression',
+              estimator=None, encoding: str = 'label') -> FittedModel:
+    """
+    Fits a LinearRegression or LogisticRegression (or the given scikit-learn estimator) of
+    target on features, evaluated on a 20% held-out split. model_type 'classification'
+    forces a classifier; otherwise a classifier is still used for targets with few
+    distinct non-float values. Categorical features are encoded by `encoding`
+    (encoding.ENCODING_STRATEGIES), learnt from the training split only.
+    """
+    X, y, target_encoder, task = _prepare(df, target, features, model_type)
+
+    train, test = train_test_split(np.arange(len(y)), test_size=0.2, random_state=42)
+    encoder = FeatureEncoder(encoding).fit(X.iloc[train], y[train])
+    X_train, X_test = encoder.transform(X.iloc[train]), encoder.transform(X.iloc[test])
+    y_train, y_test = y[train], y[test]
+
+    metrics = {}
+    coefficients = {}
+    actual_vs_predicted = []
+
+    if task == 'classification':
+        # Classification
+        model = estimator if estimator is not None else LogisticRegression(max_iter=1000)
+        model.fit(X_train, y_train)
+        preds = model.predict(X_test)
+        metrics = {
+            "accuracy": accuracy_score(y_test, preds)
+        }
+        # Coefs might be complex for multiclass, simplified here
+    else:
+        # Regression
+        model = estimator if estimator is not None else LinearRegression()
+        model.fit(X_train, y_train)
+        preds = model.predict(X_test)
+        metrics = {
+            "mse": mean_squared_error(y_test, preds),
+            "r2": r2_score(y_test, preds)
+        }
+        coefficients = _coefficients(model, encoder.feature_names)
+
+        # Generate Actual vs Predicted data for plotting (using the test set)
+        y_test_list = y_test.tolist()
+        preds_list = preds.tolist()
+
+        for i in range(min(50, len(y_test_list))): # Limit to 50 points for chart clarity if needed
+             actual_vs_predicted.append({
+                 "index": i,
+                 "actual": float(y_test_list[i]),
+                 "predicted": float(preds_list[i])
+             })
+
+    return FittedModel(target, list(features), model_type, task, model, encoder, target_encoder,
+                       metrics, coefficients, actual_vs_predicted, len(X))
+
+def _coefficients(model, features: list) -> dict:
+    """Per-feature coefficients of a linear model in the features' own units; {} for other models."""
+    scale = 1.0
+    if isinstance(model, Pipeline):
+        scaler = model.steps[0][1]
+        scale = scaler.scale_ if isinstance(scaler, StandardScaler) else 1.0
+        model = model.steps[-1][1]
+    coef = getattr(model, "coef_", None)
+    if coef is None or np.ndim(coef) != 1:
+        return {}
+    return dict(zip(features, coef / scale))
+
+def _holdout_mask(start: int, length: int) -> np.ndarray:
+    """Held-out rows among positions start..start+length, picked by hashing the position."""
+    positions = np.arange(start, start + length, dtype=np.uint64)
+    return pd.util.hash_array(positions) % 100 < HOLDOUT_PERCENT
+
+def _labelled_chunks(chunks, target: str, features: list):
+    """Yields (features, target, holdout mask) for the rows of each chunk that have a target."""
+    start = 0
+    for chunk in chunks():
+        holdout = _holdout_mask(start, len(chunk))
+        start += len(chunk)
+        labelled = chunk[target].notna().to_numpy()
+        if labelled.any():
+            yield chunk.loc[labelled, features], chunk.loc[labelled, target], holdout[labelled]
+
+def fit_model_chunked(chunks, target: str, features: list, model_type: str = 'regression',
+                      categorical: list = (), epochs: int = STREAMING_EPOCHS) -> FittedModel:
+    """
+    fit_model for datasets too large to hold in memory. chunks() returns a fresh iterator
+    of DataFrames; it is read a few times, one chunk at a time: once for the categories,
+    then for training, then for the evaluation. Regression solves the normal equations
+    accumulated per chunk (the LinearRegression fit); classification trains a standardized
+    SGDClassifier (logistic loss) with partial_fit over `epochs` passes. Instead of
+    train_test_split, rows whose hashed position falls in HOLDOUT_PERCENT are held out.
+    categorical names the dataset's object columns, label-encoded as in fit_model.
+    Memory depends on the chunk size and the number of categories, not on the row count.
+    """
+    categorical = set(categorical)
+    encoder = FeatureEncoder('label', categorical=categorical)
+
+    # 1. Categories of the encoded features and the target
+    target_levels = set()
+    encode_target = target in categorical or model_type == 'classification'
+    target_encoder = CategoryEncoder() if encode_target else None
+    float_target = False
+    for X, y, _ in _labelled_chunks(chunks, target, features):
+        encoder.partial_fit(X)
+        if encode_target:
+            target_encoder.partial_fit(y)
+        else:
+            float_target = float_target or pd.api.types.is_float_dtype(y)
+            if len(target_levels) < 10:
+                target_levels.update(y.unique().tolist())
+    if not (target_levels or (encode_target and len(target_encoder))):
+        raise ValueError("No rows with a target value")
+
+    levels = len(target_encoder) if encode_target else len(target_levels)
+    if model_type == 'classification' or (levels < 10 and (encode_target or not float_target)):
+        task = 'classification'
+    else:
+        task = 'regression'
+    fitted = FittedModel(target, list(features), model_type, task, None, encoder, target_encoder,
+                         {}, {}, [], 0)
+
+    def training_rows(holdout: bool):
+        for X, y, held_out in _labelled_chunks(chunks, target, features):
+            rows = held_out if holdout else ~held_out
+            if rows.any():
+                y = y[rows]
+                if target_encoder is not None:
+                    y = target_encoder.codes(y)
+                yield fitted.transform(X[rows]), np.asarray(y, dtype=np.float64 if task == 'regression' else None)
+
+    # 2. Training
+    if task == 'regression':
+        fitted.model, fitted.training_rows = _fit_normal_equations(training_rows(False), features)
+        fitted.coefficients = dict(zip(features, fitted.model.coef_))
+    else:
+        scaler = StandardScaler()
+        for X, _ in training_rows(False):
+            scaler.partial_fit(X)
+            fitted.training_rows += len(X)
+        classifier = SGDClassifier(loss='log_loss', random_state=42)
+        classes = np.arange(len(target_encoder)) if target_encoder is not None else np.array(sorted(target_levels))
+        for _ in range(max(1, epochs)):
+            for X, y in training_rows(False):
+                classifier.partial_fit(scaler.transform(X), y, classes=classes)
+        fitted.model = Pipeline([("scale", scaler), ("model", classifier)])
+
+    # 3. Evaluation on the held-out rows
+    count = correct = 0
+    sums = np.zeros(3)  # sum y, sum y^2, sum of squared errors
+    for X, y in training_rows(True):
+        preds = fitted.model.predict(X)
+        count += len(y)
+        if task == 'regression':
+            sums += [y.sum(), (y ** 2).sum(), ((y - preds) ** 2).sum()]
+            for actual, predicted in zip(y.tolist(), preds.tolist()):
+                if len(fitted.actual_vs_predicted) >= 50:
+                    break
+                fitted.actual_vs_predicted.append({"index": len(fitted.actual_vs_predicted),
+                                                   "actual": float(actual), "predicted": float(predicted)})
+        else:
+            correct += int((preds == y).sum())
+    if count < 2:
+        raise ValueError("Not enough rows to hold out for evaluation")
+    if task == 'regression':
+        total = sums[1] - sums[0] ** 2 / count
+        fitted.metrics = {"mse": float(sums[2] / count), "r2": float(1 - sums[2] / total) if total > 0 else 0.0}
+    else:
+        fitted.metrics = {"accuracy": correct / count}
+    return fitted
+
+def _fit_normal_equations(batches, features: list) -> tuple:
+    """
+    LinearRegression fitted from (X, y) batches by accumulating Z'Z and Z'y, Z being X with
+    an intercept column. Values are shifted by the first batch's means, which keeps the
+    sums well conditioned. Returns (model, rows).
+    """
+    gram = rhs = shift = y_shift = None
+    rows = 0
+    for X, y in batches:
+        values = X.to_numpy(dtype=np.float64)
+        if shift is None:
+            shift, y_shift = values.mean(axis=0), y.mean()
+            gram = np.zeros((len(features) + 1, len(features) + 1))
+            rhs = np.zeros(len(features) + 1)
+        design = np.column_stack([np.ones(len(values)), values - shift])
+        gram += design.T @ design
+        rhs += design.T @ (y - y_shift)
+        rows += len(values)
+    if rows == 0:
+        raise ValueError("No training rows")
+
+    solution = np.linalg.lstsq(gram, rhs, rcond=None)[0]
+    model = LinearRegression()
+    model.coef_ = solution[1:]
+    model.intercept_ = y_shift + solution[0] - solution[1:] @ shift
+    model.n_features_in_ = len(features)
+    model.feature_names_in_ = np.asarray(features, dtype=object)
+    return model, rows
+
+def _sweep_candidates(task: str) -> list:
+    """(family, params, estimator) for every candidate of a sweep."""
+    if task == 'classification':
+        candidates = [("logistic", {"C": C}, make_pipeline(StandardScaler(), LogisticRegression(C=C, max_iter=1000)))
+                      for C in (0.1, 1.0, 10.0)]
+        candidates += [("gradient_boosting", {"learning_rate": rate},
+                        HistGradientBoostingClassifier(learning_rate=rate, random_state=42)) for rate in (0.05, 0.1)]
+        candidates += [("random_forest", {"max_depth": depth},
+                        RandomForestClassifier(n_estimators=100, max_depth=depth, random_state=42)) for depth in (None, 10)]
+        return candidates
+    candidates = [("linear", {}, LinearRegression())]
+    candidates += [("ridge", {"alpha": alpha}, make_pipeline(StandardScaler(), Ridge(alpha=alpha)))
+                   for alpha in (0.1, 1.0, 10.0)]
+    candidates += [("lasso", {"alpha": alpha}, make_pipeline(StandardScaler(), Lasso(alpha=alpha)))
+                   for alpha in (0.001, 0.01, 0.1)]
+    candidates += [("gradient_boosting", {"learning_rate": rate},
+                    HistGradientBoostingRegressor(learning_rate=rate, random_state=42)) for rate in (0.05, 0.1)]
+    candidates += [("random_forest", {"max_depth": depth},
+                    RandomForestRegressor(n_estimators=100, max_depth=depth, random_state=42)) for depth in (None, 10)]
+    return candidates
+
+def _score_fold(estimator, X: np.ndarray, y: np.ndarray, train: np.ndarray, test: np.ndarray, task: str) -> dict:
+    """Fits a fresh clone of estimator on one fold and times the fit and the scoring."""
+    started = time.perf_counter()
+    model = clone(estimator).fit(X[train], y[train])
+    fitted = time.perf_counter()
+    preds = model.predict(X[test])
+    scored = time.perf_counter()
+    score = accuracy_score(y[test], preds) if task == 'classification' else r2_score(y[test], preds)
+    return {"score": float(score), "fit_seconds": fitted - started, "predict_seconds": scored - fitted, "rows": len(test)}
+
+def sweep_models(df: pd.DataFrame, target: str, features: list, model_type: str = 'regression',
+                 folds: int = SWEEP_FOLDS, n_jobs: int = SWEEP_JOBS) -> FittedModel:
+    """
+    Cross-validates several model families and regularization settings (_sweep_candidates)
+    by k-fold, scoring r2 (regression) or accuracy (classification). Folds are raced: after
+    each one, candidates trailing the best mean score by more than SWEEP_DROP_MARGIN are
+    dropped. Each fold's candidates run in parallel on joblib worker processes, which
+    share the training matrix through memory mapping. At most SWEEP_MAX_ROWS rows are used.
+    Returns the winner fitted like fit_model, with the leaderboard (score, spread, fit and
+    prediction timings per candidate) attached.
+    """
+    X, y, _, task = _prepare(df, target, features, model_type)
+    values = FeatureEncoder('label').fit(X).transform(X).to_numpy(dtype=np.float64)
+    labels = np.asarray(y)
+    if len(values) > SWEEP_MAX_ROWS:
+        sample = np.sort(np.random.default_rng(42).choice(len(values), SWEEP_MAX_ROWS, replace=False))
+        values, labels = values[sample], labels[sample]
+    if len(values) < folds * 2:
+        raise ValueError(f"A sweep needs at least {folds * 2} rows with a target value")
+
+    splitter = KFold(folds, shuffle=True, random_state=42)
+    if task == 'classification' and np.unique(labels, return_counts=True)[1].min() >= folds:
+        splitter = StratifiedKFold(folds, shuffle=True, random_state=42)
+    splits = list(splitter.split(values, labels))
+
+    candidates = _sweep_candidates(task)
+    runs = [[] for _ in candidates]
+    alive = list(range(len(candidates)))
+    with Parallel(n_jobs=n_jobs, max_nbytes="1M") as parallel:
+        for fold, (train, test) in enumerate(splits):
+            outcomes = parallel(delayed(_score_fold)(candidates[i][2], values, labels, train, test, task) for i in alive)
+            for i, outcome in zip(alive, outcomes):
+                runs[i].append(outcome)
+            # Early termination of clearly losing candidates
+            means = {i: np.mean([run["score"] for run in runs[i]]) for i in alive}
+            best = max(means.values())
+            alive = [i for i in alive if means[i] >= best - SWEEP_DROP_MARGIN]
+
+    leaderboard = []
+    for (family, params, _), folds_run in zip(candidates, runs):
+        scores = [run["score"] for run in folds_run]
+        leaderboard.append({
+            "model": family,
+            "params": params,
+            "score": float(np.mean(scores)),
+            "score_std": float(np.std(scores)),
+            "folds": len(folds_run),
+            "stopped_early": len(folds_run) < len(splits),
+            "fit_seconds": float(np.mean([run["fit_seconds"] for run in folds_run])),
+            "predict_ms_per_1k_rows": float(1000 * sum(run["predict_seconds"] for run in folds_run)
+                                            / sum(run["rows"] for run in folds_run) * 1000)
+        })
+    # Candidates that ran every fold first, then by score
+    order = sorted(range(len(candidates)), key=lambda i: (leaderboard[i]["stopped_early"], -leaderboard[i]["score"]))
+    leaderboard = [{"rank": rank + 1, **leaderboard[i]} for rank, i in enumerate(order)]
+
+    fitted = fit_model(df, target, features, model_type, estimator=clone(candidates[order[0]][2]))
+    fitted.leaderboard = leaderboard
+    return fitted
+
+def train_and_predict(data: dict, df: pd.DataFrame = None):
     """
     Expects data payload with:
-    - data: list of dicts (the dataset)
+    - data: list of dicts (the dataset), unless the stored DataFrame is passed as df
     - target: string (column name to predict)
     - features: list of strings (input columns)
     - type: 'regression' | 'classification' (optional, auto-detect otherwise)
@@ -18,81 +430,14 @@ def train_and_predict(data: dict):
         target = data.get('target')
         features = data.get('features')
         model_type = data.get('type', 'regression')
-        
-        if not raw_data or not target or not features:
+
+        if (df is None and not raw_data) or not target or not features:
             return {"error": "Missing data, target, or features"}
 
-        df = pd.DataFrame(raw_data)
-        
-        # Data Preparation
-        X = df[features].copy()
-        y = df[target].copy()
-        
-        # Simple preprocessing
-        # Handle missing values
-        X.fillna(0, inplace=True)
-        # For target, drop rows with missing values
-        valid_indices = y.notna()
-        X = X[valid_indices]
-        y = y[valid_indices]
-
-        # Encode categorical variables if any exist in features
-        le_dict = {}
-        for col in X.columns:
-            if X[col].dtype == 'object':
-                le = LabelEncoder()
-                X[col] = le.fit_transform(X[col].astype(str))
-                le_dict[col] = le
-        
-        # Encode target if classification/categorical
-        if y.dtype == 'object' or model_type == 'classification':
-             le_target = LabelEncoder()
-             y = le_target.fit_transform(y.astype(str))
-
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-        
-        metrics = {}
-        coefficients = {}
-        
-        if model_type == 'classification' or (len(np.unique(y)) < 10 and not pd.api.types.is_float_dtype(y)):
-            # Classification
-            model = LogisticRegression(max_iter=1000)
-            model.fit(X_train, y_train)
-            preds = model.predict(X_test)
-            metrics = {
-                "accuracy": accuracy_score(y_test, preds)
-            }
-            # Coefs might be complex for multiclass, simplified here
-        else:
-            # Regression
-            model = LinearRegression()
-            model.fit(X_train, y_train)
-            preds = model.predict(X_test)
-            metrics = {
-                "mse": mean_squared_error(y_test, preds),
-                "r2": r2_score(y_test, preds)
-            }
-            coefficients = dict(zip(features, model.coef_))
-            
-            # Generate Actual vs Predicted data for plotting (using the test set)
-            actual_vs_predicted = []
-            y_test_list = y_test.tolist()
-            preds_list = preds.tolist()
-            
-            for i in range(min(50, len(y_test_list))): # Limit to 50 points for chart clarity if needed
-                 actual_vs_predicted.append({
-                     "index": i,
-                     "actual": float(y_test_list[i]),
-                     "predicted": float(preds_list[i])
-                 })
-                 
-        return {
-            "status": "success",
-            "metrics": metrics,
-            "coefficients": coefficients,
-            "model_type": model_type,
-            "actual_vs_predicted": actual_vs_predicted
-        }
+        if df is None:
+            df = pd.DataFrame(raw_data)
+
+        return fit_model(df, target, features, model_type).summary()
 
     except Exception as e:
         return {"status": "error", "message": str(e)}
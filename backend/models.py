@@ -0,0 +1,165 @@
+import os
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from cache import DATAFLOW_CACHE_DIR, private_dir
+
+# Fitted models kept in memory, least recently used evicted beyond it
+MODEL_CACHE_ENTRIES = int(os.getenv("MODEL_CACHE_ENTRIES", "64"))
+# Disk budget for persisted models; 0 keeps them in memory only
+MODEL_CACHE_DISK_MB = int(os.getenv("MODEL_CACHE_DISK_MB", "256"))
+MODEL_CACHE_DIR = os.getenv("MODEL_CACHE_DIR", os.path.join(DATAFLOW_CACHE_DIR, "models"))
+# Bump when training changes, so models fitted by older code stop matching
+MODEL_CACHE_VERSION = 5
+
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """SHA-256 of a frame's column names, dtypes and values (index ignored)."""
+    digest = hashlib.sha256(repr([(str(col), str(dtype)) for col, dtype in df.dtypes.items()]).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def model_key(fingerprint: str, target: str, features: list, model_type: str) -> str:
+    """
+    Id of the model fitted on a dataset (by fingerprint, e.g. frame_fingerprint of the
+    training columns or a stored dataset's id and version) for target, features and model type.
+    """
+    described = repr((MODEL_CACHE_VERSION, fingerprint, target, list(features), model_type))
+    return hashlib.sha256(described.encode("utf-8")).hexdigest()
+
+
+class ModelCache:
+    """
+    Fitted models (ml.FittedModel) by model_key. Recent models stay in memory (LRU by
+    count); each is also pickled to disk in the background, within a byte budget, so
+    they can be scored again after eviction or a restart. The directory must be private
+    (cache.private_dir); otherwise models are kept in memory only.
+    """
+
+    def __init__(self, max_entries: int, disk_budget_bytes: int, cache_dir: str):
+        self.max_entries = max_entries
+        self.disk_budget_bytes = disk_budget_bytes
+        self.cache_dir = cache_dir
+        self._lock = threading.RLock()
+        self._memory = OrderedDict()  # key -> model, oldest first
+        self._disk = OrderedDict()    # key -> bytes on disk, oldest first
+        self._hits = 0
+        self._misses = 0
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-cache")
+        if self.disk_budget_bytes > 0:
+            try:
+                private_dir(self.cache_dir)
+            except OSError as e:
+                print(f"Keeping models in memory only: {e}")
+                self.disk_budget_bytes = 0
+            else:
+                self._load_disk_index()
+
+    def get(self, key: str):
+        """Returns the cached model or None. Models are shared and must not be refitted."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._hits += 1
+                return self._memory[key]
+            on_disk = key in self._disk
+
+        if on_disk:
+            try:
+                with open(self._path(key), 'rb') as f:
+                    model = pickle.load(f)
+                os.utime(self._path(key))
+            except Exception as e:
+                print(f"Dropping unreadable model {key}: {e}")
+                with self._lock:
+                    self._disk.pop(key, None)
+                self._remove_file(key)
+            else:
+                with self._lock:
+                    self._hits += 1
+                    if key in self._disk:
+                        self._disk.move_to_end(key)
+                    self._remember(key, model)
+                return model
+
+        with self._lock:
+            self._misses += 1
+        return None
+
+    def put(self, key: str, model):
+        with self._lock:
+            self._remember(key, model)
+            write = self.disk_budget_bytes > 0 and key not in self._disk
+        if write:
+            self._writer.submit(self._write, key, model)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "memory_entries": len(self._memory),
+                "disk_entries": len(self._disk),
+                "disk_bytes": sum(self._disk.values())
+            }
+
+    def shutdown(self):
+        self._writer.shutdown(wait=True)
+
+    def _remember(self, key: str, model):
+        self._memory[key] = model
+        self._memory.move_to_end(key)
+        while len(self._memory) > max(1, self.max_entries):
+            self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def _write(self, key: str, model):
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            private_dir(self.cache_dir)
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Failed to persist model {key}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        with self._lock:
+            self._disk[key] = os.path.getsize(path)
+            self._disk.move_to_end(key)
+            expired = []
+            while sum(self._disk.values()) > self.disk_budget_bytes and len(self._disk) > 1:
+                expired.append(self._disk.popitem(last=False)[0])
+        for old_key in expired:
+            self._remove_file(old_key)
+
+    def _remove_file(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _load_disk_index(self):
+        if not os.path.isdir(self.cache_dir):
+            return
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".pkl"):
+                continue
+            stat = os.stat(os.path.join(self.cache_dir, name))
+            entries.append((stat.st_mtime, name[:-len(".pkl")], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+
+
+model_cache = ModelCache(MODEL_CACHE_ENTRIES, MODEL_CACHE_DISK_MB * 1024 * 1024, MODEL_CACHE_DIR)
@@ -0,0 +1,275 @@
+import numpy as np
+import pandas as pd
+
+from processing import (
+    process_data, detect_domain, detect_anomalies, generate_summary,
+    generate_kpis, merge_datasets,
+    calculate_quality_score, generate_recommendations,
+    calculate_advanced_correlations, generate_profile_summary,
+    read_csv_smart, read_excel_smart, sniff_csv_file, read_csv_file
+)
+from compaction import compact_frame
+from profiling import DatasetProfile, ApproximateProfile, APPROX_QUANTILE_ERROR, APPROX_DISTINCT_ERROR
+from chunked import CHUNK_ROWS, profile_chunks
+
+# Upload pipelines, run in the worker pool (see workers.py). Every function here is
+# module-level and takes/returns picklable values so it can run in a worker process.
+
+
+def read_upload(content: bytes, kind: str, sheet_name=None) -> tuple:
+    """
+    Parses an uploaded file. kind is 'csv' or 'excel'.
+    Returns (df, sheet_names, active_sheet).
+    """
+    if kind == 'csv':
+        return read_csv_smart(content), [], None
+    return read_excel_smart(content, sheet_name=sheet_name)
+
+def summarize_frame(df: pd.DataFrame, profile: DatasetProfile) -> dict:
+    """
+    Column stats, domain, narrative summary and KPIs of df.
+    """
+    stats = process_data(df, profile)
+    domain = detect_domain(df)
+    return {
+        "rows": len(df),
+        "columns": list(df.columns),
+        "stats": stats,
+        "domain": domain,
+        "summary": generate_summary(df, stats, domain, profile),
+        "kpis": generate_kpis(df, domain, profile)
+    }
+
+def assess_frame(df: pd.DataFrame, profile: DatasetProfile) -> dict:
+    """
+    Anomalies, quality score and recommendations of df.
+    """
+    return {
+        "anomalies": detect_anomalies(df, profile),
+        "quality_score": calculate_quality_score(df, profile),
+        "recommendations": generate_recommendations(df, profile)
+    }
+
+def correlate_frame(df: pd.DataFrame, profile: DatasetProfile) -> dict:
+    return {"correlations": calculate_advanced_correlations(df, profile)}
+
+def build_result(filename: str, profile, parts: dict, sheet_names: list = None, active_sheet=None,
+                 memory: dict = None) -> dict:
+    """
+    Assembles the upload response summary (everything but the rows) from the analysis parts.
+    "dataset_id" is left for the caller to fill in once the frame is stored.
+    memory is the compact_frame report of the parsed frame, when it was compacted.
+    """
+    result = {
+        "filename": filename,
+        "dataset_id": None,
+        "rows": parts["rows"],
+        "columns": parts["columns"],
+        "stats": parts["stats"],
+        "domain": parts["domain"],
+        "anomalies": parts["anomalies"],
+        "summary": parts["summary"],
+        "kpis": parts["kpis"],
+        "quality_score": parts["quality_score"],
+        "recommendations": parts["recommendations"],
+        "correlations": parts["correlations"],
+        "sheet_names": sheet_names or [],
+        "active_sheet": active_sheet,
+        "accuracy": profile.accuracy()
+    }
+    if memory is not None:
+        result["memory"] = memory
+    return result
+
+def analyze_frame(df: pd.DataFrame, filename: str, profile: DatasetProfile = None,
+                  sheet_names: list = None, active_sheet=None, memory: dict = None) -> dict:
+    """
+    Runs every upload analyzer on df and returns the response summary.
+    """
+    profile = profile if profile is not None else DatasetProfile(df)
+    parts = {**summarize_frame(df, profile), **assess_frame(df, profile), **correlate_frame(df, profile)}
+    return build_result(filename, profile, parts, sheet_names, active_sheet, memory)
+
+def analyze_upload(content: bytes, filename: str, kind: str, sheet_name=None, approximate: bool = False,
+                   quantile_error: float = APPROX_QUANTILE_ERROR, distinct_error: float = APPROX_DISTINCT_ERROR) -> tuple:
+    """
+    Parses, compacts (compact_frame) and analyzes one uploaded file. Returns (df, profile, result).
+    The profile is None in approximate mode, since it cannot serve exact queries later.
+    """
+    df, sheet_names, active_sheet = read_upload(content, kind, sheet_name)
+    df, memory = compact_frame(df)
+    if approximate:
+        profile = ApproximateProfile(df, quantile_error, distinct_error)
+        return df, None, analyze_frame(df, filename, profile, sheet_names, active_sheet, memory)
+    profile = DatasetProfile(df)
+    return df, profile, analyze_frame(df, filename, profile, sheet_names, active_sheet, memory)
+
+def analyze_upload_file(path: str, filename: str, kind: str, sheet_name=None, approximate: bool = False,
+                        quantile_error: float = APPROX_QUANTILE_ERROR, distinct_error: float = APPROX_DISTINCT_ERROR) -> tuple:
+    """
+    analyze_upload for a file on disk, so the bytes are only loaded in the worker.
+    """
+    with open(path, 'rb') as f:
+        content = f.read()
+    return analyze_upload(content, filename, kind, sheet_name, approximate, quantile_error, distinct_error)
+
+def unify_schema(dfs: list) -> dict:
+    """
+    Column -> dtype of the concatenation of dfs, columns in first-seen order.
+    Files where a column is empty or absent do not vote on its dtype, so an all-null
+    column in one file no longer turns dates or numbers into object. Differing numeric
+    dtypes widen (int + float -> float64); only truly mixed kinds fall back to object.
+    """
+    present = {}
+    for df in dfs:
+        if len(df):
+            for col in df.columns:
+                present.setdefault(col, []).append(df[col])
+    frames = sum(1 for df in dfs if len(df))
+
+    schema = {}
+    for df in dfs:
+        for col in df.columns:
+            if col in schema:
+                continue
+            series = present.get(col, [])
+            # Non-empty frames without the column need it filled with nulls
+            needs_na = len(series) < frames
+            series = series or [df[col]]
+            dtypes = [s.dtype for s in series]
+            if any(dtype != dtypes[0] for dtype in dtypes):
+                # Only scan for empty columns when the files disagree
+                voters = [s for s in series if s.notna().any()]
+                needs_na = needs_na or len(voters) < len(series)
+                dtypes = [s.dtype for s in voters]
+            schema[col] = _common_dtype(dtypes, needs_na)
+    return schema
+
+def _common_dtype(dtypes: list, needs_na: bool):
+    if not dtypes:
+        return np.dtype(np.float64)
+    if all(dtype == dtypes[0] for dtype in dtypes):
+        dtype = dtypes[0]
+    elif all(isinstance(d, np.dtype) and d.kind in 'iuf' for d in dtypes):
+        dtype = np.result_type(*dtypes)
+    elif all(isinstance(d, np.dtype) and d.kind == 'M' for d in dtypes):
+        dtype = np.result_type(*dtypes)
+    else:
+        return np.dtype(object)
+
+    if not isinstance(dtype, np.dtype):
+        # Extension dtypes (e.g. category) are kept only when every file has them in full
+        return np.dtype(object) if needs_na else dtype
+    if needs_na and dtype.kind in 'iu':
+        return np.dtype(np.float64)
+    if needs_na and dtype.kind == 'b':
+        return np.dtype(object)
+    return dtype
+
+def _na_value(dtype: np.dtype):
+    return np.datetime64('NaT') if dtype.kind in 'mM' else np.nan
+
+def concat_uploads(dfs: list):
+    """
+    Stacks the frames (outer join on columns) into one new frame with a fresh index.
+    The target schema is settled first (unify_schema) and each column is written
+    once into a preallocated array, instead of pd.concat reindexing every frame.
+    """
+    if not dfs:
+        return None
+    if any(df.columns.has_duplicates for df in dfs):
+        # Column-wise assembly needs unique names; pd.concat reports the clash
+        return pd.concat(dfs, axis=0, ignore_index=True, sort=False)
+
+    schema = unify_schema(dfs)
+    offsets = np.cumsum([0] + [len(df) for df in dfs])
+    total = int(offsets[-1])
+    columns = {}
+    for col, dtype in schema.items():
+        if not isinstance(dtype, np.dtype):
+            # Kept only when every non-empty frame has the column; empty frames may lack it
+            parts = [df[col] for df in dfs if col in df.columns and (len(df) or total == 0)]
+            columns[col] = pd.concat(parts, ignore_index=True)
+            continue
+        out = np.empty(total, dtype=dtype)
+        for df, start, stop in zip(dfs, offsets[:-1], offsets[1:]):
+            if start == stop:
+                continue
+            if col in df.columns and (df[col].dtype == dtype or df[col].notna().any()):
+                out[start:stop] = df[col].to_numpy(dtype=dtype)
+            else:
+                out[start:stop] = _na_value(dtype)
+        columns[col] = out
+    return pd.DataFrame(columns, index=pd.RangeIndex(total), copy=False)
+
+def combined_upload_name(filenames: list) -> str:
+    combined_filename = "Merged_" + "_".join([f.split('.')[0] for f in filenames[:3]])
+    if len(filenames) > 3:
+        combined_filename += f"_and_{len(filenames)-3}_more"
+    return combined_filename
+
+def analyze_frames(dfs: list, filename: str) -> tuple:
+    """
+    concat_uploads and compact_frame followed by the full analysis. Returns (df, profile, result).
+    Frames are compacted once merged: categories differing between files would not stack.
+    """
+    merged_df, memory = compact_frame(concat_uploads(dfs))
+    profile = DatasetProfile(merged_df)
+    return merged_df, profile, analyze_frame(merged_df, filename, profile, memory=memory)
+
+def profile_csv_file(path: str, quantile_error: float = APPROX_QUANTILE_ERROR,
+                     distinct_error: float = APPROX_DISTINCT_ERROR) -> tuple:
+    """
+    Profiles a CSV file on disk chunk by chunk. Returns (encoding, sep, ChunkedProfile).
+    """
+    encoding, sep = sniff_csv_file(path)
+    profile = profile_chunks(lambda: read_csv_file(path, encoding, sep, CHUNK_ROWS),
+                             quantile_error=quantile_error, distinct_error=distinct_error)
+    return encoding, sep, profile
+
+def analyze_profile(profile, filename: str) -> dict:
+    """
+    analyze_frame for datasets only available as a profile (chunked uploads).
+    KPIs need the rows and are left empty.
+    """
+    stats = process_data(None, profile)
+    domain = detect_domain(pd.DataFrame(columns=profile.columns))
+    return {
+        "filename": filename,
+        "dataset_id": None,
+        "rows": profile.row_count,
+        "columns": profile.columns,
+        "stats": stats,
+        "domain": domain,
+        "anomalies": detect_anomalies(None, profile),
+        "summary": generate_profile_summary(profile, stats, domain),
+        "kpis": [],
+        "quality_score": calculate_quality_score(None, profile),
+        "recommendations": generate_recommendations(None, profile),
+        "correlations": calculate_advanced_correlations(None, profile),
+        "sheet_names": [],
+        "active_sheet": None,
+        "accuracy": profile.accuracy()
+    }
+
+def merge_and_analyze(df1: pd.DataFrame, df2: pd.DataFrame, merge_key: str, how: str, filename: str) -> tuple:
+    """
+    Joins two datasets and analyzes the result. Returns (merged_df, result).
+    """
+    merged_df, stats = merge_datasets(df1, df2, merge_key, how)
+    profile = DatasetProfile(merged_df)
+
+    # Smart Analysis on Merged Data
+    domain = detect_domain(merged_df)
+    result = {
+        "filename": filename,
+        "dataset_id": None,
+        "rows": len(merged_df),
+        "columns": list(merged_df.columns),
+        "stats": stats,
+        "domain": domain,
+        "anomalies": detect_anomalies(merged_df, profile),
+        "summary": generate_summary(merged_df, stats, domain, profile),
+        "kpis": generate_kpis(merged_df, domain, profile)
+    }
+    return merged_df, result
@@ -1,8 +1,205 @@
 import pandas as pd
 import numpy as np
 import io
+import os
+import codecs
+
+try:
+    import python_calamine  # Optional Rust-based Excel reader, much faster than openpyxl
+except ImportError:
+    python_calamine = None
+
+from profiling import DatasetProfile, get_profile
+from correlation import (
+    ASSOCIATION_MAX_LEVELS, CORRELATION_METHODS, CORRELATION_THRESHOLD, cluster_order, correlation_ratio_matrix,
+    cramers_v_matrix, cross_pairs, kendall_matrix, matrix_pairs, pearson_matrix, rank_columns,
+    spearman_matrix, strongest_pairs
+)
+from transport import encode_matrix
+from temporal import TemporalIndex
+
+# Number of leading bytes inspected to pick the encoding and dialect of a CSV upload.
+CSV_SNIFF_BYTES = 64 * 1024
+CSV_SEPARATORS = [';', ',', '\t', '|']
+# Leading rows of each sheet read to pick the most populated sheet and find the header row.
+EXCEL_SAMPLE_ROWS = 1000
+# pandas engine for Excel uploads; None lets pandas choose (openpyxl for .xlsx)
+EXCEL_ENGINE = os.getenv("EXCEL_ENGINE") or ("calamine" if python_calamine is not None else None)
+# Largest heatmap matrix returned by default; wider datasets keep their most variable columns
+HEATMAP_MAX_COLUMNS = int(os.getenv("HEATMAP_MAX_COLUMNS", "100"))
+HEATMAP_METHODS = ("pearson", "spearman", "kendall")
+HEATMAP_SELECTIONS = ("variance", "correlation")
+
+def _sniff_encoding(sample: bytes):
+    """
+    Guesses the encoding of a CSV from its leading bytes.
+    Returns None when the sample gives no clear answer.
+    """
+    # 1. Byte Order Marks are authoritative
+    if sample.startswith(b'\xef\xbb\xbf'):
+        return 'utf-8-sig'
+    if sample.startswith((b'\xff\xfe', b'\xfe\xff')):
+        return 'utf-16'
+
+    if not sample:
+        return None
+
+    # 2. BOM-less UTF-16: ASCII text leaves a NUL byte in every other position
+    even_nuls = sample[0::2].count(0)
+    odd_nuls = sample[1::2].count(0)
+    half = len(sample) / 2
+    if odd_nuls > half * 0.3 and even_nuls < half * 0.05:
+        return 'utf-16-le'
+    if even_nuls > half * 0.3 and odd_nuls < half * 0.05:
+        return 'utf-16-be'
+
+    # 3. Valid UTF-8 (the sample may cut a multi-byte character at the end)
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8-sig'
+    except UnicodeDecodeError:
+        pass
+
+    # 4. Single-byte encodings: 0x80-0x9F are printable in cp1252 but control chars in latin1
+    if any(0x80 <= b <= 0x9f for b in sample) and _decodes(sample, 'cp1252'):
+        return 'cp1252'
+    return 'latin1'
+
+def _decodes(sample: bytes, encoding: str) -> bool:
+    try:
+        sample.decode(encoding)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+def _count_unquoted(line: str, sep: str) -> int:
+    if '"' not in line:
+        return line.count(sep)
+    count = 0
+    in_quotes = False
+    for ch in line:
+        if ch == '"':
+            in_quotes = not in_quotes
+        elif ch == sep and not in_quotes:
+            count += 1
+    return count
+
+def _sniff_separator(text: str, truncated: bool):
+    """
+    Picks the separator that splits the sampled lines into a consistent number of fields.
+    Returns None when no separator is a clear winner.
+    """
+    lines = text.splitlines()
+    if truncated and len(lines) > 1:
+        # Last line is probably cut in the middle
+        lines = lines[:-1]
+    lines = [line for line in lines if line.strip()][:200]
+    if not lines:
+        return None
+
+    candidates = []
+    for sep in CSV_SEPARATORS:
+        header_count = _count_unquoted(lines[0], sep)
+        if header_count == 0:
+            continue
+        counts = [_count_unquoted(line, sep) for line in lines[1:]]
+        if counts:
+            consistent = sum(1 for c in counts if c == header_count) / len(counts)
+            if consistent < 0.9:
+                continue
+        candidates.append((header_count, sep))
+
+    if not candidates:
+        return None
+
+    # Same preference as the scoring loop: most columns wins, ties keep list order
+    best_count = max(c for c, _ in candidates)
+    best = [sep for c, sep in candidates if c == best_count]
+    if len(best) > 1:
+        return None
+    return best[0]
+
+def _sniff_csv_dialect(content_bytes: bytes):
+    """
+    Decides encoding and separator from a bounded sample of the upload.
+    Returns (encoding, separator), or None when the sample is ambiguous.
+    """
+    sample = content_bytes[:CSV_SNIFF_BYTES]
+    truncated = len(content_bytes) > CSV_SNIFF_BYTES
+
+    encoding = _sniff_encoding(sample)
+    if encoding is None:
+        return None
+
+    text = codecs.getincrementaldecoder(encoding)(errors='replace').decode(sample, final=not truncated)
+    sep = _sniff_separator(text, truncated)
+    if sep is None:
+        return None
+    return encoding, sep
 
 def read_csv_smart(content_bytes: bytes):
+    """
+    Reads a CSV upload with a single full parse.
+    Encoding and separator are sniffed from the leading bytes; the full
+    encoding/separator trial matrix only runs when the sample is ambiguous.
+    """
+    dialect = _sniff_csv_dialect(content_bytes)
+    if dialect is not None:
+        encoding, sep = dialect
+        try:
+            # Parse straight from the bytes so only one decoded copy is ever held
+            df = pd.read_csv(io.BytesIO(content_bytes), sep=sep, encoding=encoding, quotechar='"', doublequote=True)
+            if not df.empty:
+                df.columns = [str(c).replace('"', '').strip() for c in df.columns]
+                return df
+        except Exception:
+            pass
+
+    return _read_csv_trial_matrix(content_bytes)
+
+def sniff_csv_file(path: str):
+    """
+    Sniffs (encoding, separator) from the head of a CSV file on disk.
+    Falls back to a plausible encoding and ',' when the sample is ambiguous.
+    """
+    with open(path, 'rb') as f:
+        sample = f.read(CSV_SNIFF_BYTES + 1)
+    dialect = _sniff_csv_dialect(sample)
+    if dialect is not None:
+        return dialect
+    encoding = _sniff_encoding(sample[:CSV_SNIFF_BYTES]) or 'latin1'
+    return encoding, ','
+
+def read_csv_file(path: str, encoding: str, sep: str, chunksize: int = None):
+    """
+    Reads a CSV file from disk with a known dialect (see _sniff_csv_dialect).
+    With chunksize, yields DataFrames of up to chunksize rows instead of one frame.
+    """
+    def clean(df):
+        df.columns = [str(c).replace('"', '').strip() for c in df.columns]
+        return df
+
+    if chunksize is None:
+        return clean(pd.read_csv(path, sep=sep, encoding=encoding, quotechar='"', doublequote=True))
+    reader = pd.read_csv(path, sep=sep, encoding=encoding, quotechar='"', doublequote=True, chunksize=chunksize)
+    return (clean(chunk) for chunk in reader)
+
+def append_csv_file(path: str, df: pd.DataFrame, encoding: str, sep: str):
+    """
+    Appends the rows of df (no header) to a CSV file in the dialect it was read with.
+    """
+    with open(path, 'rb') as f:
+        f.seek(max(0, os.path.getsize(path) - 2))
+        tail = f.read()
+    # A last line without a line break would swallow the first appended row
+    # (b'\n\x00' is the UTF-16-LE line break)
+    needs_newline = tail and not tail.endswith((b'\n', b'\n\x00'))
+    with open(path, 'a', encoding=encoding, newline='') as f:
+        if needs_newline:
+            f.write('\n')
+        df.to_csv(f, header=False, index=False, sep=sep, quotechar='"', doublequote=True, lineterminator='\n')
+
+def _read_csv_trial_matrix(content_bytes: bytes):
     """
     Attempts to read CSV with multiple encodings and separators.
     Aggressively detects the correct configuration.
@@ -10,7 +207,7 @@ def read_csv_smart(content_bytes: bytes):
     # Encodings to try. utf-8-sig handles BOM for UTF-8. 
     # utf-16 is BOM-aware. latin1/cp1252 for older European files.
     encodings = ['utf-8-sig', 'utf-16', 'latin1', 'cp1252', 'utf-8']
-    separators = [';', ',', '\t', '|']
+    separators = CSV_SEPARATORS
     
     best_df = None
     max_score = -1
@@ -85,45 +282,70 @@ def read_csv_smart(content_bytes: bytes):
     # Final fallback if nothing worked well
     return pd.read_csv(io.BytesIO(content_bytes), sep=None, engine='python')
 
+def _sheet_row_count(excel_file: pd.ExcelFile, sheet_name):
+    """
+    Row count declared in the sheet's dimension metadata, read without parsing any cells.
+    None when the engine or the file does not provide it.
+    """
+    try:
+        return excel_file.book[sheet_name].max_row
+    except Exception:
+        return None
+
+def _sheet_population(sample: pd.DataFrame, declared_rows) -> float:
+    """
+    Estimated non-empty cells of a sheet: the density of its leading sample scaled
+    to the row count from the sheet dimensions.
+    """
+    non_null = int(sample.notna().sum().sum())
+    if len(sample) < EXCEL_SAMPLE_ROWS:
+        # The sample is the whole sheet
+        return non_null
+    rows = max(declared_rows or 0, len(sample))
+    return non_null * rows / len(sample)
+
+def _find_header_row(sample: pd.DataFrame) -> int:
+    """
+    First row with at least 2 non-empty cells, at least half of them text (likely a header).
+    """
+    if sample.empty:
+        return 0
+    non_null = sample.notna().sum(axis=1).to_numpy()
+    text = sample.map(lambda value: isinstance(value, str)).sum(axis=1).to_numpy()
+    candidates = np.flatnonzero((non_null >= 2) & (text >= non_null * 0.5))
+    return int(candidates[0]) if len(candidates) else 0
+
 def read_excel_smart(content_bytes: bytes, sheet_name=None):
     """
     Reads excel file. If no sheet_name is provided, returns the most 'populated' sheet.
     Also returns list of sheet names if multiple exist.
     Tries to detect header if it's not in the first row.
+    Only a bounded sample of each sheet is read for these guesses; the chosen sheet
+    is then parsed once, in openpyxl's streaming read-only mode (or with calamine).
     """
     try:
-        excel_file = pd.ExcelFile(io.BytesIO(content_bytes))
+        excel_file = pd.ExcelFile(io.BytesIO(content_bytes), engine=EXCEL_ENGINE)
         sheet_names = excel_file.sheet_names
-        
+
+        # 1. Declared sizes first (openpyxl resets them once a sheet has been read),
+        # then the leading rows of each candidate sheet, raw (no header assumed)
+        candidates = sheet_names if sheet_name is None else [sheet_name]
+        declared_rows = {name: _sheet_row_count(excel_file, name) for name in candidates}
+        samples = {name: excel_file.parse(name, header=None, nrows=EXCEL_SAMPLE_ROWS) for name in candidates}
+
         if sheet_name is None:
             # Simple heuristic: Find sheet with most non-empty values
             best_sheet = sheet_names[0]
             max_non_null = -1
-            
             for name in sheet_names:
-                # Load header=None to see full raw content
-                test_df = excel_file.parse(name, header=None)
-                non_null_count = test_df.notna().sum().sum()
+                non_null_count = _sheet_population(samples[name], declared_rows[name])
                 if non_null_count > max_non_null:
                     max_non_null = non_null_count
                     best_sheet = name
             sheet_name = best_sheet
 
-        # Load raw sheet without assuming first row is header
-        df_raw = excel_file.parse(sheet_name, header=None)
-        
-        # Heuristic to find header row: First row with at least 2 non-empty columns 
-        # that doesn't look like purely numeric data
-        header_row_idx = 0
-        for i, row in df_raw.iterrows():
-            non_null = row.dropna()
-            if len(non_null) >= 2:
-                # Check if it's mostly strings (likely header)
-                if sum(isinstance(val, str) for val in non_null) >= len(non_null) * 0.5:
-                    header_row_idx = i
-                    break
-        
-        # Re-read or slice from header row
+        # 2. Header row from the sample, then a single full parse from there
+        header_row_idx = _find_header_row(samples[sheet_name])
         df = excel_file.parse(sheet_name, skiprows=header_row_idx)
             
         # Cleanup: Remove completely empty rows/cols
@@ -154,60 +376,52 @@ def detect_domain(df: pd.DataFrame) -> str:
         return best_match
     return "General"
 
-def detect_anomalies(df: pd.DataFrame) -> list:
+def detect_anomalies(df: pd.DataFrame, profile: DatasetProfile = None) -> list:
+    profile = get_profile(df, profile)
     anomalies = []
     
     # Check for duplicates
-    duplicate_count = df.duplicated().sum()
+    duplicate_count = profile.duplicate_count
     if duplicate_count > 0:
         anomalies.append(f"Found {duplicate_count} duplicate rows.")
         
-    for col in df.select_dtypes(include=[np.number]).columns:
-        # Check for outliers using IQR
-        Q1 = df[col].quantile(0.25)
-        Q3 = df[col].quantile(0.75)
-        IQR = Q3 - Q1
-        
-        # Define loose bounds to avoid too many false positives
-        lower_bound = Q1 - 3 * IQR
-        upper_bound = Q3 + 3 * IQR
-        
-        outliers = df[(df[col] < lower_bound) | (df[col] > upper_bound)]
-        if not outliers.empty:
-            count = len(outliers)
+    for col in profile.numeric_columns:
+        # Check for outliers using IQR (see outlier_bounds)
+        count = profile.outlier_counts[col]
+        if count > 0:
             anomalies.append(f"Column '{col}' has {count} potential outliers (extreme values).")
             
         # Check for negative values where they might be inappropriate (heuristic)
-        if (df[col] < 0).any() and col.lower() in ['age', 'price', 'quantity', 'count']:
+        if profile.numeric_stats[col]["min"] < 0 and col.lower() in ['age', 'price', 'quantity', 'count']:
              anomalies.append(f"Column '{col}' contains negative values which might be incorrect.")
 
     return anomalies
 
-def generate_summary(df: pd.DataFrame, stats: list, domain: str) -> str:
+def generate_summary(df: pd.DataFrame, stats: list, domain: str, profile: DatasetProfile = None) -> str:
     summary = []
     
     row_count = len(df)
     summary.append(f"The dataset contains {row_count} records related to {domain} data.")
     
     # Trend analysis (if date column exists)
-    date_cols = [col for col in df.columns if 'date' in col.lower() or 'time' in col.lower()]
+    temporal = _temporal_index(df, profile)
     metric_cols = [s['name'] for s in stats if s.get('type') == 'numeric']
     
-    if date_cols and metric_cols:
-        date_col = date_cols[0]
+    if temporal.primary is not None and metric_cols:
+        date_col = temporal.primary
         try:
-            df[date_col] = pd.to_datetime(df[date_col], errors='coerce')
-            df_sorted = df.dropna(subset=[date_col]).sort_values(by=date_col)
+            span = temporal.span(date_col)
             
-            if not df_sorted.empty:
-                start_date = df_sorted[date_col].iloc[0].strftime('%Y-%m-%d')
-                end_date = df_sorted[date_col].iloc[-1].strftime('%Y-%m-%d')
+            if span is not None:
+                start_date = span[0].strftime('%Y-%m-%d')
+                end_date = span[1].strftime('%Y-%m-%d')
                 summary.append(f"The data covers the period from {start_date} to {end_date}.")
                 
                 # Simple Correlation check for summary
                 metric = metric_cols[0]
-                first_val = df_sorted[metric].iloc[0]
-                last_val = df_sorted[metric].iloc[-1]
+                order = temporal.order(date_col)
+                first_val = df[metric].iloc[order[0]]
+                last_val = df[metric].iloc[order[-1]]
                 
                 if first_val > 0:
                     change_pct = ((last_val - first_val) / first_val) * 100
@@ -226,19 +440,33 @@ def generate_summary(df: pd.DataFrame, stats: list, domain: str) -> str:
          
     return " ".join(summary)
 
-def generate_kpis(df: pd.DataFrame, domain: str) -> list:
+def generate_profile_summary(profile, stats: list, domain: str) -> str:
+    """
+    generate_summary for datasets only available as a profile (chunked uploads).
+    The date trend sentence needs the rows in order and is left out.
+    """
+    summary = [f"The dataset contains {profile.row_count} records related to {domain} data."]
+    for stat in stats[:2]:
+        if stat.get('type') == 'numeric':
+             summary.append(f"The average {stat['name']} is {stat.get('mean', 0):.2f}.")
+    if domain == "Financial" and any('profit' in c.lower() for c in profile.columns):
+         summary.append("Financial health Check: Profit margins detected.")
+    return " ".join(summary)
+
+def generate_kpis(df: pd.DataFrame, domain: str, profile: DatasetProfile = None) -> list:
+    profile = get_profile(df, profile)
     kpis = []
     
     # helper to find columns
-    date_cols = [col for col in df.columns if 'date' in col.lower() or 'time' in col.lower()]
+    temporal = _temporal_index(df, profile)
     
     # Identify potential metric columns based on domain or names
     metric_keywords = ['revenue', 'sales', 'profit', 'amount', 'cost', 'price', 'score', 'salary']
-    potential_metrics = [c for c in df.select_dtypes(include=[np.number]).columns if any(k in c.lower() for k in metric_keywords)]
+    potential_metrics = [c for c in profile.numeric_columns if any(k in c.lower() for k in metric_keywords)]
     
     if not potential_metrics and not df.empty:
          # Fallback to first numeric column if no specific keywords found
-         potential_metrics = [c for c in df.select_dtypes(include=[np.number]).columns][:1]
+         potential_metrics = profile.numeric_columns[:1]
 
     if not potential_metrics:
         return []
@@ -254,20 +482,17 @@ def generate_kpis(df: pd.DataFrame, domain: str) -> list:
     })
 
     # KPI 2: Trend if date exists
-    if date_cols:
-        date_col = date_cols[0]
+    if temporal.primary is not None:
         try:
-            df[date_col] = pd.to_datetime(df[date_col], errors='coerce')
-            df_sorted = df.dropna(subset=[date_col]).sort_values(by=date_col)
+            order = temporal.order(temporal.primary)
             
-            if not df_sorted.empty:
+            if len(order):
                 # Split into two halves for simple comparison
-                mid_point = len(df_sorted) // 2
-                period1 = df_sorted.iloc[:mid_point]
-                period2 = df_sorted.iloc[mid_point:]
+                mid_point = len(order) // 2
+                metric_values = df[main_metric]
                 
-                val1 = period1[main_metric].sum()
-                val2 = period2[main_metric].sum()
+                val1 = metric_values.iloc[order[:mid_point]].sum()
+                val2 = metric_values.iloc[order[mid_point:]].sum()
                 
                 if val1 > 0:
                     change = ((val2 - val1) / val1) * 100
@@ -282,14 +507,21 @@ def generate_kpis(df: pd.DataFrame, domain: str) -> list:
             
     return kpis
 
-def process_data(df: pd.DataFrame):
+def _temporal_index(df: pd.DataFrame, profile=None) -> TemporalIndex:
+    """The profile's TemporalIndex, or a fresh one for profiles without (e.g. ChunkedProfile)."""
+    temporal = getattr(profile, "temporal", None)
+    return temporal if temporal is not None else TemporalIndex(df)
+
+def _or_zero(value):
+    return float(value) if pd.notnull(value) else 0
+
+def process_data(df: pd.DataFrame, profile: DatasetProfile = None):
+    profile = get_profile(df, profile)
     stats = []
-    for col in df.columns:
-        col_data = df[col]
-        
+    for col in profile.columns:
         # Basic stats
-        missing_count = int(col_data.isna().sum())
-        unique_count = int(col_data.nunique())
+        missing_count = int(profile.null_counts[col])
+        unique_count = int(profile.distinct_counts[col])
         
         col_stats = {
             "name": col,
@@ -298,22 +530,23 @@ def process_data(df: pd.DataFrame):
         }
         
         # Determine type and compute numeric stats if applicable
-        if pd.api.types.is_numeric_dtype(col_data):
+        if profile.column_types[col] == "numeric":
             col_stats["type"] = "numeric"
-            if not col_data.empty:
+            if profile.row_count > 0:
                 # Advanced Stats
-                median = float(col_data.median()) if pd.notnull(col_data.median()) else 0
-                q1 = float(col_data.quantile(0.25)) if pd.notnull(col_data.quantile(0.25)) else 0
-                q3 = float(col_data.quantile(0.75)) if pd.notnull(col_data.quantile(0.75)) else 0
+                raw = profile.numeric_stats[col]
+                median = _or_zero(raw["median"])
+                q1 = _or_zero(raw["q1"])
+                q3 = _or_zero(raw["q3"])
                 iqr = q3 - q1
-                skew = float(col_data.skew()) if pd.notnull(col_data.skew()) else 0
-                kurt = float(col_data.kurtosis()) if pd.notnull(col_data.kurtosis()) else 0
+                skew = _or_zero(raw["skew"])
+                kurt = _or_zero(raw["kurtosis"])
                 
                 col_stats.update({
-                    "min": float(col_data.min()) if pd.notnull(col_data.min()) else 0,
-                    "max": float(col_data.max()) if pd.notnull(col_data.max()) else 0,
-                    "mean": float(col_data.mean()) if pd.notnull(col_data.mean()) else 0,
-                    "std": float(col_data.std()) if pd.notnull(col_data.std()) else 0,
+                    "min": _or_zero(raw["min"]),
+                    "max": _or_zero(raw["max"]),
+                    "mean": _or_zero(raw["mean"]),
+                    "std": _or_zero(raw["std"]),
                     "median": median,
                     "q1": q1,
                     "q3": q3,
@@ -329,13 +562,14 @@ def process_data(df: pd.DataFrame):
     return stats
 
 
-def calculate_quality_score(df: pd.DataFrame) -> dict:
+def calculate_quality_score(df: pd.DataFrame, profile: DatasetProfile = None) -> dict:
+    profile = get_profile(df, profile)
     score = 100
     penalties = []
 
     # 1. Missing Values Penalty
-    total_cells = df.size
-    total_missing = df.isna().sum().sum()
+    total_cells = profile.row_count * len(profile.columns)
+    total_missing = profile.total_missing
     missing_pct = (total_missing / total_cells) * 100 if total_cells > 0 else 0
     
     if missing_pct > 0:
@@ -344,23 +578,21 @@ def calculate_quality_score(df: pd.DataFrame) -> dict:
         penalties.append(f"Missing Values: -{penalty:.1f} ({(missing_pct):.1f}% data missing)")
 
     # 2. Duplicate Rows Penalty
-    duplicate_rows = df.duplicated().sum()
+    duplicate_rows = profile.duplicate_count
     if duplicate_rows > 0:
-        duplicate_pct = (duplicate_rows / len(df)) * 100
+        duplicate_pct = (duplicate_rows / profile.row_count) * 100
         penalty = min(20, duplicate_pct * 2) # Cap at 20 points
         score -= penalty
         penalties.append(f"Duplicate Rows: -{penalty:.1f} ({duplicate_rows} duplicates found)")
 
     # 3. Data Types Uniformity (Heuristic)
     mixed_type_penalty = 0
-    for col in df.select_dtypes(include=['object']):
-        try:
-             numeric_conversion = pd.to_numeric(df[col], errors='coerce')
-             valid_ratio = numeric_conversion.notna().sum() / len(df)
-             if valid_ratio > 0.8 and valid_ratio < 1.0:
-                 mixed_type_penalty += 5
-        except:
-            pass
+    for col, numeric_count in profile.numeric_parse_counts.items():
+        if profile.row_count == 0:
+            break
+        valid_ratio = numeric_count / profile.row_count
+        if valid_ratio > 0.8 and valid_ratio < 1.0:
+            mixed_type_penalty += 5
     
     if mixed_type_penalty > 0:
         actual_penalty = min(15, mixed_type_penalty)
@@ -373,12 +605,13 @@ def calculate_quality_score(df: pd.DataFrame) -> dict:
         "grade": "A" if score >= 90 else "B" if score >= 80 else "C" if score >= 60 else "D"
     }
 
-def generate_recommendations(df: pd.DataFrame) -> list:
+def generate_recommendations(df: pd.DataFrame, profile: DatasetProfile = None) -> list:
+    profile = get_profile(df, profile)
     recs = []
     
     # 1. Date Column
-    date_cols = [col for col in df.columns if 'date' in col.lower() or 'time' in col.lower()]
-    has_datetime = any(pd.api.types.is_datetime64_any_dtype(df[col]) for col in df.columns)
+    date_cols = [col for col in profile.columns if 'date' in col.lower() or 'time' in col.lower()]
+    has_datetime = len(profile.datetime_columns) > 0
     
     if not date_cols and not has_datetime:
         recs.append("Add a 'Date' or 'Time' column to enable time-series analysis and trend visualization.")
@@ -386,23 +619,23 @@ def generate_recommendations(df: pd.DataFrame) -> list:
         recs.append(f"Convert column '{date_cols[0]}' to DateTime format for better time-based features.")
 
     # 2. Missing Values
-    missing_series = df.isna().sum()
+    missing_series = profile.null_counts
     cols_with_missing = missing_series[missing_series > 0]
     if not cols_with_missing.empty:
         for col, count in cols_with_missing.items():
-            pct = (count / len(df)) * 100
+            pct = (count / profile.row_count) * 100
             if pct > 10:
                 recs.append(f"Column '{col}' has {pct:.1f}% missing values. Consider imputing with Mean/Median or dropping it.")
     
     # 3. Categorical High Cardinality
-    for col in df.select_dtypes(include=['object', 'category']):
-        unique_count = df[col].nunique()
-        if unique_count > 50 and unique_count < len(df) * 0.9:
+    for col in profile.categorical_columns:
+        unique_count = profile.distinct_counts[col]
+        if unique_count > 50 and unique_count < profile.row_count * 0.9:
            recs.append(f"Column '{col}' has high cardinality ({unique_count} unique values). Consider grouping minor categories.")
 
     # 4. Id Columns
-    for col in df.columns:
-        if 'id' in col.lower() and df[col].nunique() == len(df):
+    for col in profile.columns:
+        if 'id' in col.lower() and profile.distinct_counts[col] == profile.row_count:
              recs.append(f"Column '{col}' appears to be a unique identifier. It provides no analytical value for aggregation.")
 
     return recs
@@ -450,34 +683,114 @@ def compare_datasets(df1: pd.DataFrame, df2: pd.DataFrame, name1: str, name2: st
         "value_comparison": comparison_stats
     }
 
-def calculate_advanced_correlations(df: pd.DataFrame) -> list:
-    numeric_df = df.select_dtypes(include=[np.number])
-    if numeric_df.empty:
+def calculate_advanced_correlations(df: pd.DataFrame, profile: DatasetProfile = None,
+                                    threshold: float = CORRELATION_THRESHOLD, top_k: int = None,
+                                    dtype=None, method: str = 'pearson') -> list:
+    """
+    Column pairs with |r| > threshold, strongest first (at most top_k), for one of
+    CORRELATION_METHODS: pearson/spearman/kendall between numeric columns, cramers_v
+    between categorical columns, correlation_ratio from categorical (col1) to numeric (col2).
+    dtype=np.float32 computes pearson/spearman pairs straight from df in single precision,
+    block by block, instead of from the profile's cached float64 matrix.
+    """
+    if method not in CORRELATION_METHODS:
+        raise ValueError(f"Unknown correlation method: {method}")
+    profile = get_profile(df, profile)
+    if profile.row_count == 0:
         return []
-        
-    corr_matrix = numeric_df.corr(method='pearson')
-    correlations = []
-    columns = corr_matrix.columns
-    
-    for i in range(len(columns)):
-        for j in range(i+1, len(columns)):
-            col1 = columns[i]
-            col2 = columns[j]
-            val = corr_matrix.iloc[i, j]
-            
-            if abs(val) > 0.1: 
-                correlations.append({
-                    "col1": col1,
-                    "col2": col2,
-                    "correlation": float(val)
-                })
-                
-    correlations.sort(key=lambda x: abs(x['correlation']), reverse=True)
-    return correlations
 
-def merge_datasets(data1: list, data2: list, merge_key: str, how: str = 'inner'):
+    if method in ('cramers_v', 'correlation_ratio'):
+        names, codes, levels = _category_codes(df, profile.categorical_columns)
+        if method == 'cramers_v':
+            return matrix_pairs(cramers_v_matrix(codes, levels), names, threshold, top_k)
+        if not names or not profile.numeric_columns:
+            return []
+        values = df[profile.numeric_columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        return cross_pairs(correlation_ratio_matrix(codes, levels, values), names,
+                           profile.numeric_columns, threshold, top_k)
+
+    if not profile.numeric_columns:
+        return []
+    if method == 'pearson' and (dtype is None or df is None):
+        corr_matrix = profile.correlation_matrix
+        return matrix_pairs(corr_matrix.to_numpy(), list(corr_matrix.columns), threshold, top_k)
+
+    values = df[profile.numeric_columns].to_numpy(dtype=np.float64, na_value=np.nan)
+    if method == 'kendall':
+        return matrix_pairs(kendall_matrix(values), profile.numeric_columns, threshold, top_k)
+    if method == 'spearman':
+        values = rank_columns(values)
+    return strongest_pairs(values, profile.numeric_columns, threshold, top_k, dtype=dtype or np.float64)
+
+def _category_codes(df: pd.DataFrame, columns: list) -> tuple:
+    """
+    Integer codes (-1 for missing) and level counts of the categorical columns with
+    2..ASSOCIATION_MAX_LEVELS levels; others carry no association signal.
+    """
+    names, codes, levels = [], [], []
+    for col in columns:
+        col_codes, uniques = pd.factorize(df[col])
+        if 2 <= len(uniques) <= ASSOCIATION_MAX_LEVELS:
+            names.append(col)
+            codes.append(col_codes)
+            levels.append(len(uniques))
+    return names, codes, levels
+
+def correlation_heatmap(df: pd.DataFrame, profile: DatasetProfile = None, method: str = 'pearson',
+                        max_columns: int = HEATMAP_MAX_COLUMNS, select: str = 'variance',
+                        encoding: str = 'float32', cluster: bool = True, dtype=None) -> dict:
+    """
+    Dense correlation matrix of the numeric columns for heatmaps (pearson/spearman/kendall),
+    encoded by transport.encode_matrix, with "columns" in display order.
+    Beyond max_columns (None or 0: no cap) only the most variable columns (select='variance', chosen before
+    computing) or the most correlated ones (select='correlation', by sum of |r|) are kept.
+    cluster orders the columns by hierarchical clustering instead of dataset order.
+    """
+    if method not in HEATMAP_METHODS:
+        raise ValueError(f"Heatmaps support {', '.join(HEATMAP_METHODS)}, not {method}")
+    profile = get_profile(df, profile)
+    columns = list(profile.numeric_columns)
+    total_columns = len(columns)
+
+    # 1. Cap by variance before computing anything
+    capped = bool(max_columns) and total_columns > max_columns
+    if capped and select == 'variance':
+        variances = np.array([profile.numeric_stats[col]["std"] for col in columns], dtype=np.float64)
+        keep = np.sort(np.argsort(-np.nan_to_num(variances, nan=-1.0), kind='stable')[:max_columns])
+        columns = [columns[i] for i in keep]
+
+    # 2. The matrix, reusing the profile's cached Pearson matrix when it covers the columns
+    # (or when there are no rows, e.g. a chunked profile)
+    if method == 'pearson' and (df is None or (dtype is None and len(columns) == total_columns)):
+        matrix = profile.correlation_matrix.loc[columns, columns].to_numpy()
+    else:
+        values = df[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        if method == 'pearson':
+            matrix = pearson_matrix(values, dtype or np.float64)
+        elif method == 'spearman':
+            matrix = spearman_matrix(values, dtype or np.float64)
+        else:
+            matrix = kendall_matrix(values)
+
+    # 3. Cap by correlation strength once the matrix is known
+    if capped and select == 'correlation':
+        strength = np.nansum(np.abs(matrix), axis=0) - np.abs(np.nan_to_num(np.diag(matrix)))
+        keep = np.sort(np.argsort(-strength, kind='stable')[:max_columns])
+        matrix = matrix[np.ix_(keep, keep)]
+        columns = [columns[i] for i in keep]
+
+    order = cluster_order(matrix) if cluster else np.arange(len(columns))
+    return {
+        "method": method,
+        "columns": [columns[i] for i in order],
+        "total_columns": total_columns,
+        "clustered": bool(cluster),
+        **encode_matrix(matrix[np.ix_(order, order)], encoding)
+    }
+
+def merge_datasets(data1, data2, merge_key: str, how: str = 'inner'):
     """
-    Merges two datasets and returns the merged DataFrame and its stats.
+    Merges two datasets (lists of records or DataFrames) and returns the merged DataFrame and its stats.
     """
     df1 = pd.DataFrame(data1)
     df2 = pd.DataFrame(data2)
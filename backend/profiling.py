@@ -0,0 +1,364 @@
+import os
+import pandas as pd
+import numpy as np
+import warnings
+from functools import cached_property
+
+from correlation import pearson_matrix
+from temporal import TemporalIndex
+from sketches import (
+    DistinctCounter, KLLSketch, hash_column, kll_k_for_error, hll_precision_for_error
+)
+
+# Default error bounds of the approximate profiling mode
+APPROX_QUANTILE_ERROR = float(os.getenv("APPROX_QUANTILE_ERROR", "0.01"))
+APPROX_DISTINCT_ERROR = float(os.getenv("APPROX_DISTINCT_ERROR", "0.01"))
+# Values fed to the sketches at a time, bounding the temporary hash/float arrays
+SKETCH_BLOCK_ROWS = 1_000_000
+
+
+class DatasetProfile:
+    """
+    Column aggregates shared by the upload analyzers.
+    Each aggregate is computed on first use and reused by every later consumer,
+    so one upload scans the frame once per aggregate instead of once per analyzer.
+    The profiled frame must not be modified while the profile is in use.
+
+    The analyzers in processing.py only read the attributes below, so any object
+    exposing them (e.g. chunked.ChunkedProfile) can stand in for a DatasetProfile.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+
+    # Shape
+    @cached_property
+    def columns(self) -> list:
+        return list(self.df.columns)
+
+    @cached_property
+    def row_count(self) -> int:
+        return len(self.df)
+
+    # Dtype classification
+    @cached_property
+    def numeric_columns(self) -> list:
+        """Columns selected by select_dtypes(np.number) (booleans excluded)."""
+        return list(self.df.select_dtypes(include=[np.number]).columns)
+
+    @cached_property
+    def object_columns(self) -> list:
+        return list(self.df.select_dtypes(include=['object']).columns)
+
+    @cached_property
+    def categorical_columns(self) -> list:
+        """Object and category columns."""
+        return list(self.df.select_dtypes(include=['object', 'category']).columns)
+
+    @cached_property
+    def datetime_columns(self) -> list:
+        return [col for col in self.df.columns if pd.api.types.is_datetime64_any_dtype(self.df[col])]
+
+    @cached_property
+    def temporal(self) -> TemporalIndex:
+        """Date columns parsed once, with their chronological row order."""
+        return TemporalIndex(self.df)
+
+    @cached_property
+    def column_types(self) -> dict:
+        """'numeric' or 'categorical' per column, as reported in the stats payload."""
+        return {
+            col: "numeric" if pd.api.types.is_numeric_dtype(self.df[col]) else "categorical"
+            for col in self.df.columns
+        }
+
+    # Counts
+    @cached_property
+    def null_counts(self) -> pd.Series:
+        return self.df.isna().sum()
+
+    @cached_property
+    def total_missing(self) -> int:
+        return int(self.null_counts.sum())
+
+    @cached_property
+    def distinct_counts(self) -> pd.Series:
+        return self.df.nunique()
+
+    @cached_property
+    def duplicate_mask(self) -> pd.Series:
+        return self.df.duplicated()
+
+    @cached_property
+    def duplicate_count(self) -> int:
+        return int(self.duplicate_mask.sum())
+
+    @cached_property
+    def numeric_parse_counts(self) -> dict:
+        """Per object or category column, how many values pd.to_numeric can parse."""
+        counts = {}
+        for col in self.categorical_columns:
+            values = self.df[col]
+            try:
+                if isinstance(values.dtype, pd.CategoricalDtype):
+                    # Parse each category once, then count its rows
+                    parsed = pd.to_numeric(values.cat.categories.to_series(), errors='coerce').notna().to_numpy()
+                    codes = values.cat.codes.to_numpy()
+                    counts[col] = int(parsed[codes[codes >= 0]].sum())
+                else:
+                    counts[col] = pd.to_numeric(values, errors='coerce').notna().sum()
+            except Exception:
+                pass
+        return counts
+
+    @cached_property
+    def outlier_counts(self) -> dict:
+        """Per numeric column, values outside [Q1 - 3*IQR, Q3 + 3*IQR]."""
+        counts = {}
+        for col in self.numeric_columns:
+            lower_bound, upper_bound = outlier_bounds(self.numeric_stats[col])
+            col_data = self.df[col]
+            counts[col] = int(((col_data < lower_bound) | (col_data > upper_bound)).sum())
+        return counts
+
+    @cached_property
+    def correlation_matrix(self) -> pd.DataFrame:
+        """Pairwise Pearson correlations between numeric columns (see correlation.pearson_matrix)."""
+        values = self.df[self.numeric_columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        return pd.DataFrame(pearson_matrix(values), index=self.numeric_columns, columns=self.numeric_columns)
+
+    # Numeric moments and quartiles
+    @cached_property
+    def numeric_stats(self) -> dict:
+        """
+        Raw min/max/mean/std/median/q1/q3/skew/kurtosis per numeric column
+        (every column typed 'numeric' in column_types). Values may be NaN.
+        """
+        return self._numeric_stats(exact_quantiles=True)
+
+    def _numeric_stats(self, exact_quantiles: bool) -> dict:
+        columns = [col for col, col_type in self.column_types.items() if col_type == "numeric"]
+        # NumPy int/float columns are batched into one 2-D block; other numeric
+        # dtypes (bool, nullable extension types) keep the per-column path
+        block_columns = [col for col in columns if _is_block_column(self.df[col])]
+        stats = {}
+        if block_columns and len(self.df) > 0:
+            stats.update(_block_numeric_stats(self.df, block_columns, exact_quantiles))
+        for col in columns:
+            if col not in stats:
+                stats[col] = _column_numeric_stats(self.df[col], exact_quantiles)
+        return {col: stats[col] for col in columns}
+
+    def accuracy(self) -> dict:
+        """
+        Which reported figures are estimates, and their error bounds.
+        """
+        return {"approximate": False}
+
+
+class ApproximateProfile(DatasetProfile):
+    """
+    DatasetProfile whose quartiles and distinct counts come from mergeable sketches
+    instead of full sorts and per-column hash tables:
+    - median/q1/q3 (and so IQR and outlier fences) from KLL, rank error ~quantile_error
+    - distinct counts from HyperLogLog, relative standard error <= distinct_error
+      (exact while a column has at most distinct_exact_limit values)
+    Everything else is exact. The sketches can be merged with those of other
+    profiles of the same columns, e.g. chunk or partition profiles.
+    """
+
+    def __init__(self, df: pd.DataFrame, quantile_error: float = APPROX_QUANTILE_ERROR,
+                 distinct_error: float = APPROX_DISTINCT_ERROR, distinct_exact_limit: int = 10000):
+        super().__init__(df)
+        self.quantile_error = quantile_error
+        self.distinct_error = distinct_error
+        self.distinct_exact_limit = distinct_exact_limit
+
+    @cached_property
+    def quantile_sketches(self) -> dict:
+        sketches = {}
+        k = kll_k_for_error(self.quantile_error)
+        for col, col_type in self.column_types.items():
+            if col_type != "numeric":
+                continue
+            sketch = KLLSketch(k=k)
+            values = self.df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+            for start in range(0, len(values), SKETCH_BLOCK_ROWS):
+                sketch.update(values[start:start + SKETCH_BLOCK_ROWS])
+            sketches[col] = sketch
+        return sketches
+
+    @cached_property
+    def distinct_sketches(self) -> dict:
+        sketches = {}
+        precision = hll_precision_for_error(self.distinct_error)
+        for col in self.df.columns:
+            counter = DistinctCounter(exact_limit=self.distinct_exact_limit, precision=precision)
+            for start in range(0, len(self.df), SKETCH_BLOCK_ROWS):
+                block = self.df[col].iloc[start:start + SKETCH_BLOCK_ROWS]
+                counter.update_hashes(hash_column(block)[block.notna().to_numpy()])
+            sketches[col] = counter
+        return sketches
+
+    @cached_property
+    def distinct_counts(self) -> pd.Series:
+        non_null = len(self.df) - self.null_counts
+        return pd.Series({
+            col: int(round(min(counter.estimate(), non_null[col])))
+            for col, counter in self.distinct_sketches.items()
+        }, index=self.df.columns, dtype=np.int64)
+
+    @cached_property
+    def numeric_stats(self) -> dict:
+        stats = self._numeric_stats(exact_quantiles=False)
+        for col, col_stats in stats.items():
+            q1, median, q3 = self.quantile_sketches[col].quantiles([0.25, 0.5, 0.75])
+            col_stats.update(q1=q1, median=median, q3=q3)
+        return stats
+
+    def accuracy(self) -> dict:
+        return {
+            "approximate": True,
+            "estimated": ["median", "q1", "q3", "iqr", "unique", "outliers"],
+            "quantile_rank_error": KLLSketch(k=kll_k_for_error(self.quantile_error)).rank_error,
+            "distinct_count_relative_error": 1.04 / 2 ** (hll_precision_for_error(self.distinct_error) / 2)
+        }
+
+
+# Integers beyond 2**53 lose precision in float64, where pandas would interpolate quantiles exactly
+_FLOAT_EXACT_INT = 2 ** 53
+
+def _is_block_column(col_data: pd.Series) -> bool:
+    dtype = col_data.dtype
+    if not isinstance(dtype, np.dtype):
+        return False
+    if dtype in (np.float64, np.float32):
+        return True
+    if dtype.kind in "iu":
+        values = col_data.to_numpy()
+        return len(values) == 0 or (values.min() >= -_FLOAT_EXACT_INT and values.max() <= _FLOAT_EXACT_INT)
+    return False
+
+def _column_numeric_stats(col_data: pd.Series, quantiles: bool = True) -> dict:
+    return {
+        "min": col_data.min(),
+        "max": col_data.max(),
+        "mean": col_data.mean(),
+        "std": col_data.std(),
+        "median": col_data.median() if quantiles else np.nan,
+        "q1": col_data.quantile(0.25) if quantiles else np.nan,
+        "q3": col_data.quantile(0.75) if quantiles else np.nan,
+        "skew": col_data.skew(),
+        "kurtosis": col_data.kurtosis()
+    }
+
+def _zero_out_fperr(value):
+    return value.dtype.type(0) if np.abs(value) < 1e-14 else value
+
+def _block_numeric_stats(df: pd.DataFrame, columns: list, quantiles: bool = True) -> dict:
+    """
+    Computes _column_numeric_stats for many int/float columns in a few NumPy passes.
+    Columns are rows of one (k, n) float64 block, so every reduction runs over a
+    contiguous row exactly like the Series reductions do, and the per-column
+    finishing arithmetic mirrors pandas.core.nanops. Results are bit-identical
+    to calling the Series methods column by column (for float32 columns, to the
+    float64 column they were compacted from).
+    With quantiles=False the median and quartiles are left NaN, skipping their selection passes.
+    """
+    n_rows = len(df)
+    values = np.empty((len(columns), n_rows), dtype=np.float64)
+    int_rows = []
+    for i, col in enumerate(columns):
+        col_values = df[col].to_numpy()
+        values[i] = col_values
+        if col_values.dtype.kind in "iu":
+            int_rows.append(i)
+
+    mask = np.isnan(values)
+    counts = n_rows - mask.sum(axis=1)
+    filled = np.where(mask, 0.0, values)
+
+    # Moments: same two-pass centering as nanvar/nanskew/nankurt
+    sums = filled.sum(axis=1, dtype=np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        centers = sums / counts
+    adjusted = filled - centers[:, None]
+    np.putmask(adjusted, mask, 0)
+    adjusted2 = adjusted ** 2
+    m2 = adjusted2.sum(axis=1, dtype=np.float64)
+    m3 = (adjusted2 * adjusted).sum(axis=1, dtype=np.float64)
+    m4 = (adjusted2 ** 2).sum(axis=1, dtype=np.float64)
+    del adjusted, adjusted2
+
+    # nanmean sums integer columns in their own dtype, not after the float cast
+    means = sums.copy()
+    for i in int_rows:
+        means[i] = df[columns[i]].to_numpy().sum(dtype=np.float64)
+
+    # Extremes, median and quartiles
+    np.putmask(filled, mask, np.inf)
+    mins = filled.min(axis=1)
+    np.putmask(filled, mask, -np.inf)
+    maxs = filled.max(axis=1)
+    del filled
+    if quantiles:
+        with warnings.catch_warnings():
+            # All-NaN columns yield NaN, as with the Series methods
+            warnings.simplefilter("ignore", RuntimeWarning)
+            medians = np.nanmedian(values, axis=1)
+            quartiles = np.nanquantile(values, [0.25, 0.75], axis=1)
+    else:
+        medians = np.full(len(columns), np.nan)
+        quartiles = np.full((2, len(columns)), np.nan)
+
+    stats = {}
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for i, col in enumerate(columns):
+            count = np.float64(counts[i])
+            stats[col] = {
+                "min": mins[i] if count > 0 else np.nan,
+                "max": maxs[i] if count > 0 else np.nan,
+                "mean": means[i] / count if count > 0 else np.nan,
+                "std": np.sqrt(m2[i] / (count - 1)) if count > 1 else np.nan,
+                "median": medians[i],
+                "q1": quartiles[0, i],
+                "q3": quartiles[1, i],
+                "skew": _skew_from_moments(count, m2[i], m3[i]),
+                "kurtosis": _kurtosis_from_moments(count, m2[i], m4[i])
+            }
+    return stats
+
+def _skew_from_moments(count, m2, m3):
+    if count < 3:
+        return np.nan
+    m2 = _zero_out_fperr(m2)
+    m3 = _zero_out_fperr(m3)
+    if m2 == 0:
+        return np.float64(0)
+    return (count * (count - 1) ** 0.5 / (count - 2)) * (m3 / m2 ** 1.5)
+
+def _kurtosis_from_moments(count, m2, m4):
+    if count < 4:
+        return np.nan
+    adj = 3 * (count - 1) ** 2 / ((count - 2) * (count - 3))
+    numerator = _zero_out_fperr(count * (count + 1) * (count - 1) * m4)
+    denominator = _zero_out_fperr((count - 2) * (count - 3) * m2 ** 2)
+    if denominator == 0:
+        return np.float64(0)
+    return numerator / denominator - adj
+
+
+def outlier_bounds(numeric_stats: dict) -> tuple:
+    """
+    Loose IQR fences (3 * IQR) used for outlier detection, to avoid too many false positives.
+    """
+    IQR = numeric_stats["q3"] - numeric_stats["q1"]
+    return numeric_stats["q1"] - 3 * IQR, numeric_stats["q3"] + 3 * IQR
+
+def get_profile(df: pd.DataFrame, profile: DatasetProfile = None) -> DatasetProfile:
+    """
+    Returns the given profile, or a fresh one for df when the caller has none.
+    """
+    if profile is not None:
+        return profile
+    return DatasetProfile(df)
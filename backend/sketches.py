@@ -0,0 +1,305 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+# Mergeable, bounded-memory summaries used when a dataset is profiled chunk by chunk.
+
+
+def hash_column(values, numbers=None) -> np.ndarray:
+    """
+    64-bit hash of every value, nulls included. Numbers, and strings that parse as
+    numbers, are hashed as float64 (timestamps as int64), so the same column hashes alike whether a chunk
+    parsed it as int, float or object. (Strings such as "1" and "1.0" therefore collide.)
+    numbers may pass pd.to_numeric(values, errors='coerce') when the caller already has it.
+    """
+    series = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return pd.util.hash_array(series.to_numpy(dtype=np.float64, na_value=np.nan))
+    if pd.api.types.is_datetime64_any_dtype(series):
+        # Timestamps hash as their int64 nanoseconds (UTC for tz-aware values)
+        if getattr(series.dt, "tz", None) is not None:
+            series = series.dt.tz_convert(None)
+        ns = series.to_numpy(dtype='datetime64[ns]')
+        hashes = pd.util.hash_array(ns.view(np.int64))
+        hashes[np.isnat(ns)] = _NULL_HASH
+        return hashes
+
+    # categorize=False hashes every value directly; factorizing first only pays off for few distinct values
+    hashes = pd.util.hash_array(series.to_numpy(dtype=object), categorize=False)
+    if numbers is None:
+        numbers = maybe_to_numeric(series)
+    if numbers is not None:
+        numbers = np.asarray(numbers, dtype=np.float64)
+        parsed = ~np.isnan(numbers)
+        if parsed.any():
+            hashes[parsed] = pd.util.hash_array(numbers[parsed])
+    hashes[series.isna().to_numpy()] = _NULL_HASH
+    return hashes
+
+def maybe_to_numeric(series: pd.Series, sample_size: int = 256):
+    """
+    pd.to_numeric(series, errors='coerce'), or None when no value of a leading sample
+    parses as a number. Skips the costly per-value parse for plain text columns.
+    """
+    sample = series.dropna().iloc[:sample_size]
+    try:
+        if len(sample) and pd.to_numeric(sample, errors='coerce').isna().all():
+            return None
+        return pd.to_numeric(series, errors='coerce')
+    except (TypeError, ValueError):
+        return None
+
+def hash_values(values) -> np.ndarray:
+    """
+    hash_column of the non-null values only.
+    """
+    series = pd.Series(values)
+    return hash_column(series)[series.notna().to_numpy()]
+
+_NULL_HASH = pd.util.hash_array(np.array([np.nan]))[0]
+_FLOAT_EXACT = np.uint64(2 ** 53)
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """Vectorized int.bit_length for uint64 arrays."""
+    if len(values) == 0 or values.max() < _FLOAT_EXACT:
+        # float64 holds these exactly, and frexp's exponent is the bit length
+        return np.frexp(values.astype(np.float64))[1].astype(np.int64)
+    values = values.copy()
+    lengths = np.zeros(values.shape, dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        big = values >= (np.uint64(1) << np.uint64(shift))
+        lengths[big] += shift
+        values[big] >>= np.uint64(shift)
+    lengths[values > 0] += 1
+    return lengths
+
+
+def kll_k_for_error(rank_error: float) -> int:
+    """KLL size parameter whose rank error stays around rank_error."""
+    return max(8, int(math.ceil(1.7 / rank_error)))
+
+def hll_precision_for_error(relative_error: float) -> int:
+    """Smallest HyperLogLog precision whose standard error is at most relative_error."""
+    return min(18, max(4, int(math.ceil(2 * math.log2(1.04 / relative_error)))))
+
+
+def _sorted_unique(values: np.ndarray) -> np.ndarray:
+    # Sort-based; np.unique's hash-based path is several times slower on large uint64 arrays
+    values = np.sort(values)
+    if len(values) == 0:
+        return values
+    keep = np.empty(len(values), dtype=bool)
+    keep[0] = True
+    np.not_equal(values[1:], values[:-1], out=keep[1:])
+    return values[keep]
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter over 64-bit hashes.
+    Relative standard error is about 1.04 / sqrt(2 ** precision).
+    """
+
+    def __init__(self, precision: int = 14):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def update_hashes(self, hashes: np.ndarray):
+        if len(hashes) == 0:
+            return
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.int64)
+        remainder = hashes & ((np.uint64(1) << (np.uint64(64) - p)) - np.uint64(1))
+        # Position of the leftmost 1-bit in the remaining 64 - p bits
+        rank = (64 - self.precision) - _bit_length(remainder) + 1
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def merge(self, other: "HyperLogLog"):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> float:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros > 0:
+            # Linear counting is more accurate for small cardinalities
+            return m * math.log(m / zeros)
+        return float(raw)
+
+
+class DistinctCounter:
+    """
+    Exact distinct count while the number of distinct hashes stays under exact_limit,
+    then a HyperLogLog estimate. Memory is bounded by max(exact_limit, HLL registers).
+    """
+
+    def __init__(self, exact_limit: int = 10000, precision: int = 14):
+        self.exact_limit = exact_limit
+        self.precision = precision
+        self.exact = np.empty(0, dtype=np.uint64)
+        self.hll = None
+
+    @property
+    def is_exact(self) -> bool:
+        return self.hll is None
+
+    @property
+    def relative_error(self) -> float:
+        return 0.0 if self.hll is None else self.hll.relative_error
+
+    def update_hashes(self, hashes: np.ndarray):
+        if self.hll is not None:
+            self.hll.update_hashes(hashes)
+            return
+        self.exact = _sorted_unique(np.concatenate([self.exact, np.asarray(hashes, dtype=np.uint64)]))
+        if len(self.exact) > self.exact_limit:
+            self.hll = HyperLogLog(self.precision)
+            self.hll.update_hashes(self.exact)
+            self.exact = np.empty(0, dtype=np.uint64)
+
+    def update(self, values):
+        self.update_hashes(hash_values(values))
+
+    def merge(self, other: "DistinctCounter"):
+        if other.hll is None:
+            self.update_hashes(other.exact)
+            return
+        if self.hll is None:
+            self.hll = HyperLogLog(self.precision)
+            self.hll.update_hashes(self.exact)
+            self.exact = np.empty(0, dtype=np.uint64)
+        self.hll.merge(other.hll)
+
+    def estimate(self) -> float:
+        if self.hll is None:
+            return len(self.exact)
+        return self.hll.estimate()
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch. Keeps O(k log(n/k)) items; rank error is roughly 1.7 / k.
+    Items at level h stand for 2 ** h original values.
+    """
+
+    def __init__(self, k: int = 200, seed: int = 0):
+        self.k = k
+        self.levels = [np.empty(0, dtype=np.float64)]
+        self.count = 0
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def rank_error(self) -> float:
+        return 1.7 / self.k
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self.count += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other: "KLLSketch"):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0, dtype=np.float64))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self._compress()
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                items = np.sort(items)
+                # An odd item out stays at this level
+                keep = items[:len(items) % 2]
+                pairs = items[len(items) % 2:]
+                promoted = pairs[int(self._rng.integers(2))::2]
+                self.levels[level] = keep
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0, dtype=np.float64))
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                # Capacities depend on the depth, so re-check from the bottom
+                level = 0
+                continue
+            level += 1
+
+    def rank(self, value: float, inclusive: bool = False) -> float:
+        """Estimated number of values below value (at most value when inclusive)."""
+        total = 0.0
+        for h, items in enumerate(self.levels):
+            below = items <= value if inclusive else items < value
+            total += 2 ** h * int(np.count_nonzero(below))
+        return total
+
+    def quantiles(self, qs) -> list:
+        if self.count == 0:
+            return [np.nan for _ in qs]
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items_h), 2 ** h, dtype=np.float64) for h, items_h in enumerate(self.levels)])
+        order = np.argsort(items, kind="mergesort")
+        items = items[order]
+        cumulative = np.cumsum(weights[order])
+        total = cumulative[-1]
+        results = []
+        for q in qs:
+            index = int(np.searchsorted(cumulative, q * total, side="left"))
+            results.append(float(items[min(index, len(items) - 1)]))
+        return results
+
+
+class RowHashFilter:
+    """
+    Bloom filter over 64-bit row hashes, used to count duplicate rows in bounded memory.
+    False positives (unique rows counted as duplicates) stay negligible while the
+    number of rows is well below size_bits / 10.
+    """
+
+    def __init__(self, size_bits: int = 8 * 64 * 1024 * 1024, num_hashes: int = 7):
+        self.size_bits = size_bits
+        self.num_hashes = num_hashes
+        self.bits = np.zeros((size_bits + 7) // 8, dtype=np.uint8)
+
+    def _positions(self, hashes: np.ndarray) -> np.ndarray:
+        low = (hashes & np.uint64(0xFFFFFFFF)).astype(np.uint64)
+        high = (hashes >> np.uint64(32)) | np.uint64(1)
+        steps = np.arange(self.num_hashes, dtype=np.uint64)
+        return ((low[:, None] + steps[None, :] * high[:, None]) % np.uint64(self.size_bits)).astype(np.int64)
+
+    def add_and_count_seen(self, hashes: np.ndarray) -> int:
+        """
+        Adds hashes and returns how many of them were already present,
+        counting repeats within the batch as well.
+        """
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if len(hashes) == 0:
+            return 0
+        unique = np.unique(hashes)
+        repeats_in_batch = len(hashes) - len(unique)
+
+        positions = self._positions(unique)
+        present = (self.bits[positions >> 3] >> (positions & 7).astype(np.uint8)) & 1
+        seen_before = int(np.count_nonzero(present.all(axis=1)))
+
+        flat = positions.ravel()
+        np.bitwise_or.at(self.bits, flat >> 3, (np.uint8(1) << (flat & 7).astype(np.uint8)))
+        return repeats_in_batch + seen_before
+
+    def merge(self, other: "RowHashFilter"):
+        np.bitwise_or(self.bits, other.bits, out=self.bits)
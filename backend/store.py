@@ -0,0 +1,305 @@
+import os
+import uuid
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import pandas as pd
+
+from cache import DATAFLOW_CACHE_DIR, private_dir
+from compaction import compact_frame, parse_dates
+from profiling import DatasetProfile
+from chunked import CHUNK_ROWS, DUPLICATE_FILTER_BITS_PER_ROW, profile_appendable, duplicate_filter_bits
+from pipeline import concat_uploads
+from transport import columnar_available, write_parquet, read_parquet
+
+# Memory budget for resident datasets. Least recently used datasets beyond it are spilled to disk.
+DATASET_STORE_MEMORY_MB = int(os.getenv("DATASET_STORE_MEMORY_MB", "1024"))
+# Spilled and spooled datasets; spills may be pickles, so the directory must be private (cache.private_dir)
+DATASET_STORE_DIR = os.getenv("DATASET_STORE_DIR", os.path.join(DATAFLOW_CACHE_DIR, "datasets"))
+
+
+class DatasetTooLarge(Exception):
+    """Raised by DatasetStore.get for file-backed datasets that do not fit the memory budget."""
+
+
+class DatasetStore:
+    """
+    Server-side registry of parsed datasets, referenced by id.
+    Keeps hot datasets in memory within a byte budget (LRU) and spills the rest to disk.
+    """
+
+    def __init__(self, memory_budget_bytes: int, spill_dir: str):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.spill_dir = spill_dir
+        self._lock = threading.RLock()
+        self._resident = OrderedDict()  # dataset_id -> DataFrame, oldest first
+        self._sizes = {}                # dataset_id -> resident bytes
+        self._spilled = {}              # dataset_id -> path on disk
+        self._meta = {}                 # dataset_id -> metadata dict
+        self._profiles = {}             # dataset_id -> DatasetProfile of the resident frame
+        self._files = {}                # dataset_id -> (path, reader, appender) for file-backed datasets
+        self._appendable = {}           # dataset_id -> ChunkedProfile kept current across appends
+        self._append_locks = {}         # dataset_id -> lock serializing appends
+
+    def put(self, df: pd.DataFrame, filename: str = None, profile: DatasetProfile = None) -> str:
+        """
+        Stores df and returns its id. profile, if given, must have been built on df
+        (e.g. by the upload pipeline in a worker process) and seeds the profile cache.
+        """
+        dataset_id = uuid.uuid4().hex
+        with self._lock:
+            self._meta[dataset_id] = {
+                "dataset_id": dataset_id,
+                "filename": filename,
+                "rows": len(df),
+                "columns": list(df.columns),
+                "created_at": datetime.now().isoformat(),
+                "version": 0  # bumped by every append
+            }
+            self._make_resident(dataset_id, df)
+            if profile is not None and dataset_id in self._resident:
+                self._profiles[dataset_id] = profile
+        return dataset_id
+
+    def put_file(self, path: str, reader, profile, filename: str = None, appender=None) -> str:
+        """
+        Registers a dataset that stays on disk, e.g. a chunked upload larger than the budget.
+        reader(chunksize) returns the whole frame for chunksize=None, else an iterator of chunks.
+        appender(rows), if given, adds rows to the file and makes the dataset appendable.
+        profile is kept for the dataset's lifetime since it cannot be rebuilt cheaply.
+        """
+        dataset_id = uuid.uuid4().hex
+        with self._lock:
+            self._meta[dataset_id] = {
+                "dataset_id": dataset_id,
+                "filename": filename,
+                "rows": profile.row_count,
+                "columns": list(profile.columns),
+                "created_at": datetime.now().isoformat(),
+                "version": 0  # bumped by every append
+            }
+            self._files[dataset_id] = (path, reader, appender)
+            self._profiles[dataset_id] = profile
+        return dataset_id
+
+    def iter_chunks(self, dataset_id: str, chunksize: int):
+        """
+        Yields the dataset as consecutive DataFrames of up to chunksize rows,
+        without loading file-backed datasets into memory.
+        """
+        with self._lock:
+            if dataset_id not in self._meta:
+                raise KeyError(dataset_id)
+            file_entry = self._files.get(dataset_id)
+        if file_entry is not None and dataset_id not in self._resident:
+            yield from file_entry[1](chunksize)
+            return
+        df = self.get(dataset_id)
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+
+    def append(self, dataset_id: str, rows: pd.DataFrame):
+        """
+        Adds rows (with the dataset's columns) to a stored dataset and returns its
+        appendable ChunkedProfile, updated with just those rows. The first append
+        profiles the existing rows once; the profile (sketches and a duplicate filter
+        sized for twice the rows, see chunked.duplicate_filter_bits) is then kept for later
+        appends, and rebuilt with a larger filter once the rows outgrow it (at most
+        DUPLICATE_FILTER_MB).
+        File-backed datasets get the rows written to their file. In-memory datasets get
+        a new frame: the stored rows and the new ones are stacked and compacted again,
+        so an append costs time proportional to the whole dataset, not only to the rows.
+        Raises KeyError for unknown ids and ValueError for file-backed datasets without an appender.
+        """
+        with self._lock:
+            if dataset_id not in self._meta:
+                raise KeyError(dataset_id)
+            lock = self._append_locks.setdefault(dataset_id, threading.Lock())
+            file_entry = self._files.get(dataset_id)
+        if file_entry is not None and file_entry[2] is None:
+            raise ValueError("This dataset does not accept appended rows")
+
+        with lock:
+            profile = self._appendable.get(dataset_id)
+            total = self._meta[dataset_id]["rows"] + len(rows)
+            capacity = duplicate_filter_bits(total) // DUPLICATE_FILTER_BITS_PER_ROW
+            if profile is None or profile.duplicate_capacity < min(total, capacity):
+                # Rebuilt from the stored rows when the filter would fill up, doubling its size
+                profile = profile_appendable(self.iter_chunks(dataset_id, CHUNK_ROWS), self._meta[dataset_id]["columns"],
+                                             duplicate_filter_bits=duplicate_filter_bits(total))
+            rows = profile.conform(rows)
+            if file_entry is None:
+                # Dates parsed at ingestion would otherwise be profiled, and stacked, as text
+                stored = self.get(dataset_id)
+                dates = {col: parse_dates(rows[col]) for col in rows.columns
+                         if col in stored.columns and rows[col].dtype == object
+                         and pd.api.types.is_datetime64_any_dtype(stored[col])}
+                if dates:
+                    rows = rows.assign(**dates)
+            profile.append(rows)
+
+            if file_entry is not None:
+                file_entry[2](rows)
+                with self._lock:
+                    # A resident copy of the file is stale now; the profile tracks the file
+                    self._resident.pop(dataset_id, None)
+                    self._sizes.pop(dataset_id, None)
+                    self._profiles[dataset_id] = profile
+            else:
+                # Appended rows widen compacted dtypes (e.g. new categories make text object again)
+                df, _ = compact_frame(concat_uploads([stored, rows]))
+                with self._lock:
+                    stale_spill = self._spilled.pop(dataset_id, None)
+                    self._profiles.pop(dataset_id, None)
+                    self._make_resident(dataset_id, df)
+                if stale_spill and os.path.exists(stale_spill):
+                    os.remove(stale_spill)
+
+            with self._lock:
+                self._appendable[dataset_id] = profile
+                self._meta[dataset_id]["rows"] = profile.row_count
+                self._meta[dataset_id]["version"] += 1
+            return profile
+
+    def get(self, dataset_id: str) -> pd.DataFrame:
+        """
+        Returns the stored DataFrame. Raises KeyError for unknown ids and DatasetTooLarge
+        for file-backed datasets larger than the memory budget (is_oversized), which are
+        only served by iter_chunks and their profile. Callers must treat the frame as read-only.
+        """
+        with self._lock:
+            if dataset_id in self._resident:
+                self._resident.move_to_end(dataset_id)
+                return self._resident[dataset_id]
+            if self.is_oversized(dataset_id):
+                raise DatasetTooLarge(dataset_id)
+            if dataset_id in self._files:
+                # File-backed datasets are parsed in full only when a caller needs the whole frame
+                df = self._files[dataset_id][1](None)
+            elif dataset_id in self._spilled:
+                df = _read_spilled(self._spilled[dataset_id])
+            else:
+                raise KeyError(dataset_id)
+            self._make_resident(dataset_id, df)
+            return df
+
+    def is_oversized(self, dataset_id: str) -> bool:
+        """
+        Whether a dataset is file-backed and its file alone exceeds the memory budget.
+        The file size is a lower bound of the parsed frame's size.
+        """
+        with self._lock:
+            if dataset_id not in self._meta:
+                raise KeyError(dataset_id)
+            if dataset_id not in self._files or dataset_id in self._resident:
+                return False
+            path = self._files[dataset_id][0]
+        return os.path.exists(path) and os.path.getsize(path) > self.memory_budget_bytes
+
+    def get_profile(self, dataset_id: str) -> DatasetProfile:
+        """
+        Returns the shared column profile of a stored dataset, creating it on first use.
+        """
+        with self._lock:
+            if dataset_id in self._files:
+                return self._profiles[dataset_id]
+            df = self.get(dataset_id)
+            if dataset_id not in self._profiles:
+                self._profiles[dataset_id] = DatasetProfile(df)
+            return self._profiles[dataset_id]
+
+    def info(self, dataset_id: str) -> dict:
+        with self._lock:
+            if dataset_id not in self._meta:
+                raise KeyError(dataset_id)
+            return {
+                **self._meta[dataset_id],
+                "resident": dataset_id in self._resident,
+                "memory_bytes": self._sizes.get(dataset_id)
+            }
+
+    def delete(self, dataset_id: str):
+        with self._lock:
+            if dataset_id not in self._meta:
+                raise KeyError(dataset_id)
+            self._meta.pop(dataset_id)
+            self._resident.pop(dataset_id, None)
+            self._sizes.pop(dataset_id, None)
+            self._profiles.pop(dataset_id, None)
+            self._appendable.pop(dataset_id, None)
+            self._append_locks.pop(dataset_id, None)
+            paths = [self._spilled.pop(dataset_id, None), self._files.pop(dataset_id, (None, None, None))[0]]
+        for path in paths:
+            if path and os.path.exists(path):
+                os.remove(path)
+
+    def __contains__(self, dataset_id) -> bool:
+        with self._lock:
+            return dataset_id in self._meta
+
+    def resident_bytes(self) -> int:
+        with self._lock:
+            return sum(self._sizes.values())
+
+    def _make_resident(self, dataset_id: str, df: pd.DataFrame):
+        self._resident[dataset_id] = df
+        self._resident.move_to_end(dataset_id)
+        self._sizes[dataset_id] = int(df.memory_usage(index=True, deep=True).sum())
+        self._evict(keep=dataset_id)
+
+    def _evict(self, keep: str):
+        # Spill least recently used datasets until within budget. The dataset just
+        # touched always stays resident, even if it alone exceeds the budget.
+        while sum(self._sizes.values()) > self.memory_budget_bytes and len(self._resident) > 1:
+            oldest_id = next(iter(self._resident))
+            if oldest_id == keep:
+                self._resident.move_to_end(oldest_id)
+                continue
+            df = self._resident.pop(oldest_id)
+            self._sizes.pop(oldest_id)
+            if oldest_id in self._files:
+                # Already on disk; its chunked profile stays valid
+                continue
+            self._profiles.pop(oldest_id, None)
+            if oldest_id not in self._spilled:
+                self._spilled[oldest_id] = self._spill(oldest_id, df)
+
+    def _spill(self, dataset_id: str, df: pd.DataFrame) -> str:
+        private_dir(self.spill_dir)
+        if columnar_available():
+            path = os.path.join(self.spill_dir, f"{dataset_id}.parquet")
+            try:
+                write_parquet(df, path)
+                return path
+            except Exception:
+                # Mixed-type object columns cannot be written as Parquet
+                if os.path.exists(path):
+                    os.remove(path)
+        path = os.path.join(self.spill_dir, f"{dataset_id}.pkl")
+        df.to_pickle(path)
+        return path
+
+
+def _read_spilled(path: str) -> pd.DataFrame:
+    if path.endswith(".parquet"):
+        return read_parquet(path)
+    return pd.read_pickle(path)
+
+
+dataset_store = DatasetStore(DATASET_STORE_MEMORY_MB * 1024 * 1024, DATASET_STORE_DIR)
+
+def save_to_store(df: pd.DataFrame, filename: str = None, profile: DatasetProfile = None) -> str:
+    """
+    Registers a parsed dataset and returns its id.
+    """
+    return dataset_store.put(df, filename, profile)
+
+def load_from_store(dataset_id: str) -> pd.DataFrame:
+    return dataset_store.get(dataset_id)
+
+def load_profile(dataset_id: str) -> DatasetProfile:
+    return dataset_store.get_profile(dataset_id)
+
+def iter_dataset_chunks(dataset_id: str, chunksize: int):
+    return dataset_store.iter_chunks(dataset_id, chunksize)
@@ -0,0 +1,72 @@
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from compaction import is_date_column, parse_dates
+
+
+class TemporalIndex:
+    """
+    Date columns of a frame, parsed once, and the chronological order of its rows per
+    date column, shared by the trend summary, the KPIs and any other time-based view.
+    Columns are recognised by name (compaction.is_date_column). Text is parsed with
+    compaction.parse_dates (format inferred from the first value, one vectorized parse);
+    category columns parse each category once. Unparseable values become NaT.
+    Nothing is written back to the frame, which must not be modified while indexed.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._dates = {}   # column -> datetime64 Series
+        self._orders = {}  # column -> row positions in date order
+
+    @cached_property
+    def date_columns(self) -> list:
+        return [col for col in self.df.columns if is_date_column(col)]
+
+    @property
+    def primary(self):
+        """The date column the summaries use (the first one), or None."""
+        return self.date_columns[0] if self.date_columns else None
+
+    def dates(self, col) -> pd.Series:
+        """col as datetime64, parsed on first use."""
+        dates = self._dates.get(col)
+        if dates is None:
+            values = self.df[col]
+            if pd.api.types.is_datetime64_any_dtype(values.dtype):
+                dates = values
+            elif isinstance(values.dtype, pd.CategoricalDtype):
+                parsed = parse_dates(pd.Series(values.cat.categories)).to_numpy()
+                codes = values.cat.codes.to_numpy()
+                taken = parsed[codes] if len(parsed) else np.full(len(codes), np.datetime64('NaT', 'ns'))
+                taken[codes < 0] = np.datetime64('NaT')
+                dates = pd.Series(taken, index=values.index, name=col)
+            else:
+                dates = parse_dates(values)
+            self._dates[col] = dates
+        return dates
+
+    def order(self, col) -> np.ndarray:
+        """
+        Positions of the rows that have a date in col, earliest first; rows on the same
+        date are ordered like DataFrame.sort_values orders them.
+        """
+        order = self._orders.get(col)
+        if order is None:
+            dates = self.dates(col)
+            if getattr(dates.dt, "tz", None) is not None:
+                dates = dates.dt.tz_convert(None)
+            values = dates.to_numpy()
+            dated = np.flatnonzero(~np.isnat(values))
+            order = self._orders[col] = dated[values[dated].argsort(kind='quicksort')]
+        return order
+
+    def span(self, col) -> tuple:
+        """(first, last) date of col, or None when no row has one."""
+        order = self.order(col)
+        if len(order) == 0:
+            return None
+        dates = self.dates(col)
+        return dates.iloc[order[0]], dates.iloc[order[-1]]
@@ -0,0 +1,61 @@
+import sys
+import os
+import tempfile
+import pandas as pd
+
+# Add current dir to path to import from cache
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from cache import ResultCache, content_key
+
+def test_result_cache_tiers():
+    print("Running result cache tests...")
+    content = b"a,b\n1,x\n2,y\n"
+    assert content_key(content, kind="csv") == content_key(content, kind="csv")
+    assert content_key(content, kind="csv") != content_key(content, kind="csv", sheet_name="Sheet2")
+    assert content_key(content, kind="csv") != content_key(content + b"3,z\n", kind="csv")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        df = pd.DataFrame({"a": range(1000), "b": ["x"] * 1000})
+        size = int(df.memory_usage(index=True, deep=True).sum())
+        # Room for one frame in memory
+        cache = ResultCache(int(size * 1.5), 100 * size, cache_dir)
+        assert cache.get("k1") is None
+
+        cache.put("k1", df, "profile", {"rows": 1000, "dataset_id": None})
+        hit_df, profile, result = cache.get("k1")
+        assert hit_df is df and profile == "profile" and result == {"rows": 1000, "dataset_id": None}
+        # Callers get a copy of the result to fill in
+        result["dataset_id"] = "abc"
+        assert cache.get("k1")[2]["dataset_id"] is None
+
+        # k1 drops out of memory but is still served from disk
+        cache.put("k2", df.copy(), None, {"rows": 1000})
+        cache.shutdown()
+        assert cache.stats()["memory_entries"] == 1 and cache.stats()["disk_entries"] == 2
+        hit_df, profile, result = cache.get("k1")
+        assert hit_df.equals(df) and profile is None and result["rows"] == 1000
+
+        # The disk tier survives a restart
+        restarted = ResultCache(int(size * 1.5), 100 * size, cache_dir)
+        assert restarted.get("k2")[0].equals(df)
+        assert restarted.stats()["hits"] == 1
+
+        # A tight disk budget keeps only the newest entry
+        small = ResultCache(0, 1, cache_dir)
+        small.put("k3", df, None, {"rows": 1000})
+        small.shutdown()
+        assert list(small._disk) == ["k3"]
+        assert sorted(os.listdir(cache_dir)) == ["k3.pkl"]
+
+        # Entries others could have planted are never unpickled
+        os.chmod(cache_dir, 0o777)
+        shared = ResultCache(0, 100 * size, cache_dir)
+        assert shared.get("k3") is None and shared.stats()["disk_entries"] == 0
+    print("All result cache tests passed!")
+
+if __name__ == "__main__":
+    try:
+        test_result_cache_tiers()
+    except Exception as e:
+        print(f"Test failed: {e}")
+        sys.exit(1)
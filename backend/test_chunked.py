@@ -0,0 +1,113 @@
+import pandas as pd
+import numpy as np
+import sys
+import os
+import io
+
+# Add current dir to path to import from chunked
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from chunked import profile_chunks
+from profiling import DatasetProfile
+from sketches import DistinctCounter, KLLSketch
+from processing import (
+    detect_anomalies, calculate_quality_score, calculate_advanced_correlations, generate_recommendations
+)
+from pipeline import analyze_upload
+
+def test_sketches():
+    print("Running sketch accuracy tests...")
+    rng = np.random.default_rng(7)
+    values = rng.normal(0, 1, 200000)
+
+    # Two sketches merged must stay within the advertised rank error
+    left, right = KLLSketch(k=200), KLLSketch(k=200)
+    left.update(values[:120000])
+    right.update(values[120000:])
+    left.merge(right)
+    ordered = np.sort(values)
+    for q, estimate in zip([0.25, 0.5, 0.75], left.quantiles([0.25, 0.5, 0.75])):
+        rank = np.searchsorted(ordered, estimate) / len(ordered)
+        assert abs(rank - q) <= left.rank_error, f"q={q}: rank {rank}"
+
+    counter = DistinctCounter(exact_limit=1000)
+    counter.update(np.arange(500))
+    assert counter.is_exact and counter.estimate() == 500
+    counter.update(np.arange(100000).astype(str))  # strings parsing as numbers hash like numbers
+    assert not counter.is_exact
+    assert abs(counter.estimate() - 100000) < 100000 * 3 * counter.relative_error
+
+    print("All sketch accuracy tests passed!")
+
+def test_chunked_profile_matches_full():
+    print("Running chunked profile tests...")
+    rng = np.random.default_rng(3)
+    n = 20000
+    df = pd.DataFrame({
+        'sales': np.where(rng.random(n) < 0.1, np.nan, rng.normal(100, 20, n)),
+        'price': rng.integers(-5, 50, n).astype(float),
+        'region': rng.choice(['north', 'south', None], n),
+        'code': rng.integers(0, 9, n)
+    })
+    df.loc[3, 'price'] = 1e6
+    df = pd.concat([df, df.iloc[:25]], ignore_index=True)
+    # A string late in the file makes 'code' numeric in early chunks and object in the last one
+    df['code'] = df['code'].astype(object)
+    df.loc[len(df) - 1, 'code'] = 'n/a'
+
+    chunks = lambda: (df.iloc[start:start + 3000].infer_objects() for start in range(0, len(df), 3000))
+    # Exact limit above the row count keeps distinct counts exact (HyperLogLog is covered above)
+    chunked = profile_chunks(chunks, distinct_exact_limit=50000)
+    full = DatasetProfile(df)
+
+    assert chunked.row_count == len(df)
+    assert chunked.columns == list(df.columns)
+    assert chunked.numeric_columns == ['sales', 'price']
+    assert chunked.duplicate_count == full.duplicate_count >= 25
+    assert chunked.null_counts.equals(full.null_counts)
+    assert chunked.distinct_counts.to_dict() == full.distinct_counts.to_dict()
+
+    for col in chunked.numeric_columns:
+        for key in ['min', 'max', 'mean', 'std', 'skew', 'kurtosis']:
+            assert np.isclose(chunked.numeric_stats[col][key], full.numeric_stats[col][key], rtol=1e-9), f"{col}.{key}"
+    assert np.allclose(chunked.correlation_matrix.to_numpy(), full.correlation_matrix.to_numpy(), rtol=1e-9)
+
+    # The analyzers run unchanged on the chunked profile
+    assert detect_anomalies(None, chunked) == detect_anomalies(df)
+    assert calculate_quality_score(None, chunked) == calculate_quality_score(df)
+    assert calculate_advanced_correlations(None, chunked) == calculate_advanced_correlations(df)
+
+    print("All chunked profile tests passed!")
+
+def test_chunked_date_columns():
+    print("Running chunked date column tests...")
+    rng = np.random.default_rng(4)
+    n = 3000
+    df = pd.DataFrame({
+        'Order Date': pd.Series(pd.date_range('2022-01-01', periods=n, freq='h').strftime('%Y-%m-%d %H:%M')),
+        'Sales': rng.normal(500, 50, n).round(2),
+        'Ship Time': rng.choice(['10:30', '11:00'], n),
+        'Due Date': ['2023-01-05'] * (n - 1) + ['soon']
+    })
+    content = df.to_csv(index=False).encode('utf-8')
+    chunks = lambda: (chunk for chunk in pd.read_csv(io.BytesIO(content), chunksize=700))
+    chunked = profile_chunks(chunks)
+
+    # Parsed in every chunk; bare times and a late unparseable value keep a column text
+    assert chunked.datetime_columns == ['Order Date']
+    assert chunked.categorical_columns == ['Ship Time', 'Due Date']
+    assert 'Order Date' not in chunked.numeric_parse_counts
+    # Same recommendations and score as the in-memory upload, which parses the dates at ingestion
+    _, profile, result = analyze_upload(content, 'sales.csv', 'csv')
+    assert profile.datetime_columns == chunked.datetime_columns
+    assert generate_recommendations(None, chunked) == result['recommendations']
+    assert calculate_quality_score(None, chunked) == result['quality_score']
+    print("All chunked date column tests passed!")
+
+if __name__ == "__main__":
+    try:
+        test_sketches()
+        test_chunked_profile_matches_full()
+        test_chunked_date_columns()
+    except Exception as e:
+        print(f"Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,67 @@
+import sys
+import os
+import io
+import numpy as np
+import pandas as pd
+
+# Add current dir to path to import from compaction
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from compaction import compact_frame
+from pipeline import analyze_frame
+from transport import frame_to_records
+
+def _sample_csv(n=3000):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "id": np.arange(n),
+        "qty": rng.integers(1, 50, n),
+        "big": rng.integers(0, 2 ** 40, n),
+        "half": rng.integers(0, 20, n) / 2,
+        "price": rng.normal(size=n),
+        "region": rng.choice(["North", "South", "East"], n),
+        "name": [f"user{i}" for i in range(n)],
+        "order_date": pd.Series(pd.date_range("2021-01-01", periods=300).strftime("%Y-%m-%d"))
+                        .sample(n, replace=True, random_state=1).to_numpy(),
+        "start_time": rng.choice(["10:30", "11:00"], n)
+    })
+    df.loc[::7, "half"] = np.nan
+    df.loc[::9, "region"] = None
+    return df.to_csv(index=False).encode("utf-8")
+
+def test_compact_frame():
+    print("Running compaction tests...")
+    raw = pd.read_csv(io.BytesIO(_sample_csv()))
+    compacted, memory = compact_frame(raw)
+
+    assert memory["columns"] == {"id": "int16", "qty": "int8", "half": "float32", "region": "category",
+                                 "order_date": "datetime64[ns]", "start_time": "category"}
+    # Values that do not survive a narrower type keep theirs; bare times are not dates
+    assert compacted["big"].dtype == np.int64 and compacted["price"].dtype == np.float64
+    assert compacted["name"].dtype == object
+    assert memory["bytes_after"] == int(compacted.memory_usage(index=True, deep=True).sum())
+    assert memory["bytes_before"] > 2 * memory["bytes_after"]
+
+    # Same rows on the wire, and the caller's frame is untouched
+    assert frame_to_records(compacted) == frame_to_records(raw)
+    assert raw["qty"].dtype == np.int64
+    print("All compaction tests passed!")
+
+def test_compacted_analysis():
+    print("Running compacted analysis tests...")
+    raw = pd.read_csv(io.BytesIO(_sample_csv()))
+    compacted, memory = compact_frame(raw)
+    before, after = analyze_frame(raw, "f.csv"), analyze_frame(compacted, "f.csv", memory=memory)
+    assert after["memory"] == memory
+    for key in ("stats", "anomalies", "summary", "kpis", "quality_score", "correlations"):
+        assert before[key] == after[key], key
+    # Dates are parsed at ingestion, so there is nothing left to convert
+    assert not any("DateTime" in rec for rec in after["recommendations"])
+    print("All compacted analysis tests passed!")
+
+if __name__ == "__main__":
+    try:
+        test_compact_frame()
+        test_compacted_analysis()
+    except Exception as e:
+        print(f"Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,52 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add current dir to path to import from pipeline
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from pipeline import concat_uploads, unify_schema
+
+def test_schema_aligned_concat():
+    print("Running schema-aligned concat tests...")
+    north = pd.DataFrame({
+        "id": [1, 2, 3],
+        "sales": [1.5, 2.5, None],
+        "date": pd.to_datetime(["2024-01-01", "2024-02-01", "2024-03-01"]),
+        "region": ["N", "N", "N"]
+    })
+    # Same columns, but date is entirely empty here and sales parsed as int
+    south = pd.DataFrame({"id": [4, 5], "sales": [10, 20], "date": [np.nan, np.nan], "extra": ["q", "r"]})
+    empty = pd.DataFrame({"id": pd.Series([], dtype=object)})
+
+    schema = unify_schema([north, south, empty])
+    assert list(schema) == ["id", "sales", "date", "region", "extra"]
+    assert schema["id"] == np.int64 and schema["sales"] == np.float64
+    assert schema["date"].kind == 'M' and schema["region"] == object
+
+    merged = concat_uploads([north, south, empty])
+    assert list(merged.index) == list(range(5))
+    assert merged["id"].tolist() == [1, 2, 3, 4, 5]
+    assert merged["sales"].tolist()[3:] == [10.0, 20.0]
+    assert merged["date"].isna().tolist() == [False, False, False, True, True]
+    assert merged["region"].isna().sum() == 2 and merged["extra"].isna().sum() == 3
+
+    # Truly mixed kinds still fall back to object, like pd.concat
+    mixed = concat_uploads([north, pd.DataFrame({"id": ["A-7"]})])
+    assert mixed["id"].dtype == object and mixed["id"].tolist() == [1, 2, 3, "A-7"]
+
+    # A zero-row frame without a category column leaves it categorical
+    labels = pd.DataFrame({"c": pd.Categorical(["x", "y", "x"]), "v": [1, 2, 3]})
+    stacked = concat_uploads([labels, pd.DataFrame({"v": pd.Series([], dtype="int64")})])
+    assert isinstance(stacked["c"].dtype, pd.CategoricalDtype) and stacked["c"].tolist() == ["x", "y", "x"]
+    # ... while rows without it need nulls, which categories only take as object
+    padded = concat_uploads([labels.iloc[:0], pd.DataFrame({"v": [4]})])
+    assert padded["c"].dtype == object and padded["c"].isna().all() and padded["v"].tolist() == [4]
+    print("All schema-aligned concat tests passed!")
+
+if __name__ == "__main__":
+    try:
+        test_schema_aligned_concat()
+    except Exception as e:
+        print(f"Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,108 @@
+import sys
+import os
+import base64
+import numpy as np
+import pandas as pd
+
+# Add current dir to path to import from correlation
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from correlation import (
+    pearson_matrix, matrix_pairs, strongest_pairs, spearman_matrix, kendall_matrix,
+    cramers_v_matrix, correlation_ratio_matrix
+)
+
+def test_correlation_engine():
+    print("Running correlation engine tests...")
+    rng = np.random.default_rng(0)
+    base = rng.normal(size=(2000, 4))
+    df = pd.DataFrame(base[:, [0, 0, 1, 1, 2, 3, 3, 0]] + rng.normal(size=(2000, 8)), columns=list("abcdefgh"))
+    df.loc[rng.integers(0, 2000, 300), 'c'] = np.nan
+    df['constant'] = 1.0
+    values = df.to_numpy()
+    names = list(df.columns)
+
+    expected = df.corr().to_numpy()
+    # Small blocks exercise both the complete and the pairwise (missing values) paths
+    corr = pearson_matrix(values, block_columns=3)
+    assert np.array_equal(np.isnan(corr), np.isnan(expected))
+    assert np.nanmax(np.abs(corr - expected)) < 1e-12
+    assert np.nanmax(np.abs(pearson_matrix(values, dtype=np.float32) - expected)) < 1e-5
+
+    pairs = matrix_pairs(corr, names)
+    assert all(abs(p["correlation"]) > 0.1 for p in pairs)
+    assert [abs(p["correlation"]) for p in pairs] == sorted((abs(p["correlation"]) for p in pairs), reverse=True)
+    assert not any("constant" in (p["col1"], p["col2"]) for p in pairs)
+    assert matrix_pairs(corr, names, top_k=3) == pairs[:3]
+    assert matrix_pairs(corr, names, threshold=0.45) == [p for p in pairs if abs(p["correlation"]) > 0.45]
+
+    # Streaming over blocks gives the same pairs without the full matrix
+    streamed = strongest_pairs(values, names, top_k=4, block_columns=3)
+    assert [(p["col1"], p["col2"]) for p in streamed] == [(p["col1"], p["col2"]) for p in pairs[:4]]
+    assert np.allclose([p["correlation"] for p in streamed], [p["correlation"] for p in pairs[:4]])
+    print("All correlation engine tests passed!")
+
+def test_rank_and_association_methods():
+    print("Running rank and association method tests...")
+    rng = np.random.default_rng(1)
+    a = rng.normal(size=3000)
+    df = pd.DataFrame({'a': a, 'b': np.exp(a) + rng.normal(size=3000), 'c': rng.integers(0, 5, 3000).astype(float)})
+    df.loc[rng.integers(0, 3000, 200), 'b'] = np.nan
+
+    complete = df.dropna()
+    assert np.nanmax(np.abs(spearman_matrix(complete.to_numpy()) - complete.corr('spearman').to_numpy())) < 1e-12
+    # Ties in 'c' and missing values in 'b': tau-b over pairwise-complete rows, as pandas
+    assert np.nanmax(np.abs(kendall_matrix(df.to_numpy()) - df.corr('kendall').to_numpy())) < 1e-12
+
+    # Cramér's V: identical columns give 1, independent ones about 0
+    group = rng.integers(0, 3, 3000)
+    codes = [group, group.copy(), rng.integers(0, 4, 3000)]
+    codes[1][:10] = -1
+    v = cramers_v_matrix(codes, [3, 3, 4])
+    assert abs(v[0, 1] - 1.0) < 1e-12 and v[0, 2] < 0.1
+
+    # Correlation ratio: eta^2 is the between-group share of the variance
+    values = np.c_[group * 2.0 + rng.normal(size=3000), rng.normal(size=3000)]
+    eta = correlation_ratio_matrix([group], [3], values)
+    frame = pd.DataFrame({'g': group, 'x': values[:, 0]})
+    means = frame.groupby('g')['x'].transform('mean')
+    expected = ((means - frame.x.mean()) ** 2).sum() / ((frame.x - frame.x.mean()) ** 2).sum()
+    assert eta.shape == (1, 2)
+    assert abs(eta[0, 0] ** 2 - expected) < 1e-12 and eta[0, 1] < 0.1
+    print("All rank and association method tests passed!")
+
+def test_correlation_heatmap():
+    from processing import correlation_heatmap
+    print("Running correlation heatmap tests...")
+    rng = np.random.default_rng(2)
+    base = rng.normal(size=(1000, 3))
+    # Three groups of related columns, interleaved, with one noisy low-variance column per group
+    df = pd.DataFrame({f"{name}{k}": base[:, g] * (10 if k < 2 else 0.1) + rng.normal(size=1000) * 0.1
+                       for k in range(3) for g, name in enumerate("xyz")})
+
+    full = correlation_heatmap(df, max_columns=0, encoding='float32', cluster=False)
+    matrix = np.frombuffer(base64.b64decode(full['matrix']), '<f4').reshape(full['shape'])
+    assert full['columns'] == list(df.columns)
+    assert np.nanmax(np.abs(matrix - df.corr().to_numpy())) < 1e-6
+
+    # Clustering puts each group's columns next to each other
+    clustered = correlation_heatmap(df, max_columns=0, encoding='json')
+    groups = [col[0] for col in clustered['columns']]
+    assert all(groups.count(name) == 3 and groups[groups.index(name):groups.index(name) + 3] == [name] * 3 for name in "xyz")
+
+    # Capped by variance: the six 10-scaled columns are kept, the 0.1-scaled ones dropped
+    capped = correlation_heatmap(df, max_columns=6, encoding='uint8')
+    assert sorted(capped['columns']) == sorted(col for col in df.columns if col[1] in "01")
+    assert capped['total_columns'] == 9 and capped['shape'] == [6, 6]
+    quantized = np.frombuffer(base64.b64decode(capped['matrix']), np.uint8).reshape(6, 6)
+    decoded = quantized * capped['scale'] + capped['offset']
+    assert np.abs(decoded - df[capped['columns']].corr().to_numpy()).max() <= 0.5 / 127 + 1e-9
+    print("All correlation heatmap tests passed!")
+
+if __name__ == "__main__":
+    try:
+        test_correlation_engine()
+        test_rank_and_association_methods()
+        test_correlation_heatmap()
+    except Exception as e:
+        print(f"Test failed: {e}")
+        sys.exit(1)
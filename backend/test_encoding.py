@@ -0,0 +1,100 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Add current dir to path to import from encoding
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from encoding import CategoryEncoder, FeatureEncoder, to_categorical
+from ml import fit_model
+from processing import process_data, generate_recommendations
+
+def test_category_mappings():
+    print("Running category mapping tests...")
+    values = pd.Series([1, "1", "b", None, "a", 2.0], dtype=object)
+    converted = to_categorical(values)
+    # Same labels and order as LabelEncoder on astype(str); missing values stay missing
+    assert list(converted.cat.categories) == ["1", "2.0", "a", "b"]
+    assert converted.cat.codes.tolist() == [0, 0, 3, -1, 2, 1]
+    assert to_categorical(converted) is converted
+
+    encoder = CategoryEncoder().fit(values)
+    assert encoder.codes(pd.Series(["a", "unseen", None, 1])).tolist() == [2, -1, -1, 0]
+    assert encoder.codes(pd.Series(["b", "a"], dtype="category")).tolist() == [3, 2]
+    assert encoder.labels([3, 0]).tolist() == ["b", "1"]
+
+    # Chunked fitting ends with the same mapping
+    chunked = CategoryEncoder().partial_fit(values[:3]).partial_fit(values[3:])
+    assert list(chunked.categories) == list(encoder.categories)
+    print("All category mapping tests passed!")
+
+def test_feature_encodings():
+    print("Running feature encoding tests...")
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({
+        "x": rng.normal(size=1000),
+        "small": rng.choice(["a", "b", "c"], size=1000),
+        "large": [f"id{i}" for i in rng.integers(0, 500, size=1000)]
+    })
+    y = (X["small"] == "b") * 2.0
+
+    onehot = FeatureEncoder("onehot", max_levels=50, buckets=64).fit(X)
+    matrix = onehot.transform(X)
+    # The low-cardinality column is one-hot encoded, the high-cardinality one hashed
+    assert sparse.issparse(matrix) and matrix.shape == (1000, 1 + 3 + 64)
+    assert onehot.methods == {"x": "numeric", "small": "onehot", "large": "hashing"}
+    assert onehot.feature_names[:4] == ["x", "small=a", "small=b", "small=c"]
+    assert (np.asarray(matrix[:, 1:].sum(axis=1)).ravel() == 2).all()
+
+    target = FeatureEncoder("target", smoothing=0).fit(X, y)
+    encoded = target.transform(pd.DataFrame({"x": [0.0], "small": ["b"], "large": ["never seen"]}))
+    assert encoded["small"].iloc[0] == 2.0 and abs(encoded["large"].iloc[0] - y.mean()) < 1e-12
+
+    # Missing categorical values are encoded as missing, not as the integer 0
+    label = FeatureEncoder("label").fit(X)
+    assert label.transform(pd.DataFrame({"x": [None], "small": [None], "large": ["id1"]})).iloc[0].tolist()[:2] == [0.0, -1]
+    print("All feature encoding tests passed!")
+
+def test_encoded_models():
+    print("Running encoded model tests...")
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({"x": rng.normal(size=2000), "city": rng.choice(["north", "south", "east"], size=2000)})
+    df["y"] = df["x"] + df["city"].map({"east": 0.0, "north": 5.0, "south": 0.0})
+
+    # Label codes cannot express the per-city offsets linearly, indicators can
+    label = fit_model(df, "y", ["x", "city"])
+    onehot = fit_model(df, "y", ["x", "city"], encoding="onehot")
+    assert onehot.metrics["r2"] > 0.999 > label.metrics["r2"]
+    assert set(onehot.coefficients) == {"x", "city=east", "city=north", "city=south"}
+    assert abs(onehot.predict(pd.DataFrame({"x": [1.0], "city": ["north"]}))[0] - 6.0) < 1e-6
+    # An unseen city scores like an average city, not like the intercept alone
+    cities = onehot.predict(pd.DataFrame({"x": 0.0, "city": df["city"]}))
+    unseen = onehot.predict(pd.DataFrame({"x": [0.0], "city": ["west"]}))[0]
+    assert abs(unseen - np.mean(cities)) < 0.2 and unseen > 1.0
+
+    # Dates stored parsed (compact_frame) score alike when rows send them as text
+    dated = pd.DataFrame({"x": df["x"], "Order Date": pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 365, 2000), unit="D")})
+    dated["y"] = dated["x"] + (dated["Order Date"] - pd.Timestamp("2023-01-01")).dt.days * 0.5
+    model = fit_model(dated, "y", ["x", "Order Date"])
+    assert model.encoder.methods["Order Date"] == "date" and model.metrics["r2"] > 0.999
+    inline = model.predict(pd.DataFrame({"x": [0.0, 0.0], "Order Date": ["2023-03-02", None]}))
+    assert abs(inline[0] - 30.0) < 1e-6
+    # A missing date scores at the training mean, not at the epoch
+    epoch_days = (pd.Timestamp("2023-01-01") - pd.Timestamp(0)).days
+    assert abs(inline[1] - 0.5 * (model.encoder.date_means["Order Date"][1] - epoch_days)) < 1e-3
+
+    # The profile analyzers read category columns like object ones
+    categorized = df.assign(city=to_categorical(df["city"]))
+    assert process_data(categorized) == process_data(df)
+    assert generate_recommendations(categorized) == generate_recommendations(df)
+    print("All encoded model tests passed!")
+
+if __name__ == "__main__":
+    try:
+        test_category_mappings()
+        test_feature_encodings()
+        test_encoded_models()
+    except Exception as e:
+        print(f"Test failed: {e}")
+        sys.exit(1)
@@ -50,9 +50,30 @@ def test_robust_excel():
     assert active == 'EmptySheet'
     print("✅ Test Passed: Explicit selection worked!")
 
+def test_sheet_selection_beyond_sample():
+    print("Testing sheet selection on sheets longer than the sample...")
+    import processing
+
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        # Denser in its first rows, but the 'Long' sheet holds more data overall
+        pd.DataFrame({'a': range(300), 'b': range(300), 'c': range(300)}).to_excel(writer, sheet_name='Wide', index=False)
+        pd.DataFrame({'a': range(1000), 'b': range(1000)}).to_excel(writer, sheet_name='Long', index=False)
+
+    sample_rows = processing.EXCEL_SAMPLE_ROWS
+    processing.EXCEL_SAMPLE_ROWS = 100
+    try:
+        df_result, _, active = read_excel_smart(output.getvalue())
+    finally:
+        processing.EXCEL_SAMPLE_ROWS = sample_rows
+    assert active == 'Long'
+    assert len(df_result) == 1000 and list(df_result.columns) == ['a', 'b']
+    print("✅ Test Passed: Sheet sizes came from the sheet dimensions!")
+
 if __name__ == "__main__":
     try:
         test_robust_excel()
+        test_sheet_selection_beyond_sample()
         print("\n✨ All extraction tests passed!")
     except Exception as e:
         print(f"\n❌ Test Failed: {e}")
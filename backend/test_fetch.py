@@ -0,0 +1,79 @@
+import asyncio
+import sys
+import os
+import json
+import tempfile
+import httpx
+
+# Add current dir to path to import from fetch
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fastapi import HTTPException
+from fetch import RemoteFetcher
+
+CSV = b"region,sales\nNorth,10\nSouth,20\n"
+
+def test_conditional_fetch():
+    print("Running remote fetch tests...")
+    downloads = []
+
+    def handler(request):
+        if request.url.path == "/big.csv":
+            return httpx.Response(200, content=b"x" * 2048)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        downloads.append(request.url.path)
+        return httpx.Response(200, content=CSV, headers={"ETag": '"v1"', "Content-Type": "text/csv"})
+
+    async def scenario(cache_dir):
+        fetcher = RemoteFetcher(cache_dir, max_bytes=1024, cache_budget_bytes=10 * 1024, timeout=5)
+        fetcher._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        try:
+            first = await fetcher.fetch("https://example.com/sales.csv")
+            assert not first["not_modified"] and first["etag"] == '"v1"' and first["size"] == len(CSV)
+            with open(first["path"], 'rb') as f:
+                assert f.read() == CSV
+
+            # Validators survive a restart: a fresh fetcher revalidates instead of downloading
+            second_fetcher = RemoteFetcher(cache_dir, max_bytes=1024, cache_budget_bytes=10 * 1024, timeout=5)
+            second_fetcher._client = fetcher._client
+            second = await second_fetcher.fetch("https://example.com/sales.csv")
+            assert second["not_modified"] and second["sha256"] == first["sha256"]
+            assert downloads == ["/sales.csv"]
+
+            # Validators pointing outside the fetcher's own copy are ignored and the source downloaded again
+            meta_path = first["path"][:-len(".data")] + ".json"
+            with open(meta_path) as f:
+                meta = json.load(f)
+            with open(meta_path, 'w') as f:
+                json.dump({**meta, "path": os.path.abspath(__file__)}, f)
+            third = await second_fetcher.fetch("https://example.com/sales.csv")
+            assert not third["not_modified"] and third["path"] == first["path"]
+            assert downloads == ["/sales.csv", "/sales.csv"]
+
+            try:
+                await fetcher.fetch("https://example.com/big.csv")
+                assert False, "expected 413"
+            except HTTPException as e:
+                assert e.status_code == 413
+            assert not [name for name in os.listdir(cache_dir) if name.endswith(".part")]
+
+            # Copies are never kept where other users could read or plant them
+            os.chmod(cache_dir, 0o777)
+            try:
+                await fetcher.fetch("https://example.com/sales.csv")
+                assert False, "expected PermissionError"
+            except PermissionError:
+                pass
+        finally:
+            await fetcher.close()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        asyncio.run(scenario(cache_dir))
+    print("All remote fetch tests passed!")
+
+if __name__ == "__main__":
+    try:
+        test_conditional_fetch()
+    except Exception as e:
+        print(f"Test failed: {e}")
+        sys.exit(1)
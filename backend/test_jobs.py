@@ -0,0 +1,80 @@
+import asyncio
+import sys
+import os
+
+# Add current dir to path to import from jobs
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fastapi import HTTPException
+from jobs import JobManager
+
+def test_job_progress_cancel_and_expiry():
+    print("Running job manager tests...")
+    manager = JobManager(ttl_seconds=0.2, max_active=2)
+
+    async def staged(job):
+        async with job.stage("parse"):
+            job.report("parse", "1/1 files")
+        async with job.stage("profile"):
+            await asyncio.sleep(0.1)
+        return {"rows": 3}
+
+    async def failing(job):
+        async with job.stage("parse"):
+            raise HTTPException(status_code=400, detail="bad file")
+
+    async def slow(job):
+        async with job.stage("parse"):
+            await asyncio.sleep(5)
+
+    async def scenario():
+        job = manager.submit("upload", ["parse", "profile"], staged)
+        await asyncio.sleep(0.05)
+        status = manager.get(job.job_id).to_dict()
+        assert status["status"] == "running" and status["progress"] == 0.5
+        assert status["stages"][0]["detail"] == "1/1 files"
+        assert status["stages"][1]["status"] == "running"
+        await asyncio.sleep(0.1)
+        status = job.to_dict()
+        assert status["status"] == "succeeded" and status["result"] == {"rows": 3}
+
+        failed = manager.submit("upload", ["parse"], failing)
+        await asyncio.sleep(0.01)
+        assert failed.status == "failed" and failed.error == "bad file"
+        assert failed.stages[0]["status"] == "failed"
+
+        # Two slow jobs fill the manager; a third is rejected
+        running = [manager.submit("upload", ["parse"], slow) for _ in range(2)]
+        try:
+            manager.submit("upload", ["parse"], slow)
+            assert False, "expected 503"
+        except HTTPException as e:
+            assert e.status_code == 503
+        await asyncio.sleep(0.01)
+        assert manager.cancel(running[0].job_id) and manager.cancel(running[1].job_id)
+        await asyncio.sleep(0.01)
+        assert all(j.status == "cancelled" for j in running)
+        assert running[0].stages[0]["status"] == "cancelled"
+
+        # A job cancelled before it starts never runs
+        queued = manager.submit("upload", ["parse"], slow)
+        manager.cancel(queued.job_id)
+        await asyncio.sleep(0.01)
+        assert queued.status == "cancelled" and queued.stages[0]["status"] == "pending"
+
+        # Finished jobs expire after the TTL
+        await asyncio.sleep(0.25)
+        try:
+            manager.get(job.job_id)
+            assert False, "expected expiry"
+        except KeyError:
+            pass
+
+    asyncio.run(scenario())
+    print("All job manager tests passed!")
+
+if __name__ == "__main__":
+    try:
+        test_job_progress_cancel_and_expiry()
+    except Exception as e:
+        print(f"Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,140 @@
+import sys
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+# Add current dir to path to import from ml and models
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from ml import fit_model, fit_model_chunked, sweep_models
+from models import ModelCache, model_key, frame_fingerprint
+
+def test_fitted_model_scoring():
+    print("Running fitted model tests...")
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=500)
+    df = pd.DataFrame({"x": x, "cat": np.where(x > 0, "hi", "lo"), "y": 3 * x + 1 + rng.normal(size=500) * 0.01})
+
+    model = fit_model(df, "y", ["x", "cat"])
+    assert model.task == "regression" and model.summary()["metrics"]["r2"] > 0.99
+    # Unseen categories and missing values are encoded like in training instead of failing
+    scored = model.predict(pd.DataFrame({"x": [1.0, None], "cat": ["hi", "new"]}))
+    assert abs(scored[0] - 4.0) < 0.1 and len(scored) == 2
+    try:
+        model.predict(pd.DataFrame({"cat": ["hi"]}))
+        assert False, "missing feature columns must be rejected"
+    except ValueError:
+        pass
+
+    df["label"] = np.where(x > 0, "up", "down")
+    classifier = fit_model(df, "label", ["x"], "classification")
+    assert classifier.task == "classification" and classifier.summary()["status"] == "success"
+    assert classifier.predict(pd.DataFrame({"x": [2.0, -2.0]})) == ["up", "down"]
+    print("All fitted model tests passed!")
+
+def test_batch_predictions():
+    print("Running batch prediction tests...")
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame({"id": range(1000), "x": rng.normal(size=1000), "cat": rng.choice(["a", "b", None], size=1000)})
+    df["y"] = df["x"] + (df["cat"] == "b") * 2
+    model = fit_model(df, "y", ["x", "cat"])
+    expected = model.predict(df)
+
+    # Categorical dtype columns encode through their categories, like the object column
+    as_category = df.assign(cat=df["cat"].astype("category"))
+    assert np.allclose(model.predict(as_category), expected)
+
+    batches = list(model.iter_predictions([df.iloc[:700], df.iloc[700:]], keep=["id"], chunk_rows=300))
+    assert [len(batch) for batch in batches] == [300, 300, 100, 300]
+    scored = pd.concat(batches)
+    assert list(scored.columns) == ["id", "prediction"] and scored["id"].tolist() == list(range(1000))
+    assert np.allclose(scored["prediction"], expected)
+    print("All batch prediction tests passed!")
+
+def test_chunked_training():
+    print("Running chunked training tests...")
+    rng = np.random.default_rng(1)
+    x = rng.normal(size=20000)
+    df = pd.DataFrame({"x": x * 100 + 5000, "cat": np.array(list("abc"))[rng.integers(0, 3, 20000)]})
+    df["y"] = x + (df["cat"] == "b") * 2 + rng.normal(size=20000) * 0.1
+    df.loc[::50, "y"] = np.nan
+    chunks = lambda: (df.iloc[start:start + 3000] for start in range(0, len(df), 3000))
+
+    # Normal equations over chunks: the same fit as LinearRegression, up to the different holdout
+    model = fit_model_chunked(chunks, "y", ["x", "cat"], categorical=["cat"])
+    reference = fit_model(df, "y", ["x", "cat"])
+    assert model.task == "regression" and abs(model.metrics["r2"] - reference.metrics["r2"]) < 0.01
+    assert np.abs(np.array(model.predict(df.head(100))) - np.array(reference.predict(df.head(100)))).max() < 0.05
+    # The holdout is deterministic and close to 20% of the labelled rows
+    assert model.training_rows == fit_model_chunked(chunks, "y", ["x", "cat"], categorical=["cat"]).training_rows
+    assert 0.75 < model.training_rows / df["y"].notna().sum() < 0.85
+
+    df["label"] = np.where(x > 0, "up", "down")
+    classifier = fit_model_chunked(chunks, "label", ["x"], categorical=["cat", "label"])
+    assert classifier.task == "classification" and classifier.metrics["accuracy"] > 0.95
+    assert classifier.predict(pd.DataFrame({"x": [5300.0, 4700.0]})) == ["up", "down"]
+    print("All chunked training tests passed!")
+
+def test_model_sweep():
+    print("Running model sweep tests...")
+    rng = np.random.default_rng(2)
+    x = rng.uniform(-3, 3, size=600)
+    df = pd.DataFrame({"x": x, "noise": rng.normal(size=600)})
+    # Non-linear in x: the linear families trail the tree ensembles and are dropped after one fold
+    df["y"] = np.abs(x) * 3 + rng.normal(size=600) * 0.1
+
+    model = sweep_models(df, "y", ["x", "noise"], folds=3, n_jobs=1)
+    board = model.leaderboard
+    assert [row["rank"] for row in board] == list(range(1, len(board) + 1))
+    assert board[0]["model"] in ("gradient_boosting", "random_forest") and board[0]["folds"] == 3
+    linear = [row for row in board if row["model"] in ("linear", "ridge", "lasso")]
+    assert linear and all(row["stopped_early"] and row["folds"] == 1 for row in linear)
+    assert all(row["fit_seconds"] >= 0 and row["predict_ms_per_1k_rows"] >= 0 for row in board)
+    assert model.summary()["leaderboard"] == board and model.metrics["r2"] > 0.9
+    assert abs(model.predict(pd.DataFrame({"x": [2.0], "noise": [0.0]}))[0] - 6.0) < 0.5
+    print("All model sweep tests passed!")
+
+def test_model_cache():
+    print("Running model cache tests...")
+    df = pd.DataFrame({"x": np.arange(10.0), "y": np.arange(10.0) * 2 + np.tile([0.1, -0.1], 5)})
+    fingerprint = frame_fingerprint(df)
+    assert fingerprint == frame_fingerprint(df.copy())
+    assert fingerprint != frame_fingerprint(df.assign(y=df.y + 1))
+    key = model_key(fingerprint, "y", ["x"], "regression")
+    assert key != model_key(fingerprint, "y", ["x"], "classification")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = ModelCache(1, 1024 * 1024, cache_dir)
+        model = fit_model(df, "y", ["x"])
+        cache.put(key, model)
+        assert cache.get(key) is model
+        # Evicted from memory by the next model, but still on disk
+        cache.put("other", fit_model(df, "x", ["y"]))
+        cache.shutdown()
+        restored = cache.get(key)
+        assert restored is not model and restored.predict(df) == model.predict(df)
+
+        # A new cache over the same directory finds the persisted models
+        reopened = ModelCache(4, 1024 * 1024, cache_dir)
+        assert reopened.get(key) is not None and reopened.get("missing") is None
+        reopened.shutdown()
+
+        # A directory others can write to is never read from: its files could be planted
+        os.chmod(cache_dir, 0o777)
+        shared = ModelCache(4, 1024 * 1024, cache_dir)
+        assert shared.get(key) is None and shared.stats()["disk_entries"] == 0
+        shared.put(key, model)
+        shared.shutdown()
+        assert shared.stats()["disk_entries"] == 0
+    print("All model cache tests passed!")
+
+if __name__ == "__main__":
+    try:
+        test_fitted_model_scoring()
+        test_batch_predictions()
+        test_chunked_training()
+        test_model_sweep()
+        test_model_cache()
+    except Exception as e:
+        print(f"Test failed: {e}")
+        sys.exit(1)
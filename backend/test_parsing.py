@@ -5,7 +5,7 @@ import os
 
 # Add current dir to path to import from main
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from processing import read_csv_smart
+from processing import read_csv_smart, _sniff_csv_dialect
 
 def test_parsing():
     print("Running parsing tests...")
@@ -33,9 +33,36 @@ def test_parsing():
 
     print("All parsing tests passed!")
 
+def test_dialect_sniffing():
+    print("Running dialect sniffing tests...")
+
+    # Separators inside quotes must not confuse the sniffer
+    csv_quoted = b'name,desc\n"Smith, J","a; b"\n"Doe, K","c|d"\n'
+    assert _sniff_csv_dialect(csv_quoted) == ('utf-8-sig', ',')
+    df = read_csv_smart(csv_quoted)
+    assert list(df.columns) == ['name', 'desc']
+    assert df['name'].iloc[0] == 'Smith, J'
+
+    # European decimals: ';' splits every line consistently, ',' does not split the header
+    csv_decimal = "a;b;c\n1,5;2,5;x\n3,1;4,2;y".encode('utf-8')
+    assert _sniff_csv_dialect(csv_decimal) == ('utf-8-sig', ';')
+
+    # BOM-less UTF-16 and Windows-1252 are detected from byte frequencies
+    assert _sniff_csv_dialect("id\tscore\n1\t95".encode('utf-16-le'))[0] == 'utf-16-le'
+    csv_cp1252 = "nom;prix\n“A”;3\nB;4".encode('cp1252')
+    assert _sniff_csv_dialect(csv_cp1252) == ('cp1252', ';')
+    assert read_csv_smart(csv_cp1252)['nom'].iloc[0] == '“A”'
+
+    # Single column files are ambiguous and go through the scoring fallback
+    assert _sniff_csv_dialect(b"x\n1\n2") is None
+    assert len(read_csv_smart(b"x\n1\n2")) == 2
+
+    print("All dialect sniffing tests passed!")
+
 if __name__ == "__main__":
     try:
         test_parsing()
+        test_dialect_sniffing()
     except Exception as e:
         print(f"Test failed: {e}")
         sys.exit(1)
@@ -0,0 +1,133 @@
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add current dir to path to import from profiling
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from profiling import DatasetProfile, ApproximateProfile, _column_numeric_stats
+from processing import (
+    generate_summary, generate_kpis, process_data, detect_anomalies, calculate_quality_score,
+    generate_recommendations, calculate_advanced_correlations
+)
+
+def test_shared_profile_matches_standalone():
+    print("Running shared profile tests...")
+    rng = np.random.default_rng(11)
+    n = 500
+    df = pd.DataFrame({
+        'revenue': rng.normal(1000, 100, n),
+        'cost': rng.normal(600, 50, n),
+        'units': rng.integers(1, 20, n),
+        'region': rng.choice(['north', 'south', None], n),
+        'order_id': np.arange(n)
+    })
+    df.loc[7, 'revenue'] = 1e6
+    df = pd.concat([df, df.iloc[:5]], ignore_index=True)
+
+    # One profile passed to every analyzer gives what each analyzer computes on its own
+    profile = DatasetProfile(df)
+    stats = process_data(df, profile)
+    assert stats == process_data(df)
+    assert detect_anomalies(df, profile) == detect_anomalies(df)
+    assert calculate_quality_score(df, profile) == calculate_quality_score(df)
+    assert generate_recommendations(df, profile) == generate_recommendations(df)
+    assert calculate_advanced_correlations(df, profile) == calculate_advanced_correlations(df)
+    assert generate_summary(df, stats, 'Financial', profile) == generate_summary(df, stats, 'Financial')
+    assert generate_kpis(df, 'Financial', profile) == generate_kpis(df, 'Financial')
+    print("All shared profile tests passed!")
+
+def test_block_stats_match_series():
+    print("Running batched numeric stats tests...")
+    rng = np.random.default_rng(42)
+
+    # 9000 rows crosses NumPy's 8192-element buffer boundary for integer sums
+    for n in [3, 5, 9000]:
+        df = pd.DataFrame({
+            'float': rng.normal(1000, 50, n),
+            'sparse': np.where(rng.random(n) < 0.3, np.nan, rng.lognormal(0, 2, n)),
+            'int': rng.integers(-10**9, 10**9, n),
+            'small_int': rng.integers(0, 7, n).astype('int32'),
+            'constant': np.full(n, 3.3),
+            'empty': np.full(n, np.nan),
+            'huge_int': rng.integers(2**60, 2**62, n),
+            'nullable': pd.array(rng.integers(0, 5, n), dtype='Int64'),
+            'label': rng.choice(['a', 'b'], n)
+        })
+        stats = DatasetProfile(df).numeric_stats
+        assert 'label' not in stats
+
+        for col in stats:
+            expected = _column_numeric_stats(df[col])
+            for key, value in expected.items():
+                actual = stats[col][key]
+                if pd.isna(value):
+                    assert pd.isna(actual), f"{col}.{key}: expected NaN, got {actual}"
+                else:
+                    # Bit-identical, not approximately equal
+                    assert float(actual) == float(value), f"{col}.{key}: {actual!r} != {value!r}"
+
+    print("All batched numeric stats tests passed!")
+
+def test_approximate_profile_within_bounds():
+    print("Running approximate profile tests...")
+    rng = np.random.default_rng(5)
+    n = 60000
+    df = pd.DataFrame({
+        'amount': rng.lognormal(3, 1, n),
+        'id': np.arange(n),
+        'segment': rng.choice(['a', 'b', 'c'], n)
+    })
+    exact = DatasetProfile(df)
+    approx = ApproximateProfile(df, quantile_error=0.01, distinct_error=0.01)
+    accuracy = approx.accuracy()
+    assert accuracy["approximate"] and not exact.accuracy()["approximate"]
+
+    ordered = np.sort(df['amount'].to_numpy())
+    for key, q in [('q1', 0.25), ('median', 0.5), ('q3', 0.75)]:
+        rank = np.searchsorted(ordered, approx.numeric_stats['amount'][key]) / n
+        assert abs(rank - q) <= accuracy["quantile_rank_error"], f"{key}: rank {rank}"
+    # Moments stay exact
+    assert approx.numeric_stats['amount']['std'] == exact.numeric_stats['amount']['std']
+
+    # Low-cardinality columns are counted exactly, high-cardinality within 3 standard errors
+    assert approx.distinct_counts['segment'] == 3
+    assert abs(approx.distinct_counts['id'] - n) <= 3 * accuracy["distinct_count_relative_error"] * n
+
+    print("All approximate profile tests passed!")
+
+def test_temporal_index():
+    print("Running temporal index tests...")
+    df = pd.DataFrame({
+        'sales': [40.0, 10.0, 20.0, 30.0, 50.0],
+        'Order Date': ['2024-03-01', '2024-01-15', None, '2024-02-01', 'not a date'],
+        'time_slot': pd.Categorical(['10:30', '11:00', '10:30', None, '11:00'])
+    })
+    snapshot = df.copy()
+    profile = DatasetProfile(df)
+    temporal = profile.temporal
+
+    assert temporal.date_columns == ['Order Date', 'time_slot'] and temporal.primary == 'Order Date'
+    assert temporal.order('Order Date').tolist() == [1, 3, 0]
+    assert [d.strftime('%Y-%m-%d') for d in temporal.span('Order Date')] == ['2024-01-15', '2024-03-01']
+    # Categories are parsed once each; missing categories stay NaT
+    assert temporal.dates('time_slot').isna().tolist() == [False, False, False, True, False]
+
+    stats = [{'name': 'sales', 'type': 'numeric', 'mean': 30.0}]
+    summary = generate_summary(df, stats, 'Financial', profile)
+    assert "from 2024-01-15 to 2024-03-01" in summary and "increased by 300.0%" in summary
+    kpis = generate_kpis(df, 'Financial', profile)
+    assert kpis[1]['value'] == "+600.0%"
+    # The caller's frame is left as it was
+    assert df.equals(snapshot) and df['Order Date'].dtype == object
+    print("All temporal index tests passed!")
+
+if __name__ == "__main__":
+    try:
+        test_shared_profile_matches_standalone()
+        test_block_stats_match_series()
+        test_approximate_profile_within_bounds()
+        test_temporal_index()
+    except Exception as e:
+        print(f"Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,199 @@
+import pandas as pd
+import numpy as np
+import sys
+import os
+import tempfile
+import asyncio
+
+# Add current dir to path to import from store
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from store import DatasetStore, DatasetTooLarge
+
+def test_store_lru_spill():
+    print("Running dataset store tests...")
+
+    spill_dir = tempfile.mkdtemp()
+    df = pd.DataFrame({'a': np.arange(1000, dtype='int64'), 'b': np.random.rand(1000)})
+    frame_bytes = int(df.memory_usage(index=True, deep=True).sum())
+
+    # Budget fits two frames: registering a third spills the least recently used one
+    store = DatasetStore(frame_bytes * 2, spill_dir)
+    id1 = store.put(df, 'one.csv')
+    id2 = store.put(df * 2, 'two.csv')
+    store.get(id1)  # id1 becomes most recently used
+    id3 = store.put(df * 3, 'three.csv')
+
+    assert store.info(id1)['resident']
+    assert not store.info(id2)['resident']
+    assert store.resident_bytes() <= frame_bytes * 2
+    spill_path = store._spilled[id2]
+    assert os.path.dirname(spill_path) == spill_dir and os.path.exists(spill_path)
+
+    # Spilled datasets load back transparently
+    pd.testing.assert_frame_equal(store.get(id2), df * 2)
+    assert store.info(id2)['resident']
+    assert store.info(id3)['rows'] == 1000
+
+    store.delete(id2)
+    assert id2 not in store
+    assert not os.path.exists(spill_path)
+    try:
+        store.get(id2)
+        assert False, "Deleted dataset should not be found"
+    except KeyError:
+        pass
+
+    print("All dataset store tests passed!")
+
+def test_store_append():
+    print("Running dataset append tests...")
+    from profiling import DatasetProfile
+    from processing import read_csv_file, append_csv_file
+
+    rng = np.random.default_rng(0)
+    history = pd.DataFrame({'x': rng.normal(size=5000), 'y': rng.normal(size=5000), 'region': rng.choice(['N', 'S'], 5000)})
+    history['y'] += history['x']
+    # Values that survive the CSV round trip of the file-backed case exactly
+    history[['x', 'y']] = history[['x', 'y']].round(4)
+    delta = history.iloc[:300].copy()  # re-sent rows count as duplicates
+    delta.loc[delta.index[:5], 'x'] = 100.0  # and these as outliers
+
+    spill_dir = tempfile.mkdtemp()
+    store = DatasetStore(10 * 1024 * 1024, spill_dir)
+    dataset_id = store.put(history, 'ops.csv')
+    profile = store.append(dataset_id, delta)
+    full = DatasetProfile(pd.concat([history, delta], ignore_index=True))
+
+    assert profile.row_count == len(full.df) == store.info(dataset_id)['rows']
+    assert len(store.get(dataset_id)) == len(full.df)
+    assert profile.duplicate_count == full.duplicate_count == 295
+    assert np.isclose(profile.numeric_stats['x']['mean'], full.numeric_stats['x']['mean'])
+    assert np.isclose(profile.correlation_matrix.loc['x', 'y'], full.correlation_matrix.loc['x', 'y'])
+    assert abs(profile.outlier_counts['x'] - full.outlier_counts['x']) <= 0.01 * profile.row_count
+    # The exact profile of the grown frame is rebuilt on demand
+    assert store.get_profile(dataset_id).row_count == len(full.df)
+
+    # Later appends reuse the kept profile and only see the new rows
+    assert store.append(dataset_id, delta.iloc[:10]) is profile and profile.row_count == len(full.df) + 10
+
+    # A null in a numeric column (object dtype when it is the only value) keeps the column numeric
+    nulls = pd.DataFrame([{'x': None, 'y': 1.0, 'region': 'N'}])
+    assert nulls['x'].dtype == object
+    store.append(dataset_id, nulls)
+    assert profile.column_types['x'] == 'numeric' and 'x' in profile.numeric_stats
+    assert profile.null_counts['x'] == 1 and profile.numeric_columns == ['x', 'y']
+    assert pd.api.types.is_float_dtype(store.get(dataset_id)['x'])
+
+    # File-backed datasets append to their file
+    path = os.path.join(spill_dir, 'ops.csv')
+    history.to_csv(path, index=False)
+    reader = lambda chunksize: read_csv_file(path, 'utf-8', ',', chunksize)
+    file_id = store.put_file(path, reader, profile=DatasetProfile(history), filename='ops.csv',
+                             appender=lambda rows: append_csv_file(path, rows, 'utf-8', ','))
+    store.append(file_id, delta)
+    assert len(reader(None)) == len(full.df)
+    assert store.get_profile(file_id).duplicate_count == 295
+
+    # Small datasets get a small duplicate filter, rebuilt larger once appends outgrow it
+    small_id = store.put(history.iloc[:100].copy(), 'small.csv')
+    small = store.append(small_id, history.iloc[:10])
+    assert small.duplicate_capacity == 4096 and small.duplicate_count == 10
+    grown = store.append(small_id, history.iloc[100:])
+    assert grown is not small and grown.duplicate_capacity >= 2 * grown.row_count
+    assert grown.duplicate_count == 10 and grown.row_count == 5010
+    print("All dataset append tests passed!")
+
+def test_store_append_dates():
+    print("Running dated append tests...")
+    from compaction import compact_frame
+    from pipeline import analyze_profile, analyze_upload
+
+    rng = np.random.default_rng(1)
+    n = 3050
+    sales = pd.DataFrame({
+        'Order Date': pd.Series(pd.date_range('2022-01-01', periods=n, freq='h').strftime('%Y-%m-%d %H:%M')),
+        'Sales': rng.normal(500, 50, n).round(2),
+        'Region': rng.choice(['North', 'South'], n)
+    })
+    history, _ = compact_frame(sales.iloc[:3000].reset_index(drop=True))
+    assert pd.api.types.is_datetime64_any_dtype(history['Order Date'])
+
+    store = DatasetStore(10 * 1024 * 1024, tempfile.mkdtemp())
+    dataset_id = store.put(history, 'sales.csv')
+    # Appended rows arrive as JSON text, dates included; the first 20 are re-sent
+    delta = pd.DataFrame(pd.concat([sales.iloc[:20], sales.iloc[3000:]]).to_dict(orient='records'))
+    profile = store.append(dataset_id, delta)
+    appended = analyze_profile(profile, 'sales.csv')
+    resent = pd.concat([sales, sales.iloc[:20]], ignore_index=True)
+    _, _, uploaded = analyze_upload(resent.to_csv(index=False).encode('utf-8'), 'sales.csv', 'csv')
+
+    assert profile.datetime_columns == ['Order Date'] and 'Order Date' not in profile.numeric_parse_counts
+    assert appended['quality_score'] == uploaded['quality_score']
+    assert appended['recommendations'] == uploaded['recommendations'] == []
+    # Parsed and appended dates hash alike, so re-sent rows are duplicates
+    assert profile.duplicate_count == 20
+    assert pd.api.types.is_datetime64_any_dtype(store.get(dataset_id)['Order Date'])
+    assert profile.distinct_counts['Order Date'] == n
+    print("All dated append tests passed!")
+
+def test_store_oversized_file():
+    print("Running oversized dataset tests...")
+    from chunked import profile_chunks
+    from processing import correlation_heatmap, calculate_advanced_correlations
+    from fastapi import HTTPException
+    import main
+
+    rng = np.random.default_rng(3)
+    x = rng.normal(size=2000)
+    df = pd.DataFrame({'x': x, 'y': 2 * x + rng.normal(size=2000), 'z': rng.normal(size=2000)})
+    path = os.path.join(tempfile.mkdtemp(), 'big.csv')
+    df.to_csv(path, index=False)
+    reads = []
+
+    def reader(chunksize):
+        # Loading the whole file (chunksize=None) is what must not happen
+        reads.append(chunksize)
+        assert chunksize is not None, "over-budget dataset parsed whole"
+        return pd.read_csv(path, chunksize=chunksize)
+
+    profile = profile_chunks(lambda: reader(500))
+    store = DatasetStore(os.path.getsize(path) // 2, tempfile.mkdtemp())
+    dataset_id = store.put_file(path, reader, profile=profile, filename='big.csv')
+    reads.clear()
+
+    assert store.is_oversized(dataset_id)
+    try:
+        store.get(dataset_id)
+        raise AssertionError("get loaded an over-budget dataset")
+    except DatasetTooLarge:
+        pass
+    assert sum(len(chunk) for chunk in store.iter_chunks(dataset_id, 700)) == 2000
+
+    # The endpoints refuse to load it and fall back to the chunked profile
+    import store as store_module
+    original = store_module.dataset_store
+    store_module.dataset_store = main.dataset_store = store
+    try:
+        asyncio.run(main._load_frame({'dataset_id': dataset_id}))
+        raise AssertionError("_load_frame loaded an over-budget dataset")
+    except HTTPException as e:
+        assert e.status_code == 413
+    finally:
+        store_module.dataset_store = main.dataset_store = original
+    assert reads == [700]
+
+    pairs = calculate_advanced_correlations(None, profile)
+    assert [(p['col1'], p['col2']) for p in pairs] == [('x', 'y')]
+    heatmap = correlation_heatmap(None, profile, max_columns=2, encoding='json')
+    assert heatmap['total_columns'] == 3 and len(heatmap['columns']) == 2
+    print("All oversized dataset tests passed!")
+
+if __name__ == "__main__":
+    try:
+        test_store_lru_spill()
+        test_store_append()
+        test_store_append_dates()
+        test_store_oversized_file()
+    except Exception as e:
+        print(f"Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,63 @@
+import pandas as pd
+import numpy as np
+import json
+import sys
+import os
+
+# Add current dir to path to import from transport
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from transport import negotiate_format, iter_ndjson, columnar_available, frame_to_arrow, arrow_to_frame, frame_to_parquet, parquet_to_frame
+
+def test_ndjson_stream():
+    print("Running NDJSON streaming tests...")
+    df = pd.DataFrame({'value': [1.5, np.nan, 3.0, 4.0, 5.0], 'label': ['a', None, 'c', 'd', 'e']})
+
+    lines = [json.loads(line) for line in iter_ndjson({"filename": "test.csv"}, df, chunk_rows=2)]
+    assert lines[0] == {"type": "summary", "filename": "test.csv"}
+    assert [line["offset"] for line in lines[1:-1]] == [0, 2, 4]
+    assert lines[1]["rows"][1] == {"value": None, "label": None}
+    assert lines[-1] == {"type": "end", "rows": 5}
+
+    # An empty frame still gets its summary and end lines
+    empty = [json.loads(line) for line in iter_ndjson({}, df.iloc[:0])]
+    assert [line["type"] for line in empty] == ["summary", "end"] and empty[-1]["rows"] == 0
+    print("All NDJSON streaming tests passed!")
+
+def test_accept_negotiation():
+    print("Running Accept negotiation tests...")
+    assert negotiate_format("application/x-ndjson") == "ndjson"
+    assert negotiate_format("application/x-ndjson, application/json;q=0.9") == "ndjson"
+    # Without the header, or for anything else, the JSON body is unchanged
+    assert negotiate_format(None) == "json"
+    assert negotiate_format("") == "json"
+    assert negotiate_format("*/*") == "json"
+    assert negotiate_format("application/json") == "json"
+    print("All Accept negotiation tests passed!")
+
+def test_columnar_roundtrip():
+    if not columnar_available():
+        print("pyarrow not installed, skipping columnar tests")
+        return
+    print("Running Arrow/Parquet transport tests...")
+    df = pd.DataFrame({'x': np.arange(100, dtype='int64'), 'y': np.random.rand(100), 'name': ['row'] * 100})
+
+    restored, metadata = arrow_to_frame(frame_to_arrow(df, {"summary": {"rows": 100}}))
+    pd.testing.assert_frame_equal(restored, df)
+    assert metadata["summary"] == {"rows": 100}
+
+    restored, _ = parquet_to_frame(frame_to_parquet(df))
+    pd.testing.assert_frame_equal(restored, df)
+
+    # Mixed-type object columns are sent as strings instead of failing
+    mixed, _ = arrow_to_frame(frame_to_arrow(pd.DataFrame({'m': [1, 'a', None]})))
+    assert list(mixed['m'][:2]) == ['1', 'a']
+    print("All Arrow/Parquet transport tests passed!")
+
+if __name__ == "__main__":
+    try:
+        test_ndjson_stream()
+        test_accept_negotiation()
+        test_columnar_roundtrip()
+    except Exception as e:
+        print(f"Test failed: {e}")
+        sys.exit(1)
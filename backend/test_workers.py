@@ -0,0 +1,51 @@
+import asyncio
+import time
+import sys
+import os
+
+# Add current dir to path to import from workers
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fastapi import HTTPException
+from workers import WorkerPool
+
+def test_backpressure_and_timeout():
+    print("Running worker pool tests...")
+    # processes=0 keeps the test in threads; run_cpu falls back to the thread pool
+    pool = WorkerPool(processes=0, threads=2, max_pending=2, timeout=5)
+
+    async def scenario():
+        assert await pool.run_cpu(sum, [1, 2, 3]) == 6
+
+        # Two slow jobs fill the pool; a third is rejected immediately instead of queueing
+        slow = [asyncio.ensure_future(pool.run_thread(time.sleep, 0.3)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        try:
+            await pool.run_thread(sum, [1])
+            assert False, "expected 503"
+        except HTTPException as e:
+            assert e.status_code == 503 and "Retry-After" in e.headers
+        await asyncio.gather(*slow)
+        assert pool.stats()["pending"] == 0
+
+        try:
+            await pool.run_thread(time.sleep, 0.5, timeout=0.05)
+            assert False, "expected 504"
+        except HTTPException as e:
+            assert e.status_code == 504
+        # The timed-out job still holds its slot until the thread finishes
+        assert pool.stats()["pending"] == 1
+        await asyncio.sleep(0.6)
+        assert pool.stats()["pending"] == 0
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+    print("All worker pool tests passed!")
+
+if __name__ == "__main__":
+    try:
+        test_backpressure_and_timeout()
+    except Exception as e:
+        print(f"Test failed: {e}")
+        sys.exit(1)
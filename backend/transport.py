@@ -0,0 +1,218 @@
+import os
+import json
+import base64
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Columnar transport is optional; JSON/NDJSON always work
+    pa = None
+    pq = None
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+
+# Dense matrix encodings of encode_matrix
+MATRIX_ENCODINGS = ("float32", "uint8", "json")
+# Rows serialized per NDJSON line when streaming a dataset
+STREAM_CHUNK_ROWS = int(os.getenv("STREAM_CHUNK_ROWS", "5000"))
+
+
+def negotiate_format(accept_header: str) -> str:
+    """
+    Picks the dataset encoding for a response: 'arrow', 'parquet', 'ndjson' or 'json'.
+    """
+    accept_header = accept_header or ""
+    if ARROW_STREAM_MEDIA_TYPE in accept_header:
+        return "arrow"
+    if PARQUET_MEDIA_TYPE in accept_header:
+        return "parquet"
+    if NDJSON_MEDIA_TYPE in accept_header:
+        return "ndjson"
+    return "json"
+
+def columnar_available() -> bool:
+    return pa is not None
+
+def _json_default(value):
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, np.bool_):
+        return bool(value)
+    if isinstance(value, (pd.Timestamp, datetime, date)):
+        return value.isoformat()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+def _ndjson_line(obj: dict) -> bytes:
+    return (json.dumps(obj, default=_json_default) + "\n").encode("utf-8")
+
+def frame_to_records(df: pd.DataFrame) -> list:
+    """
+    Converts df to a list of row dicts with NaN/NaT replaced by None.
+    Columns are converted one at a time (no object copy of the whole frame); date
+    columns without a time of day are written as "YYYY-MM-DD".
+    """
+    if df.columns.has_duplicates:
+        # Cast to object first: float columns would otherwise turn None back into NaN
+        return df.astype(object).where(pd.notnull(df), None).to_dict(orient="records")
+    names = list(df.columns)
+    return [dict(zip(names, row)) for row in zip(*(_column_objects(df[col]) for col in names))]
+
+def _column_objects(values: pd.Series) -> np.ndarray:
+    """values as Python objects, None for missing values."""
+    missing = values.isna().to_numpy()
+    if pd.api.types.is_datetime64_any_dtype(values.dtype) and (values.dt.normalize() == values)[~missing].all():
+        objects = values.dt.strftime('%Y-%m-%d').to_numpy(dtype=object)
+    else:
+        objects = values.to_numpy(dtype=object)
+    if missing.any():
+        objects[missing] = None
+    return objects
+
+def render_json(obj) -> bytes:
+    """
+    Serializes a response body like FastAPI's JSONResponse (compact, NaN rejected),
+    without jsonable_encoder's per-value overhead on large record lists.
+    """
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+                      default=_json_default).encode("utf-8")
+
+def encode_matrix(matrix: np.ndarray, encoding: str = "float32") -> dict:
+    """
+    Compact form of a dense matrix of values in [-1, 1] (e.g. correlations) for a JSON body:
+    - float32: {"matrix": base64 of little-endian float32, row-major; NaN kept}
+    - uint8: {"matrix": base64 of bytes q, value = q * scale + offset; q = 255 means NaN},
+      a quarter of the float32 size at 1/127 resolution
+    - json: {"matrix": nested lists rounded to 4 decimals, NaN as null}
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    encoded = {"encoding": encoding, "shape": list(matrix.shape)}
+    if encoding == "float32":
+        encoded["matrix"] = base64.b64encode(matrix.astype("<f4").tobytes()).decode("ascii")
+    elif encoding == "uint8":
+        quantized = np.rint((np.clip(matrix, -1.0, 1.0) + 1.0) * 127.0)
+        quantized = np.where(np.isnan(matrix), 255, quantized).astype(np.uint8)
+        encoded.update(matrix=base64.b64encode(quantized.tobytes()).decode("ascii"),
+                       scale=1 / 127, offset=-1.0, missing=255)
+    elif encoding == "json":
+        rounded = np.round(matrix, 4).astype(object)
+        rounded[np.isnan(matrix)] = None
+        encoded["matrix"] = rounded.tolist()
+    else:
+        raise ValueError(f"Unknown matrix encoding: {encoding}")
+    return encoded
+
+def dataset_json(result: dict, df: pd.DataFrame) -> bytes:
+    """
+    JSON body of an analysis result with the rows of df under "data".
+    """
+    return render_json({**result, "data": frame_to_records(df)})
+
+def iter_records(df: pd.DataFrame, chunk_rows: int = STREAM_CHUNK_ROWS):
+    """
+    Yields (offset, records) for consecutive row slices of df.
+    Only one slice is converted to Python objects at a time.
+    """
+    for start in range(0, len(df), chunk_rows):
+        yield start, frame_to_records(df.iloc[start:start + chunk_rows])
+
+def iter_ndjson(summary: dict, df: pd.DataFrame, chunk_rows: int = STREAM_CHUNK_ROWS):
+    """
+    Streams an analysis result as NDJSON:
+    - one {"type": "summary", ...} line with everything except the rows
+    - {"type": "rows", "offset": int, "rows": [...]} lines of up to chunk_rows records
+    - a final {"type": "end", "rows": int} line
+    """
+    yield _ndjson_line({"type": "summary", **summary})
+    for offset, records in iter_records(df, chunk_rows):
+        yield _ndjson_line({"type": "rows", "offset": offset, "rows": records})
+    yield _ndjson_line({"type": "end", "rows": len(df)})
+
+def iter_frames_ndjson(summary: dict, frames, chunk_rows: int = STREAM_CHUNK_ROWS):
+    """
+    iter_ndjson for rows produced frame by frame (e.g. batch predictions): offsets run
+    across frames, and the "end" line counts the rows of all of them.
+    """
+    yield _ndjson_line({"type": "summary", **summary})
+    offset = 0
+    for frame in frames:
+        for start, records in iter_records(frame, chunk_rows):
+            yield _ndjson_line({"type": "rows", "offset": offset + start, "rows": records})
+        offset += len(frame)
+    yield _ndjson_line({"type": "end", "rows": offset})
+
+def iter_frames_csv(frames):
+    """Frames with the same columns as one CSV document, the header sent with the first."""
+    header = True
+    for frame in frames:
+        yield frame.to_csv(index=False, header=header).encode("utf-8")
+        header = False
+
+
+def _to_arrow_table(df: pd.DataFrame, metadata: dict = None):
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        # Object columns mixing numbers and strings have no Arrow type; send them as strings
+        object_cols = df.select_dtypes(include=['object']).columns
+        table = pa.Table.from_pandas(df.astype({col: 'string' for col in object_cols}), preserve_index=False)
+    if metadata:
+        schema_metadata = dict(table.schema.metadata or {})
+        schema_metadata.update({key.encode(): json.dumps(value, default=_json_default).encode() for key, value in metadata.items()})
+        table = table.replace_schema_metadata(schema_metadata)
+    return table
+
+def _from_arrow_table(table) -> tuple:
+    metadata = {}
+    for key, value in (table.schema.metadata or {}).items():
+        if key == b"pandas":
+            continue
+        try:
+            metadata[key.decode()] = json.loads(value)
+        except ValueError:
+            metadata[key.decode()] = value.decode(errors="replace")
+    # split_blocks avoids consolidating columns into one copy; numeric columns without nulls are zero-copy
+    return table.to_pandas(split_blocks=True), metadata
+
+def frame_to_arrow(df: pd.DataFrame, metadata: dict = None) -> bytes:
+    """
+    Serializes df as an Arrow IPC stream. metadata values are stored as JSON in the schema metadata.
+    """
+    table = _to_arrow_table(df, metadata)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def arrow_to_frame(body: bytes) -> tuple:
+    """
+    Reads an Arrow IPC stream. Returns (DataFrame, metadata dict).
+    """
+    table = pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+    return _from_arrow_table(table)
+
+def frame_to_parquet(df: pd.DataFrame, metadata: dict = None) -> bytes:
+    sink = pa.BufferOutputStream()
+    pq.write_table(_to_arrow_table(df, metadata), sink)
+    return sink.getvalue().to_pybytes()
+
+def parquet_to_frame(body: bytes) -> tuple:
+    return _from_arrow_table(pq.read_table(pa.BufferReader(body)))
+
+def write_parquet(df: pd.DataFrame, path: str):
+    """
+    Persists df to a Parquet file. Raises when a column has no Arrow representation.
+    """
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), path)
+
+def read_parquet(path: str) -> pd.DataFrame:
+    return pq.read_table(path).to_pandas(split_blocks=True)
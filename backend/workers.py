@@ -0,0 +1,122 @@
+import os
+import asyncio
+import threading
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from fastapi import HTTPException
+
+# Worker processes for CPU-bound analysis. 0 runs CPU jobs on the thread pool instead.
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", str(min(4, os.cpu_count() or 1))))
+# Threads for work that releases the GIL (NumPy/pandas kernels, blocking I/O)
+WORKER_THREADS = int(os.getenv("WORKER_THREADS", "8"))
+# Jobs queued or running across both pools before new requests get 503
+WORKER_MAX_PENDING = int(os.getenv("WORKER_MAX_PENDING", "32"))
+WORKER_TIMEOUT_SECONDS = float(os.getenv("WORKER_TIMEOUT_SECONDS", "300"))
+# spawn keeps workers independent of the server's threads and open sockets
+WORKER_START_METHOD = os.getenv("WORKER_START_METHOD", "spawn")
+# How often callers with wait=True re-check for a free slot
+WAIT_POLL_SECONDS = 0.05
+
+
+class WorkerPool:
+    """
+    Runs blocking analysis work off the asyncio event loop.
+    - run_cpu: process pool, for pure-Python/pandas work that holds the GIL.
+      Arguments and results are pickled, so pass module-level functions.
+    - run_thread: thread pool, for GIL-releasing NumPy work on shared in-memory data.
+    At most max_pending jobs are queued or running; beyond that callers get a 503
+    with Retry-After instead of waiting in an unbounded queue (background jobs pass
+    wait=True to wait for a slot instead). A job exceeding its timeout gets a 504;
+    its slot is only freed once the worker actually finishes.
+    """
+
+    def __init__(self, processes: int, threads: int, max_pending: int, timeout: float,
+                 start_method: str = WORKER_START_METHOD):
+        self.processes = processes
+        self.threads = threads
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.start_method = start_method
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._process_executor = None
+        self._thread_executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="dataflow-worker")
+
+    async def run_cpu(self, fn, *args, timeout: float = None, wait: bool = False, **kwargs):
+        if self.processes <= 0:
+            return await self.run_thread(fn, *args, timeout=timeout, wait=wait, **kwargs)
+        return await self._run(self._get_process_executor, fn, args, kwargs, timeout, wait)
+
+    async def run_thread(self, fn, *args, timeout: float = None, wait: bool = False, **kwargs):
+        return await self._run(lambda: self._thread_executor, fn, args, kwargs, timeout, wait)
+
+    async def _run(self, get_executor, fn, args, kwargs, timeout, wait):
+        while True:
+            try:
+                self._acquire()
+                break
+            except HTTPException:
+                if not wait:
+                    raise
+                await asyncio.sleep(WAIT_POLL_SECONDS)
+        try:
+            executor = get_executor()
+            future = executor.submit(functools.partial(fn, *args, **kwargs))
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            raise HTTPException(status_code=504, detail=f"Analysis timed out after {timeout or self.timeout:.0f}s")
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); start a fresh pool for the next job
+            self._reset_process_executor()
+            raise HTTPException(status_code=503, detail="Analysis worker crashed, please retry",
+                                headers={"Retry-After": "1"})
+
+    def _acquire(self):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise HTTPException(status_code=503, detail="Server is busy, please retry shortly",
+                                    headers={"Retry-After": "5"})
+            self._pending += 1
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    def _get_process_executor(self):
+        with self._lock:
+            if self._process_executor is None:
+                context = multiprocessing.get_context(self.start_method)
+                self._process_executor = ProcessPoolExecutor(max_workers=self.processes, mp_context=context)
+            return self._process_executor
+
+    def _reset_process_executor(self):
+        with self._lock:
+            executor, self._process_executor = self._process_executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "processes": self.processes,
+                "threads": self.threads,
+                "pending": self._pending,
+                "max_pending": self.max_pending
+            }
+
+    def shutdown(self):
+        self._reset_process_executor()
+        self._thread_executor.shutdown(wait=False, cancel_futures=True)
+
+
+worker_pool = WorkerPool(WORKER_PROCESSES, WORKER_THREADS, WORKER_MAX_PENDING, WORKER_TIMEOUT_SECONDS)